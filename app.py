@@ -1,19 +1,34 @@
+import json
 import os
 import streamlit as st
 import pandas as pd
 
-from dataflow.data_manager import load_file, save_csv, save_xlsx, autosave
-from dataflow.operations import (
-    delete_columns, delete_rows, fillna, rename_columns, convert_dtypes_safely
+from dataflow.data_manager import (
+    IngestCache, autosave, excel_sheets, load_excel, load_file, table_label, union_tables, upload_copy,
+    upload_hash,
 )
-from dataflow.charts import plot_and_save
-from dataflow.exporters import export_pdf
+from dataflow.inference import optimize_dtypes
+from dataflow.history import OperationLog
+from dataflow.operations import fillna
+from dataflow.filters import FilterEngine
+from dataflow.stats import ColumnStats
+from dataflow.editor import EditorSync, page_count, page_slice, rows_signature, sort_positions
+from dataflow.charts import ChartCache, plot_and_save
+from dataflow.groupby import GroupByEngine
+from dataflow.exporters import EXPORT_FORMATS, ExportPipeline
+from dataflow.fingerprint import frame_fingerprint
+from dataflow.jobs import STATUS_LABELS, Job, JobManager
+from dataflow.profiling import Tracer
+from dataflow.sessions import DatasetStore, SessionSpace, cleanup_sessions
 
 # ---- evitar avisos ruidosos do streamlit ----
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="streamlit.runtime.scriptrunner")
 warnings.filterwarnings("ignore", category=UserWarning, module="streamlit")
 
+# copy-on-write: os snapshots do histórico compartilham as colunas não alteradas
+pd.set_option("mode.copy_on_write", True)
+
 # ---------------------- CONFIG PÁGINA ----------------------
 st.set_page_config(page_title="DataFlow", page_icon="🧊", layout="wide")
 
@@ -23,64 +38,188 @@ if os.path.exists(STYLE_PATH):
         st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
 # ---------------------- ESTADO ----------------------
+@st.cache_resource
+def shared_datasets() -> DatasetStore:
+    # um por processo: sessões com o mesmo upload dividem a mesma cópia
+    return DatasetStore(IngestCache())
+
 def init_state():
+    if "workspace" not in st.session_state:
+        # sessão nova: pasta própria e limpeza das sessões abandonadas
+        st.session_state.workspace = SessionSpace()
+        cleanup_sessions(keep=(st.session_state.workspace.id,))
+        shared_datasets().sweep()
+    if "group_engine" not in st.session_state:
+        # índices de grupo compartilhados entre Estatísticas e Gráficos
+        st.session_state.group_engine = GroupByEngine()
     defaults = dict(
         df_master=None,
         df_view=None,
-        orig_master=None,
+        history=None,
+        editor_sync=EditorSync(),
+        editor_page=1,
+        editor_page_size=100,
+        editor_sort=None,
+        view_order=None,
         filters=None,
-        cache_dir="tmp_exports"
+        filter_engine=None,
+        column_stats=ColumnStats(groups=st.session_state.group_engine),
+        arrow_storage=False,
+        loaded_key=None,       # chave de ingestão do que está em df_master
+        loaded_label=None,
+        schema_report=None,    # tipos detectados na última leitura (inference.SchemaReport)
+        upload_hashes={},      # file_id do upload -> hash do conteúdo
+        tracer=Tracer(),       # tempos por etapa (painel Diagnóstico)
+        load_job=None,         # chaves dos jobs em segundo plano acompanhados pela tela
+        fill_job=None,
+        chart_job=None,
+        cache_dir=st.session_state.workspace.cache_dir,   # gráficos e exportações desta sessão
     )
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
     os.makedirs(st.session_state.cache_dir, exist_ok=True)
+    if "chart_cache" not in st.session_state:
+        st.session_state.chart_cache = ChartCache(st.session_state.cache_dir)
+    if "jobs" not in st.session_state:
+        st.session_state.jobs = JobManager()
+    if "exports" not in st.session_state:
+        st.session_state.exports = ExportPipeline(st.session_state.cache_dir,
+                                                  stats=st.session_state.column_stats)
 
 init_state()
+workspace = st.session_state.workspace
+workspace.touch()
+shared_datasets().touch(workspace.id)
+
+# ---------------------- DIAGNÓSTICO ----------------------
+# tempos do rerun anterior: este só termina no fim do script
+tracer = st.session_state.tracer
+with st.sidebar.expander("🛠️ Diagnóstico"):
+    tracing = st.toggle("Medir etapas do rerun", key="tracing")
+    tracer.memory = st.checkbox("Pico de memória (mais lento)", key="tracing_memory", disabled=not tracing,
+                                help="Liga o tracemalloc: mede as alocações do Python/NumPy em cada etapa.")
+    if tracing:
+        tracer.begin_run()
+        last = tracer.last_finished
+        if last is None:
+            st.caption("Os tempos aparecem a partir do próximo rerun.")
+        else:
+            st.caption(f"Rerun #{last.index}: {last.total * 1000:.0f} ms")
+            st.dataframe(Tracer.summary(last).round(1), hide_index=True, use_container_width=True)
+            st.download_button("⬇️ Trace (Chrome)", data=json.dumps(tracer.chrome_trace()),
+                               file_name="dataflow_trace.json", mime="application/json",
+                               help="Abra em chrome://tracing ou ui.perfetto.dev.", use_container_width=True)
+    else:
+        tracer.disable()
+    refs = shared_datasets().refs()
+    st.caption(f"Datasets compartilhados em memória: {len(refs)} · sessões usando: {sum(refs.values())}")
 
 # ---------------------- HELPERS ----------------------
-def _coerce_value_for_col(df: pd.DataFrame, col: str, val: str):
-    if col not in df.columns:
-        return val
-    s = df[col]
-    if pd.api.types.is_numeric_dtype(s):
-        try:
-            return pd.to_numeric(val)
-        except Exception:
-            return val
-    return val
+FILTER_OPS = {
+    "É igual a": "==",
+    "É diferente de": "!=",
+    "Maior que": ">",
+    "Menor que": "<",
+    "Maior ou igual a": ">=",
+    "Menor ou igual a": "<=",
+    "Entre (a;b)": "between",
+    "Está na lista (a;b;c)": "isin",
+    "Não está na lista (a;b;c)": "notin",
+    "É nulo": "isna",
+    "Não é nulo": "notna",
+    "Contém (texto)": "contains",
+    "Expressão regular": "regex",
+}
+
+def filter_engine(df: pd.DataFrame) -> FilterEngine:
+    # o engine guarda as máscaras já avaliadas enquanto o DataFrame não muda
+    engine = st.session_state.filter_engine
+    if engine is None or engine.df is not df:
+        engine = st.session_state.filter_engine = FilterEngine(df)
+    return engine
 
 def apply_filters(df: pd.DataFrame, filters: dict | None) -> pd.DataFrame:
-    if df is None or filters is None:
+    if df is None or not filters:
         return df
-    col, op_label, val = filters.get("col"), filters.get("op"), filters.get("val")
-    if not col or val is None or val == "":
-        return df
-
     try:
-        if op_label == "Contém (texto)":
-            return df[df[col].astype(str).str.contains(str(val), case=False, na=False)]
-        ops = {
-            "É igual a": "==",
-            "É diferente de": "!=",
-            "Maior que": ">",
-            "Menor que": "<",
-            "Maior ou igual a": ">=",
-            "Menor ou igual a": "<=",
-        }
-        op = ops.get(op_label)
-        if op is None:
-            return df
-        coerced = _coerce_value_for_col(df, col, val)
-        expr = f"`{col}` {op} @coerced"
-        return df.query(expr, local_dict={"coerced": coerced})
-    except Exception:
+        return filter_engine(df).apply(filters)
+    except ValueError as e:
+        # ex.: coluna do filtro foi removida ou renomeada
+        st.warning(f"Filtro descartado: {e}")
+        st.session_state.filters = None
         return df
 
 def recompute_view():
     st.session_state.df_view = apply_filters(st.session_state.df_master, st.session_state.filters)
+    st.session_state.view_order = None
+
+def save_session():
+    # falha no autosave (disco cheio, permissão) não pode derrubar o rerun
+    try:
+        autosave(st.session_state.df_master, key=workspace.autosave_key)
+    except Exception as e:
+        st.warning(f"Autosave falhou: {e}")
+
+JOB_POLL_SECONDS = 0.5
+
+def job_status(job: Job) -> None:
+    # o fragmento consulta o job; quando ele termina, o script inteiro roda
+    # de novo e quem disparou o job consome o resultado
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def panel():
+        if job.done:
+            st.rerun()
+        status = STATUS_LABELS[job.status]
+        text = f"{job.label} ({status})… {job.message}" if job.message else f"{job.label} ({status})…"
+        st.progress(job.progress, text=text)
+        if st.button("Cancelar", key=f"cancel_{job.key}"):
+            job.cancel()
+            st.rerun()
+
+    panel()
+
+def read_upload(job: Job, csvs: list, workbooks: list, sheet_choice: dict, table: str | None,
+                arrow: bool):
+    # roda num job: não toca no st.session_state, só devolve o DataFrame e os tipos
+    def report(frac, rows):
+        job.report(0.8 * frac, f"{rows:,} linhas".replace(",", "."))
+
+    tables = {f.name: load_file(f, progress=report) for f in csvs}
+    if workbooks:
+        tables.update(load_excel(workbooks, sheet_choice, progress=report))
+    if len(tables) == 1:
+        df = next(iter(tables.values()))
+    elif table is None:
+        df = union_tables(tables)
+    else:
+        df = tables[table]
+    # números (inclusive "1.234,56"), datas, booleanos e categorias
+    job.report(0.8, "detectando tipos")
+    df, schema = optimize_dtypes(df, arrow=arrow)
+    df.attrs["truncated"] = any(t.attrs.get("truncated") for t in tables.values())
+    return df, schema
+
+def render_chart(job: Job, *args, **kwargs) -> str:
+    return plot_and_save(*args, **kwargs)
+
+def fill_missing(job: Job, history: OperationLog, revision: int, df: pd.DataFrame, args: dict):
+    job.report(0.0, "calculando valores de preenchimento")
+    filled = fillna(df, **args, progress=lambda frac, col: job.report(frac, f"coluna {col}"))
+    return history, revision, args, filled
+
+def current_page() -> pd.DataFrame:
+    # ordenação feita no servidor sobre a visão filtrada; só a página vai ao navegador
+    view = st.session_state.df_view
+    sort = st.session_state.editor_sort
+    cached = st.session_state.view_order
+    if cached is None or cached[0] != sort:
+        by, asc = sort if sort else (None, True)
+        st.session_state.view_order = cached = (sort, sort_positions(view, by, asc))
+    return page_slice(view, st.session_state.editor_page, st.session_state.editor_page_size, cached[1])
 
 # ---------------------- CABEÇALHO ----------------------
+tracer.section("app:cabeçalho")
 st.markdown(
     """
     <div class="block-glass neon" style="margin-bottom:1rem;">
@@ -92,32 +231,129 @@ st.markdown(
 )
 
 # ---------------------- UPLOAD + LIMPAR ----------------------
-uploaded = st.file_uploader("📂 Envie um arquivo (.csv ou .xlsx)", type=["csv", "xlsx"])
+tracer.section("app:upload")
+uploaded = st.file_uploader("📂 Envie um ou mais arquivos (.csv ou .xlsx)", type=["csv", "xlsx"],
+                            accept_multiple_files=True)
+st.session_state.arrow_storage = st.toggle(
+    "Modo Arrow (menos memória)", value=st.session_state.arrow_storage,
+    help="Texto em string[pyarrow], texto repetitivo como categoria e inteiros compactados. "
+         "Mudar a opção recarrega o arquivo.",
+)
 
 left, right = st.columns([3, 1])
 with left:
-    if uploaded is not None:
-        df = load_file(uploaded)
-        df = convert_dtypes_safely(df)
-
-        st.session_state.df_master = df.copy()
-        st.session_state.orig_master = df.copy()
-        st.session_state.filters = None
-        recompute_view()
-
-        st.success(f"Arquivo carregado: {uploaded.name} — {df.shape[0]} linhas × {df.shape[1]} colunas")
-        autosave(st.session_state.df_master)
+    if uploaded:
+        workbooks = [f for f in uploaded if f.name.lower().endswith(".xlsx")]
+        sheet_choice = {}
+        for f in workbooks:
+            names = excel_sheets(f)
+            sheet_choice[f.name] = names[:1]
+            if len(names) > 1:
+                sheet_choice[f.name] = st.multiselect(f"Abas de {f.name}", names, default=names[:1],
+                                                      key=f"sheets_{f.name}")
+        n_tables = len(uploaded) - len(workbooks) + sum(max(len(v), 1) for v in sheet_choice.values())
+        combine = "Unir em uma tabela"
+        if n_tables > 1:
+            combine = st.radio("Várias tabelas", ["Unir em uma tabela", "Tabelas separadas"], horizontal=True)
+
+        table = None
+        if n_tables > 1 and combine != "Unir em uma tabela":
+            labels = [f.name for f in uploaded if f.name.lower().endswith(".csv")]
+            for f in workbooks:
+                for sheet in sheet_choice[f.name] or excel_sheets(f)[:1]:
+                    labels.append(table_label(f.name, sheet, len(workbooks)))
+            table = st.selectbox("Tabela", labels)
+
+        hashes = []
+        for f in uploaded:
+            # o hash do conteúdo é calculado uma vez por upload
+            file_id = getattr(f, "file_id", None) or f.name
+            if file_id not in st.session_state.upload_hashes:
+                st.session_state.upload_hashes[file_id] = upload_hash(f)
+            hashes.append(st.session_state.upload_hashes[file_id])
+        key = IngestCache.key(hashes, sheets=sheet_choice, combine=combine, table=table,
+                              arrow=st.session_state.arrow_storage)
+
+        # reruns com o mesmo upload não releem o arquivo nem descartam as edições
+        if key != st.session_state.loaded_key:
+            store = shared_datasets()
+            jobs = st.session_state.jobs
+            load_key = JobManager.key("load", key)
+            if st.session_state.load_job not in (None, load_key):
+                # o upload ou as opções mudaram no meio da leitura
+                jobs.forget(st.session_state.load_job)
+            job = jobs.job(load_key)
+            df = None
+            if job is None:
+                df = store.acquire(key, workspace.id)
+                if df is not None:
+                    st.info("Arquivo já lido antes: carregado do cache compartilhado.")
+                    st.session_state.schema_report = None   # tipos já vieram convertidos
+                else:
+                    # a leitura roda em segundo plano; o app continua respondendo
+                    job = jobs.submit(load_key, "Lendo arquivo", read_upload,
+                                      [upload_copy(f) for f in uploaded if f not in workbooks],
+                                      [upload_copy(f) for f in workbooks], sheet_choice, table,
+                                      st.session_state.arrow_storage)
+                    st.session_state.load_job = load_key
+            if job is not None and job.ok:
+                df, st.session_state.schema_report = job.result
+                jobs.forget(load_key)
+                st.session_state.load_job = None
+                # a versão lida é trocada pela compartilhada (mapeada do disco)
+                df = store.put(key, df, workspace.id)
+            elif job is not None and not job.done:
+                job_status(job)
+            elif job is not None:
+                if job.error:
+                    st.error(f"Falha ao ler o arquivo: {job.error}")
+                else:
+                    st.warning("Leitura cancelada.")
+                if st.button("Ler novamente"):
+                    jobs.forget(load_key)
+                    st.session_state.load_job = None
+                    st.rerun()
+
+            if df is not None:
+                store.release(st.session_state.loaded_key, workspace.id)
+                st.session_state.history = OperationLog(df)
+                st.session_state.df_master = st.session_state.history.current()
+                st.session_state.filters = None
+                recompute_view()
+                st.session_state.loaded_key = key
+                names = ", ".join(f.name for f in uploaded)
+                st.session_state.loaded_label = f"Arquivo carregado: {names} — {df.shape[0]} linhas × {df.shape[1]} colunas"
+                save_session()
+
+        if st.session_state.df_master is not None and st.session_state.loaded_label:
+            st.success(st.session_state.loaded_label)
+            if st.session_state.df_master.attrs.get("truncated"):
+                st.warning("Arquivo maior que o limite de memória: apenas as primeiras linhas foram carregadas.")
+            report = st.session_state.schema_report
+            if report is not None and report.columns:
+                before, after = report.bytes_before, report.bytes_after
+                saved = 1 - after / before if before else 0.0
+                with st.expander(f"🧬 Tipos detectados: {before / 1e6:,.1f} MB → {after / 1e6:,.1f} MB "
+                                 f"({saved:.0%} a menos)"):
+                    st.dataframe(report.to_frame().round(2), hide_index=True, use_container_width=True)
 
 with right:
     if st.session_state.df_master is not None:
         if st.button("🗑️ Limpar planilha", use_container_width=True):
+            shared_datasets().release(st.session_state.loaded_key, workspace.id)
             st.session_state.df_master = None
-            st.session_state.orig_master = None
+            st.session_state.history = None
             st.session_state.filters = None
             st.session_state.df_view = None
+            st.session_state.loaded_key = None
+            st.session_state.loaded_label = None
+            st.session_state.schema_report = None
+            st.session_state.fill_job = None
+            st.session_state.chart_job = None
             st.info("A planilha foi descartada. Faça um novo upload para continuar.")
 
 if st.session_state.df_master is None or st.session_state.df_view is None:
+    tracer.end_run()
     st.stop()
 
 # ---------------------- ABAS ----------------------
@@ -126,6 +362,7 @@ tab_edit, tab_stats, tab_charts, tab_export = st.tabs(
 )
 
 # ---------------------- EDITOR ----------------------
+tracer.section("app:editor")
 with tab_edit:
     st.subheader("Editor de Dados")
 
@@ -133,34 +370,81 @@ with tab_edit:
         df = st.session_state.df_master
         colnames = list(df.columns)
         fcol = st.selectbox("Coluna", colnames, index=0)
-        fop = st.selectbox("Condição", [
-            "É igual a", "É diferente de", "Maior que", "Menor que",
-            "Maior ou igual a", "Menor ou igual a", "Contém (texto)"
-        ])
-        fval = st.text_input("Valor")
+        fop = st.selectbox("Condição", list(FILTER_OPS))
+        op = FILTER_OPS[fop]
+        fval = st.text_input("Valor", disabled=op in ("isna", "notna"))
+        combine = "and" if st.radio("Combinar condições com", ["E", "OU"], horizontal=True) == "E" else "or"
+
+        conditions = (st.session_state.filters or {}).get("and") or (st.session_state.filters or {}).get("or") or []
+        if conditions and combine not in st.session_state.filters:
+            st.session_state.filters = {combine: conditions}
+            recompute_view()
+        for cond in conditions:
+            st.caption(f"• `{cond['col']}` {cond['op']} {cond.get('val', '')}")
 
         c1, c2 = st.columns(2)
         with c1:
-            if st.button("Aplicar filtro", use_container_width=True):
-                st.session_state.filters = {"col": fcol, "op": fop, "val": fval}
-                recompute_view()
+            if st.button("Adicionar condição", use_container_width=True):
+                if op in ("between", "isin", "notin"):
+                    val = [v.strip() for v in fval.split(";") if v.strip() != ""]
+                    if op == "between" and len(val) != 2:
+                        val = None
+                else:
+                    val = fval
+                if op in ("isna", "notna") or val:
+                    cond = {"col": fcol, "op": op}
+                    if op not in ("isna", "notna"):
+                        cond["val"] = val
+                    try:
+                        filter_engine(st.session_state.df_master).mask(cond)
+                    except ValueError as e:
+                        st.error(f"Filtro inválido: {e}")
+                    else:
+                        st.session_state.filters = {combine: conditions + [cond]}
+                        recompute_view()
+                        st.rerun()
         with c2:
             if st.button("Limpar filtro", use_container_width=True):
                 st.session_state.filters = None
                 recompute_view()
+                st.rerun()
 
     with st.expander("🧹 Limpeza de Dados"):
         fill_choice = st.selectbox("Preencher valores ausentes (NaN) com:",
                                    ["--", "Valor fixo", "Média", "Mediana", "Moda"])
         fill_value = st.text_input("Valor (se usar 'Valor fixo')", value="") if fill_choice == "Valor fixo" else None
-        if st.button("Aplicar preenchimento"):
+        jobs = st.session_state.jobs
+        if st.button("Aplicar preenchimento", disabled=st.session_state.fill_job is not None):
             strategy_map = {"Valor fixo": "value", "Média": "mean", "Mediana": "median", "Moda": "mode", "--": "value"}
-            st.session_state.df_master = fillna(st.session_state.df_master, strategy=strategy_map[fill_choice], value=fill_value)
-            recompute_view()
+            args = dict(strategy=strategy_map[fill_choice], value=fill_value)
+            history = st.session_state.history
+            # estatísticas sobre o master inteiro: roda em segundo plano sobre a versão atual
+            job = jobs.submit(JobManager.key("fillna", st.session_state.loaded_key, history.revision, **args),
+                              "Preenchendo valores ausentes", fill_missing,
+                              history, history.revision, history.current(), args)
+            st.session_state.fill_job = job.key
+        fill_job = jobs.job(st.session_state.fill_job) if st.session_state.fill_job else None
+        if fill_job is not None and not fill_job.done:
+            job_status(fill_job)
+        elif st.session_state.fill_job is not None:
+            jobs.forget(st.session_state.fill_job)
+            st.session_state.fill_job = None
+            if fill_job is not None and fill_job.ok:
+                history, revision, args, filled = fill_job.result
+                try:
+                    if history is not st.session_state.history:
+                        raise ValueError("outro arquivo foi carregado.")
+                    st.session_state.df_master = history.record("fillna", filled, revision, **args)
+                except ValueError as e:
+                    st.warning(f"Preenchimento descartado: {e}")
+                else:
+                    recompute_view()
+            elif fill_job is not None and fill_job.error:
+                st.error(f"Falha no preenchimento: {fill_job.error}")
 
         cols_to_drop = st.multiselect("Remover colunas", options=list(st.session_state.df_master.columns))
         if st.button("Remover colunas selecionadas"):
-            st.session_state.df_master = delete_columns(st.session_state.df_master, cols_to_drop)
+            st.session_state.df_master = st.session_state.history.apply("delete_columns", cols=cols_to_drop)
             recompute_view()
 
         idx_str = st.text_input("Remover linhas (índices separados por vírgula)", value="")
@@ -169,7 +453,7 @@ with tab_edit:
                 idxs = [int(i.strip()) for i in idx_str.split(",") if i.strip() != ""]
             except Exception:
                 idxs = []
-            st.session_state.df_master = delete_rows(st.session_state.df_master, idxs)
+            st.session_state.df_master = st.session_state.history.apply("delete_rows", index_list=idxs)
             recompute_view()
 
         mapping_str = st.text_input("Renomear colunas (ex.: Antiga->Nova;Outra->NovoNome)", value="")
@@ -179,75 +463,123 @@ with tab_edit:
             for p in pairs:
                 a, b = [x.strip() for x in p.split("->", 1)]
                 mapping[a] = b
-            st.session_state.df_master = rename_columns(st.session_state.df_master, mapping)
-            recompute_view()
+            try:
+                st.session_state.df_master = st.session_state.history.apply("rename_columns", mapping=mapping)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                recompute_view()
 
-        if st.button("⟲ Recarregar versão original"):
-            st.session_state.df_master = st.session_state.orig_master.copy()
-            recompute_view()
+        history = st.session_state.history
+        h1, h2, h3 = st.columns(3)
+        with h1:
+            if st.button("↶ Desfazer", disabled=not history.can_undo, use_container_width=True):
+                st.session_state.df_master = history.undo()
+                recompute_view()
+        with h2:
+            if st.button("↷ Refazer", disabled=not history.can_redo, use_container_width=True):
+                st.session_state.df_master = history.redo()
+                recompute_view()
+        with h3:
+            if st.button("⟲ Recarregar versão original", use_container_width=True):
+                st.session_state.df_master = history.reset()
+                recompute_view()
 
     st.caption("💡 Dica: você pode editar diretamente as células (clique duplo).")
-    view = st.session_state.df_view.copy()
-    view["__rowid__"] = view.index
+    n_view = len(st.session_state.df_view)
+    p1, p2, p3, p4 = st.columns([2, 1, 1, 1])
+    with p1:
+        sort_col = st.selectbox("Ordenar por", ["(sem ordenação)"] + list(st.session_state.df_view.columns))
+    with p2:
+        sort_asc = st.selectbox("Ordem", ["Crescente", "Decrescente"]) == "Crescente"
+    with p3:
+        st.session_state.editor_page_size = st.selectbox(
+            "Linhas por página", [50, 100, 500, 1000],
+            index=[50, 100, 500, 1000].index(st.session_state.editor_page_size)
+        )
+    n_pages = page_count(n_view, st.session_state.editor_page_size)
+    with p4:
+        st.session_state.editor_page = st.number_input(
+            f"Página (de {n_pages})", min_value=1, max_value=n_pages,
+            value=min(st.session_state.editor_page, n_pages), step=1
+        )
+    st.session_state.editor_sort = None if sort_col == "(sem ordenação)" else (sort_col, sort_asc)
 
-    edited = st.data_editor(
+    view = current_page()
+    row_ids = view.index.to_numpy()
+    editor_key = f"data_editor_{rows_signature(row_ids)}"
+
+    # o índice exibido é o id da linha no master; o retorno do editor não é
+    # usado, só o delta guardado no estado do widget
+    st.data_editor(
         view,
         use_container_width=True,
         num_rows="dynamic",
-        hide_index=True,
-        key="data_editor_view",
-        column_config={"__rowid__": st.column_config.NumberColumn("row_id", help="id", disabled=True)},
+        hide_index=False,
+        key=editor_key,
     )
 
-    edited = pd.DataFrame(edited)
-    if "__rowid__" in edited.columns:
-        old_rows = edited[edited["__rowid__"].notna()].copy()
-        if not old_rows.empty:
-            base_cols = [c for c in old_rows.columns if c != "__rowid__"]
-            st.session_state.df_master.loc[old_rows["__rowid__"].astype(int).values, base_cols] = old_rows[base_cols].values
-
-        new_rows = edited[edited["__rowid__"].isna()].drop(columns="__rowid__", errors="ignore")
-        if not new_rows.empty:
-            st.session_state.df_master = pd.concat([st.session_state.df_master, new_rows], ignore_index=True)
-
+    edits = st.session_state.editor_sync.collect(
+        editor_key, st.session_state.get(editor_key), st.session_state.df_master, row_ids
+    )
+    if edits:
+        before = st.session_state.df_master
+        st.session_state.df_master = st.session_state.history.apply("apply_edits", **edits)
+        st.session_state.column_stats.apply_edits(before, st.session_state.df_master, **edits)
         recompute_view()
+        st.toast(
+            f"{len(edits['cells'])} células alteradas, "
+            f"{len(edits['added'])} linhas adicionadas, {len(edits['deleted'])} removidas"
+        )
 
 # ---------------------- ESTATÍSTICAS ----------------------
+tracer.section("app:estatísticas")
 with tab_stats:
     st.subheader("📊 Estatísticas Dinâmicas")
     df = st.session_state.df_view
 
+    profiler = st.session_state.column_stats
+    profiler.approximate = st.toggle(
+        "Modo aproximado (colunas grandes)", value=profiler.approximate,
+        help="Usa sketches (HyperLogLog, KLL, Misra-Gries) para únicos, mediana e top-10 "
+             "em colunas com muitas linhas. Métricas aproximadas aparecem com ≈."
+    )
+
     c1, c2, c3 = st.columns(3)
     with c1: st.metric("Total de Linhas", df.shape[0])
     with c2: st.metric("Total de Colunas", df.shape[1])
-    with c3: st.metric("Valores Nulos", int(df.isna().sum().sum()))
+    with c3: st.metric("Valores Nulos", profiler.total_nulls(df))
 
     st.markdown("---")
 
     col = st.selectbox("Selecione uma coluna para explorar:", df.columns, key="col_selecionada")
     if col:
-        if pd.api.types.is_numeric_dtype(df[col]):
+        summary = profiler.column(df[col])
+        approx = "≈ " if summary.approximate else ""
+        if summary.numeric:
             st.write(f"### 🔢 Coluna Numérica: **{col}**")
             c1, c2, c3 = st.columns(3)
-            with c1: st.metric("Média", round(df[col].mean(), 2))
-            with c2: st.metric("Mediana", round(df[col].median(), 2))
-            with c3: st.metric("Desvio Padrão", round(df[col].std(), 2))
+            with c1: st.metric("Média", round(summary.mean, 2))
+            with c2: st.metric("Mediana", f"{approx}{round(summary.median, 2)}")
+            with c3: st.metric("Desvio Padrão", round(summary.std, 2))
             c4, c5, c6 = st.columns(3)
-            with c4: st.metric("Mínimo", round(df[col].min(), 2))
-            with c5: st.metric("Máximo", round(df[col].max(), 2))
-            with c6: st.metric("Valores Únicos", df[col].nunique())
+            with c4: st.metric("Mínimo", round(summary.min, 2) if summary.min is not None else "-")
+            with c5: st.metric("Máximo", round(summary.max, 2) if summary.max is not None else "-")
+            with c6: st.metric("Valores Únicos", f"{approx}{summary.nunique}")
             st.bar_chart(df[col].dropna(), use_container_width=True)
         else:
             st.write(f"### 🔤 Coluna Categórica: **{col}**")
             c1, c2 = st.columns(2)
-            with c1: st.metric("Valores Únicos", df[col].nunique())
-            top = df[col].mode().iloc[0] if not df[col].mode().empty else "-"
+            with c1: st.metric("Valores Únicos", f"{approx}{summary.nunique}")
+            top = summary.top if summary.top is not None else "-"
             with c2: st.metric("Valor Mais Frequente", str(top))
-            freq = df[col].value_counts()
-            if not freq.empty:
-                st.bar_chart(freq.head(10), use_container_width=True)
+            if not summary.top_counts.empty:
+                st.bar_chart(summary.top_counts, use_container_width=True)
+        if summary.approximate:
+            st.caption("≈ valores aproximados (sketches); as frequências do top-10 são estimativas.")
 
 # ---------------------- GRÁFICOS ----------------------
+tracer.section("app:gráficos")
 with tab_charts:
     st.subheader("📈 Gráficos")
     df = st.session_state.df_view
@@ -288,56 +620,82 @@ with tab_charts:
         if kind == "hist" and not pd.api.types.is_numeric_dtype(work_df[y_col]):
             st.error("Para histograma, selecione uma coluna numérica no eixo Y.")
         else:
-            chart_path = plot_and_save(
+            top = top_n if kind in ["bar", "line"] else None
+            # renderização em segundo plano; o mesmo gráfico pedido de novo reaproveita o job
+            chart_key = JobManager.key("chart", ChartCache.key(work_df, x_use, y_col, kind, agg, top))
+            job = st.session_state.jobs.submit(
+                chart_key, "Gerando gráfico", render_chart,
                 work_df, x_use, y_col,
                 kind=kind,
                 outdir=st.session_state.cache_dir,
                 agg=agg,
-                top_n=top_n if kind in ["bar", "line"] else None
+                top_n=top,
+                cache=st.session_state.chart_cache,
+                groups=st.session_state.group_engine,
             )
-            st.image(chart_path, caption=os.path.basename(chart_path), use_container_width=True)
+            st.session_state.chart_job = job.key
+
+    chart_job = st.session_state.jobs.job(st.session_state.chart_job) if st.session_state.chart_job else None
+    if chart_job is not None and not chart_job.done:
+        job_status(chart_job)
+    elif chart_job is not None and chart_job.ok:
+        st.image(chart_job.result, caption=os.path.basename(chart_job.result), use_container_width=True)
+    elif chart_job is not None and chart_job.error:
+        st.error(f"Falha ao gerar o gráfico: {chart_job.error}")
 
 # ---------------------- EXPORTAR ----------------------
+tracer.section("app:exportar")
 with tab_export:
     st.subheader("💾 Exportar Dados")
-    c1, c2, c3 = st.columns(3)
-
-    with c1:
-        st.download_button(
-            "Exportar como CSV",
-            data=save_csv(st.session_state.df_view),
-            file_name="dataflow_export.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
-
-    with c2:
-        st.download_button(
-            "Exportar como Excel (XLSX)",
-            data=save_xlsx(st.session_state.df_view),
-            file_name="dataflow_export.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
-
-    with c3:
-        if st.button("Gerar PDF", use_container_width=True):
-            charts = []
-            if os.path.exists(st.session_state.cache_dir):
-                charts = [
-                    os.path.join(st.session_state.cache_dir, f)
-                    for f in os.listdir(st.session_state.cache_dir)
-                    if f.lower().endswith(".png")
-                ]
-            pdf_path = export_pdf(st.session_state.df_view, charts, st.session_state.cache_dir)
-            with open(pdf_path, "rb") as f:
-                st.download_button(
-                    "📄 Baixar Relatório PDF",
-                    data=f.read(),
-                    file_name="dataflow_relatorio.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+    pdf_rows = st.number_input(
+        "Linhas da tabela no PDF", min_value=0, max_value=max(len(st.session_state.df_view), 1),
+        value=min(30, len(st.session_state.df_view)), step=100,
+    )
+    export_options = {
+        # só os gráficos gerados nesta sessão, na ordem em que foram pedidos
+        "pdf": dict(charts=st.session_state.chart_cache.session_charts(), max_rows=int(pdf_rows),
+                    approximate=st.session_state.column_stats.approximate),
+    }
+
+    polling = st.session_state.exports.running()
+
+    @st.fragment(run_every=1 if polling else None)
+    def export_panel():
+        # nada é gerado até o usuário pedir; o arquivo pronto fica em cache
+        # enquanto os dados visíveis não mudarem
+        pipeline = st.session_state.exports
+        view = st.session_state.df_view
+        version = frame_fingerprint(view)
+        cols = st.columns(len(EXPORT_FORMATS))
+        for col, fmt in zip(cols, EXPORT_FORMATS.values()):
+            options = export_options.get(fmt.name, {})
+            with col:
+                job = pipeline.job(version, fmt.name, **options)
+                if job is not None and job.ready:
+                    with open(job.path, "rb") as f:
+                        st.download_button(
+                            f"⬇️ Baixar {fmt.label}", data=f.read(),
+                            file_name=f"dataflow_export.{fmt.extension}", mime=fmt.mime,
+                            key=f"download_{fmt.name}", use_container_width=True,
+                        )
+                elif job is not None and not job.done:
+                    st.progress(job.progress, text=f"Gerando {fmt.label}…")
+                    if st.button("Cancelar", key=f"cancel_export_{fmt.name}", use_container_width=True):
+                        job.cancel()
+                        st.rerun()
+                else:
+                    if job is not None and job.error:
+                        st.error(f"Falha ao gerar {fmt.label}: {job.error}")
+                    if st.button(f"Gerar {fmt.label}", key=f"export_{fmt.name}", use_container_width=True):
+                        pipeline.submit(view, version, fmt.name, **options)
+                        st.rerun()
+        if polling and not pipeline.running():
+            # última geração terminou: rerun completo para parar o polling
+            st.rerun()
+
+    export_panel()
 
 # autosave do master
-autosave(st.session_state.df_master)
+tracer.section("app:autosave")
+save_session()
+tracer.end_run()
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# Datasets sintéticos reprodutíveis (semente fixa) para os benchmarks.
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SHAPES = {"narrow": 1, "wide": 10}          # repetições do bloco base de 6 colunas
+MIXES = ("numeric", "strings")
+
+CITIES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Recife",
+          "Porto Alegre", "Salvador", "Fortaleza", "Manaus", "Goiânia"]
+
+def _numeric_block(rows: int, rng: np.random.Generator, i: int) -> dict:
+    valor = rng.gamma(2.0, 150.0, rows).round(2)
+    valor[rng.random(rows) < 0.05] = np.nan
+    return {
+        f"id_{i}": np.arange(rows, dtype=np.int64),
+        f"valor_{i}": valor,
+        f"quantidade_{i}": rng.integers(0, 500, rows),
+        f"cidade_{i}": rng.choice(CITIES, rows),
+        f"data_{i}": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1_500, rows), unit="D"),
+        f"taxa_{i}": rng.random(rows),
+    }
+
+def _string_block(rows: int, rng: np.random.Generator, i: int) -> dict:
+    codes = rng.integers(0, max(rows // 3, 1), rows)
+    texto = np.char.add("pedido ", codes.astype(str))
+    cidade = rng.choice(CITIES + [None], rows)
+    return {
+        f"id_{i}": np.arange(rows, dtype=np.int64),
+        f"valor_{i}": rng.gamma(2.0, 150.0, rows).round(2),
+        f"cidade_{i}": cidade,
+        f"cliente_{i}": np.char.add("cliente ", rng.integers(0, 5_000, rows).astype(str)),
+        f"descricao_{i}": texto,
+        f"status_{i}": rng.choice(["aberto", "pago", "cancelado", "devolvido"], rows),
+    }
+
+def make_frame(rows: int, shape: str = "narrow", mix: str = "numeric", seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    block = _numeric_block if mix == "numeric" else _string_block
+    columns: dict = {}
+    for i in range(SHAPES[shape]):
+        columns.update(block(rows, rng, i))
+    df = pd.DataFrame(columns)
+    # texto como object, como sai do read_csv
+    for col in df.columns:
+        if df[col].dtype.kind == "U":
+            df[col] = df[col].astype(object)
+    return df
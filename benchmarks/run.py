@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import fnmatch
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.cases import CASES, Case, Workspace, cleanup, uncovered
+from benchmarks.datasets import MIXES, SCALES, SHAPES, make_frame
+
+# Benchmarks das funções públicas de `dataflow` sobre datasets sintéticos.
+#
+#   python -m benchmarks.run                          # 10k, todos os formatos
+#   python -m benchmarks.run --scales 10k,1m --only "data_manager.*"
+#   python -m benchmarks.run --save-baseline          # grava benchmarks/baseline.json
+#
+# Para cada caso × cenário (escala, largura, tipo de dado) mede o melhor
+# tempo de `--repeat` execuções e o pico de memória alocada (tracemalloc,
+# numa execução à parte para não distorcer o tempo). O resultado vai para
+# benchmarks/results/<data>.json e é comparado com o baseline: a saída é 1
+# se algum caso ficar mais lento/pesado que o limite.
+#
+# O tracemalloc vê as alocações do Python e do NumPy; buffers do pool do
+# Arrow não entram no pico.
+
+ROOT = Path(__file__).resolve().parent
+BASELINE = ROOT / "baseline.json"
+RESULTS = ROOT / "results"
+
+TIME_THRESHOLD = 0.25       # +25% de tempo
+MEMORY_THRESHOLD = 0.25     # +25% de pico de memória
+MIN_TIME_DELTA = 0.005      # diferenças abaixo disso (s) são ruído
+MIN_MEMORY_DELTA = 1 << 20  # idem (bytes)
+
+def _measure(case: Case, ws: Workspace, repeat: int) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        call = case.setup(ws)
+        gc.collect()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    call = case.setup(ws)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "median_seconds": float(np.median(times)), "peak_bytes": peak,
+            "rows": ws.rows}
+
+def run(scales: List[str], shapes: List[str], mixes: List[str], patterns: List[str],
+        repeat: int) -> Dict[str, Dict[str, Any]]:
+    pd.set_option("mode.copy_on_write", True)    # como no app
+    selected = [c for name, c in CASES.items() if any(fnmatch.fnmatch(name, p) for p in patterns)]
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="dataflow-bench-") as tmp:
+        for scale in scales:
+            for shape in shapes:
+                for mix in mixes:
+                    scenario = f"{scale}-{shape}-{mix}"
+                    print(f"\n== {scenario}: gerando {SCALES[scale]:,} linhas".replace(",", "."), flush=True)
+                    ws = Workspace(make_frame(SCALES[scale], shape, mix), Path(tmp) / scenario)
+                    for case in selected:
+                        key = f"{case.name}[{scenario}]"
+                        try:
+                            results[key] = _measure(case, ws.limit(case.max_cells), repeat)
+                        except Exception as e:
+                            results[key] = {"error": f"{type(e).__name__}: {e}"}
+                            print(f"  {case.name:<40} ERRO {results[key]['error']}", flush=True)
+                            continue
+                        r = results[key]
+                        print(f"  {case.name:<40} {r['seconds'] * 1000:10.1f} ms "
+                              f"{r['peak_bytes'] / 2**20:10.1f} MB", flush=True)
+                    del ws
+                    gc.collect()
+    cleanup()
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            time_threshold: float = TIME_THRESHOLD,
+            memory_threshold: float = MEMORY_THRESHOLD) -> List[str]:
+    """Regressões em relação ao baseline (casos sem baseline são ignorados)."""
+    regressions = []
+    for key, new in sorted(results.items()):
+        old = baseline.get(key)
+        if old is None or "error" in old:
+            continue
+        if "error" in new:
+            regressions.append(f"{key}: falhou ({new['error']})")
+            continue
+        dt = new["seconds"] - old["seconds"]
+        if dt > MIN_TIME_DELTA and new["seconds"] > old["seconds"] * (1 + time_threshold):
+            regressions.append(f"{key}: tempo {old['seconds'] * 1000:.1f} -> {new['seconds'] * 1000:.1f} ms "
+                               f"(+{dt / old['seconds']:.0%})")
+        dm = new["peak_bytes"] - old["peak_bytes"]
+        if dm > MIN_MEMORY_DELTA and new["peak_bytes"] > old["peak_bytes"] * (1 + memory_threshold):
+            regressions.append(f"{key}: memória {old['peak_bytes'] / 2**20:.1f} -> "
+                               f"{new['peak_bytes'] / 2**20:.1f} MB (+{dm / max(old['peak_bytes'], 1):.0%})")
+    return regressions
+
+def _environment() -> Dict[str, Any]:
+    import pyarrow
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "pandas": pd.__version__, "numpy": np.__version__, "pyarrow": pyarrow.__version__}
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmarks do dataflow.")
+    parser.add_argument("--scales", default="10k", help=f"escalas separadas por vírgula ({', '.join(SCALES)})")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="narrow, wide")
+    parser.add_argument("--mixes", default=",".join(MIXES), help="numeric, strings")
+    parser.add_argument("--only", default="*", help="padrões de nome dos casos (ex.: 'stats.*,groupby.*')")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por caso (vale o melhor tempo)")
+    parser.add_argument("--baseline", default=str(BASELINE), help="arquivo de baseline")
+    parser.add_argument("--output", help="arquivo de resultado (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument("--threshold", type=float, default=TIME_THRESHOLD, help="regressão de tempo tolerada (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD, help="regressão de memória tolerada")
+    parser.add_argument("--save-baseline", action="store_true", help="grava o resultado como novo baseline")
+    args = parser.parse_args(argv)
+
+    for value, valid, label in ((args.scales, SCALES, "escala"), (args.shapes, SHAPES, "largura"),
+                                (args.mixes, MIXES, "tipo")):
+        unknown = [v for v in _split(value) if v not in valid]
+        if unknown:
+            parser.error(f"{label} desconhecida: {', '.join(unknown)}")
+
+    missing = uncovered()
+    if missing:
+        print(f"Aviso: funções públicas sem benchmark: {', '.join(missing)}", file=sys.stderr)
+
+    results = run(_split(args.scales), _split(args.shapes), _split(args.mixes), _split(args.only), args.repeat)
+    payload = {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+               "environment": _environment(), "results": results}
+
+    output = Path(args.output) if args.output else RESULTS / f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"\nResultado salvo em {output}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        # mescla: cenários não executados agora continuam no baseline
+        previous = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        merged = {**previous.get("results", {}), **results}
+        baseline_path.write_text(json.dumps({**payload, "results": merged}, indent=2), encoding="utf-8")
+        print(f"Baseline atualizado: {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print("Sem baseline para comparar (use --save-baseline).")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline.get("results", {}), args.threshold, args.memory_threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima do limite:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nSem regressões em relação ao baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import argparse
+import sys
+
+from dataflow.pipeline import load_spec, run_pipeline
+
+def _print_result(result: dict) -> None:
+    if result.get("error"):
+        print(f"✗ {result['file']}: {result['error']}", flush=True)
+        return
+    mode = "streaming" if result["streamed"] else "completo"
+    stages = "  ".join(f"{name} {secs:.2f}s" for name, secs in result["stages"].items())
+    print(f"✓ {result['file']}: {result['rows']:,} linhas ({mode}) em {result['total']:.2f}s — {stages}", flush=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m dataflow", description="DataFlow sem interface.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="executa um pipeline (JSON ou YAML)")
+    run.add_argument("pipeline", help="arquivo do pipeline")
+    run.add_argument("inputs", nargs="*", help="arquivos de entrada (substituem `inputs` do pipeline)")
+    run.add_argument("-o", "--output", help="pasta de saída (substitui `output`)")
+    run.add_argument("-w", "--workers", type=int, help="processos em paralelo")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_spec(args.pipeline)
+    except (OSError, ValueError) as e:
+        print(f"Erro no pipeline: {e}", file=sys.stderr)
+        return 2
+    if args.inputs:
+        spec["inputs"] = args.inputs
+    if args.output:
+        spec["output"] = args.output
+
+    try:
+        results = run_pipeline(spec, workers=args.workers, on_result=_print_result)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    totals = {}
+    for result in results:
+        for name, secs in result["stages"].items():
+            totals[name] = totals.get(name, 0.0) + secs
+    failed = sum(1 for r in results if r.get("error"))
+    rows = sum(r["rows"] for r in results)
+    print(f"\n{len(results) - failed}/{len(results)} arquivos, {rows:,} linhas")
+    for name, secs in sorted(totals.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<14} {secs:8.2f}s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
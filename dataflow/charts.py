@@ -1,47 +1,229 @@
 import os
+import hashlib
+import json
+import threading
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import matplotlib.dates as mdates
+from matplotlib.colors import LogNorm
 
-def _aggregate_for_plot(df: pd.DataFrame, x: str, y: str, kind: str, agg: str):
+from dataflow.fingerprint import frame_fingerprint
+from dataflow.groupby import GroupByEngine, top_positions
+from dataflow.profiling import traced
+
+CHART_CACHE_MB = 200           # teto de disco do cache de gráficos
+LARGE_PLOT_POINTS = 50_000     # acima disso linha/dispersão usam o modo de dados grandes
+PLOT_DPI = 100
+
+class ChartCache:
+    """
+    Cache de gráficos endereçado por conteúdo.
+
+    A chave é o hash da versão dos dados usados (colunas x/y) e da
+    especificação do gráfico; pedidos idênticos devolvem o PNG já gerado.
+    Quando o diretório passa de `max_bytes`, os PNGs menos usados recentemente
+    (mtime, atualizado a cada acerto) são removidos. `session_charts` lista
+    os gráficos pedidos por esta instância, na ordem em que foram gerados.
+    """
+
+    def __init__(self, outdir: str, max_bytes: int = CHART_CACHE_MB * 1024 * 1024):
+        self.outdir = outdir
+        self.max_bytes = max_bytes
+        self._session: list[str] = []
+        self._lock = threading.Lock()
+        os.makedirs(outdir, exist_ok=True)
+
+    @staticmethod
+    def key(df: pd.DataFrame, x: str, y: str, kind: str, agg: str, top_n: int | None) -> str:
+        spec = json.dumps([x, y, kind, agg, top_n], default=str)
+        data = frame_fingerprint(df, [x, y])
+        return hashlib.blake2b(f"{data}|{spec}".encode(), digest_size=12).hexdigest()
+
+    def path_for(self, key: str, kind: str) -> str:
+        return os.path.join(self.outdir, f"chart_{kind}_{key}.png")
+
+    def get(self, path: str) -> str | None:
+        if not os.path.exists(path):
+            self._forget(path)
+            return None
+        os.utime(path)  # marca como usado recentemente
+        self._remember(path)
+        return path
+
+    def put(self, path: str) -> str:
+        self._remember(path)
+        self._evict()
+        return path
+
+    def _remember(self, path: str) -> None:
+        with self._lock:
+            if path in self._session:
+                self._session.remove(path)
+            self._session.append(path)
+
+    def _forget(self, path: str) -> None:
+        with self._lock:
+            if path in self._session:
+                self._session.remove(path)
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.outdir):
+            if name.startswith("chart_") and name.endswith(".png"):
+                full = os.path.join(self.outdir, name)
+                try:
+                    st = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def session_charts(self) -> list[str]:
+        # arquivos apagados (evicção ou limpeza da pasta da sessão) saem da lista
+        with self._lock:
+            self._session = [p for p in self._session if os.path.exists(p)]
+            return list(self._session)
+
+def _aggregate_for_plot(df: pd.DataFrame, x: str, y: str, kind: str, agg: str,
+                        groups: GroupByEngine | None = None):
     if kind in ("hist", "scatter") or agg == "none":
         return df, x, y
     if x is None or x not in df.columns:
         return df, x, y
+    groups = groups or GroupByEngine()
     if agg == "count":
-        grouped = df.groupby(x).size().reset_index(name="Contagem")
+        grouped = groups.aggregate(df[x], None, "count").reset_index()
         return grouped, x, "Contagem"
     if y not in df.columns:
         return df, x, y
-    grouped = df.groupby(x)[y].agg(agg).reset_index()
+    grouped = groups.aggregate(df[x], df[y], agg).reset_index()
     return grouped, x, y
 
-def plot_and_save(df: pd.DataFrame, x: str, y: str, kind: str, outdir: str, agg: str = "none", top_n: int = None):
+@traced
+def minmax_decimate(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Posições que preservam o desenho de uma série longa: o mínimo e o máximo
+    de cada bucket (um bucket por pixel), em ordem.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    lo = base + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    hi = base + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+    pos = np.unique(np.concatenate([lo, hi]))
+    return pos[pos < n]
+
+def _numeric_axis(s: pd.Series) -> tuple[np.ndarray, np.ndarray | None]:
+    # valores para eixo: números/datas como estão, demais viram códigos
+    if pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype="float64", na_value=np.nan), None
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.to_numpy(), None
+    codes, uniques = pd.factorize(s)
+    return np.where(codes < 0, np.nan, codes).astype("float64"), np.asarray(uniques)
+
+def _density_scatter(ax, x: pd.Series, y: pd.Series, width: float, height: float) -> None:
+    # raster 2D: custo limitado pela resolução de saída, não pelo nº de linhas
+    xs, labels = _numeric_axis(x)
+    is_date = np.issubdtype(xs.dtype, np.datetime64)
+    if is_date:
+        xs = np.where(pd.isna(xs), np.nan, mdates.date2num(xs))
+    ys = y.to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~(np.isnan(xs) | np.isnan(ys))
+    bins = [int(width * PLOT_DPI / 2), int(height * PLOT_DPI / 2)]
+    x_range = None
+    if labels is not None and len(labels) < bins[0]:
+        # uma coluna do raster por categoria, centrada no código
+        bins[0] = len(labels)
+        x_range = (-0.5, len(labels) - 0.5)
+    xs, ys = xs[ok], ys[ok]
+    if not len(xs):
+        return
+    y_range = (ys.min(), ys.max())
+    x_range = x_range or (xs.min(), xs.max())
+    counts, xedges, yedges = np.histogram2d(xs, ys, bins=bins, range=[x_range, y_range])
+    image = ax.imshow(
+        counts.T, origin="lower", aspect="auto", cmap="viridis",
+        extent=(xedges[0], xedges[-1], yedges[0], yedges[-1]),
+        norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)),
+    )
+    ax.figure.colorbar(image, ax=ax, label="pontos")
+    if is_date:
+        ax.xaxis_date()
+    if labels is not None and len(labels) <= 50:
+        ax.set_xticks(np.arange(len(labels)))
+        ax.set_xticklabels([str(v) for v in labels], rotation=45, ha="right")
+
+@traced
+def plot_and_save(df: pd.DataFrame, x: str, y: str, kind: str, outdir: str, agg: str = "none", top_n: int = None,
+                  cache: ChartCache | None = None, groups: GroupByEngine | None = None):
     os.makedirs(outdir, exist_ok=True)
-    df_plot, x_col, y_col = _aggregate_for_plot(df, x, y, kind, agg)
+    cache = cache or ChartCache(outdir)
+    path = cache.path_for(ChartCache.key(df, x, y, kind, agg, top_n), kind)
+    if cache.get(path):
+        return path
+
+    df_plot, x_col, y_col = _aggregate_for_plot(df, x, y, kind, agg, groups)
 
     if kind in ("bar", "line") and agg != "none" and top_n and x_col in df_plot.columns and y_col in df_plot.columns:
-        df_plot = df_plot.sort_values(by=y_col, ascending=False).head(int(top_n))
+        values = df_plot[y_col].to_numpy(dtype="float64", na_value=np.nan)
+        df_plot = df_plot.iloc[top_positions(values, int(top_n))]
 
-    width = 7
-    if kind in ("bar", "line") and x_col in df_plot.columns:
+    large = kind in ("line", "scatter") and len(df_plot) > LARGE_PLOT_POINTS
+    width, height = 7, 5
+    if large:
+        width = 14
+    elif kind in ("bar", "line") and x_col in df_plot.columns:
         ncat = len(df_plot[x_col].unique())
         width = min(14, max(7, ncat * 0.4))
 
-    fig, ax = plt.subplots(figsize=(width, 5))
+    # Figure direto (sem pyplot): o gráfico pode ser gerado num job em segundo plano
+    fig = Figure(figsize=(width, height), dpi=PLOT_DPI)
+    ax = fig.subplots()
 
     title = kind.upper()
     if agg != "none" and kind in ("bar", "line"):
         title += f" ({agg.upper()})"
     title += f" — {y_col if y_col else y} x {x_col if x_col else x}"
+    if large:
+        title += " [densidade]" if kind == "scatter" else f" [reduzido de {len(df_plot):,} pontos]"
     ax.set_title(title)
 
-    if kind == "line":
+    if kind == "line" and large:
+        if x_col and y_col:
+            ys = df_plot[y_col].to_numpy(dtype="float64", na_value=np.nan)
+            pos = minmax_decimate(ys, int(width * PLOT_DPI))
+            xs = df_plot[x_col].iloc[pos]
+            if not (pd.api.types.is_numeric_dtype(xs) or pd.api.types.is_datetime64_any_dtype(xs)):
+                xs = pos
+            ax.plot(xs, ys[pos], label=y_col, linewidth=0.8)
+            ax.set_xlabel(x_col)
+            ax.legend()
+    elif kind == "line":
         if x_col and y_col:
             df_plot.plot(x=x_col, y=y_col, kind="line", ax=ax, legend=True)
     elif kind == "bar":
         if x_col and y_col:
             df_plot.plot(x=x_col, y=y_col, kind="bar", ax=ax, legend=True)
             ax.tick_params(axis="x", labelrotation=45)
+    elif kind == "scatter" and large:
+        _density_scatter(ax, df_plot[x_col], df_plot[y_col], width, height)
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
     elif kind == "scatter":
         x_series = df_plot[x_col]
         if not pd.api.types.is_numeric_dtype(x_series):
@@ -54,8 +236,9 @@ def plot_and_save(df: pd.DataFrame, x: str, y: str, kind: str, outdir: str, agg:
     elif kind == "hist":
         df_plot[y_col].plot(kind="hist", bins=20, ax=ax)
 
-    path = os.path.join(outdir, f"chart_{kind}_{agg}.png")
-    plt.tight_layout()
-    plt.savefig(path, bbox_inches="tight")
-    plt.close(fig)
-    return path
+    fig.tight_layout()
+    # grava em arquivo temporário: outra sessão pode estar lendo o mesmo PNG
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    fig.savefig(tmp, bbox_inches="tight", format="png")
+    os.replace(tmp, path)
+    return cache.put(path)
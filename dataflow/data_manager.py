@@ -1,49 +1,637 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+import contextlib
+import csv
+import datetime
+import hashlib
+import importlib.util
 import io
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+
+from dataflow.profiling import traced
 
 SESSION_DIR = Path(".dataflow_session")
 SESSION_DIR.mkdir(exist_ok=True)
 
-def load_file(uploaded_file) -> pd.DataFrame:
+CHUNK_ROWS = 250_000          # linhas por bloco na leitura de CSV
+SNIFF_BYTES = 64 * 1024       # amostra usada para detectar o separador
+MEMORY_BUDGET_MB = 2048       # teto de memória do DataFrame carregado
+
+ProgressFn = Callable[[float, int], None]
+
+def _sniff_sep(buffer) -> str:
+    sample = buffer.read(SNIFF_BYTES)
+    buffer.seek(0)
+    if isinstance(sample, bytes):
+        sample = sample.decode("utf-8", errors="ignore")
+    # descarta a última linha, que provavelmente veio cortada
+    lines = sample.splitlines()
+    if len(lines) > 1:
+        sample = "\n".join(lines[:-1])
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+def _stream_size(buffer) -> int | None:
+    size = getattr(buffer, "size", None)
+    if size:
+        return int(size)
+    try:
+        pos = buffer.tell()
+        size = buffer.seek(0, os.SEEK_END)
+        buffer.seek(pos)
+        return size
+    except Exception:
+        return None
+
+@traced
+def downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    # só inteiros: reduzir float para float32 perderia precisão em valores monetários
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_integer_dtype(s) and isinstance(s.dtype, np.dtype):
+            kind = "unsigned" if len(s) and s.min() >= 0 else "integer"
+            df[col] = pd.to_numeric(s, downcast=kind)
+    return df
+
+ARROW_CATEGORY_MAX_RATIO = 0.5  # texto com até 50% de valores distintos vira categoria
+
+def to_arrow_text(s: pd.Series, category_max_ratio: float) -> pd.Series:
+    codes, uniques = pd.factorize(s)
+    if len(uniques) > category_max_ratio * len(s):
+        return s.astype("string[pyarrow]")
+    # categoria: códigos inteiros + dicionário de strings Arrow, em ordem alfabética
+    cats = pd.Index(uniques).astype("string[pyarrow]")
+    order = cats.argsort()
+    rank = np.empty(len(order), dtype=codes.dtype)
+    rank[order] = np.arange(len(order))
+    codes = np.where(codes >= 0, rank[codes], -1)
+    dtype = pd.CategoricalDtype(cats[order])
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), index=s.index, name=s.name)
+
+def iter_csv_chunks(buffer, chunk_rows: int = CHUNK_ROWS, **read_options) -> Iterator[pd.DataFrame]:
+    # blocos de `chunk_rows` linhas, com separador detectado e inteiros compactados;
+    # `read_options` vai para o pd.read_csv (ex.: usecols)
+    sep = _sniff_sep(buffer)
+    reader = pd.read_csv(buffer, encoding="utf-8", sep=sep, engine="c",
+                         chunksize=chunk_rows, low_memory=False, **read_options)
+    with reader:
+        for chunk in reader:
+            yield downcast_numeric(chunk)
+
+@traced
+def read_csv_chunked(buffer, progress: Optional[ProgressFn] = None,
+                     chunk_rows: int = CHUNK_ROWS,
+                     memory_budget_mb: float = MEMORY_BUDGET_MB) -> pd.DataFrame:
+    total = _stream_size(buffer)
+    budget = memory_budget_mb * 1024 * 1024
+
+    chunks, used, rows = [], 0, 0
+    truncated = False
+    reader = iter_csv_chunks(buffer, chunk_rows)
+    with contextlib.closing(reader):
+        for chunk in reader:
+            used += int(chunk.memory_usage(deep=True).sum())
+            chunks.append(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                done = buffer.tell() / total if total else 0.0
+                progress(min(done, 1.0), rows)
+            if used >= budget:
+                truncated = True
+                break
+
+    if not chunks:
+        df = pd.DataFrame()
+    else:
+        df = pd.concat(chunks, ignore_index=True, copy=False) if len(chunks) > 1 else chunks[0]
+    if progress is not None and not truncated:
+        progress(1.0, rows)
+    # o app avisa o usuário quando o teto de memória interrompeu a leitura
+    df.attrs["truncated"] = truncated
+    return df
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+def _source_name(source) -> str:
+    return os.path.basename(getattr(source, "name", None) or str(source))
+
+@traced
+def excel_sheets(source) -> list[str]:
+    # lê só o índice do pacote (xl/workbook.xml), sem abrir nenhuma planilha
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as z, z.open("xl/workbook.xml") as f:
+        root = ElementTree.parse(f).getroot()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return [el.get("name") for el in root.iter(f"{_XLSX_NS}sheet")]
+
+def excel_engine() -> str:
+    # calamine (Rust) é bem mais rápido que o openpyxl; opcional
+    return "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+def _read_sheet(path: str, sheet: str, engine: str) -> pd.DataFrame:
+    return downcast_numeric(pd.read_excel(path, sheet_name=sheet, engine=engine))
+
+@contextlib.contextmanager
+def _local_path(source):
+    # os processos de leitura abrem o arquivo pelo caminho; uploads vão para
+    # um arquivo temporário uma única vez, em vez de serem copiados por aba
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(dir=SESSION_DIR, suffix=".xlsx", delete=False) as tmp:
+        shutil.copyfileobj(source, tmp)
+    source.seek(0)
+    try:
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+def table_label(file_name: str, sheet: str, n_files: int) -> str:
+    return sheet if n_files == 1 else f"{file_name} › {sheet}"
+
+# processos novos (forkserver/spawn) em vez de fork: o app e os jobs têm
+# threads rodando, e um fork herdaria locks presos por elas
+_PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+@traced
+def load_excel(sources: list, sheets: Optional[Dict[str, list[str]]] = None,
+               progress: Optional[ProgressFn] = None,
+               max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Lê abas de um ou mais arquivos XLSX, em paralelo (uma aba por processo).
+
+    Args:
+        sources: arquivos enviados ou caminhos.
+        sheets: abas a ler por nome de arquivo; por padrão, a primeira de cada.
+        progress: recebe (fração de abas lidas, linhas lidas).
+
+    Returns:
+        dict nome -> DataFrame, na ordem pedida. O nome é a aba, ou
+        "arquivo › aba" quando há mais de um arquivo.
+    """
+    engine = excel_engine()
+    with contextlib.ExitStack() as stack:
+        tasks = []
+        for source in sources:
+            name = _source_name(source)
+            wanted = (sheets or {}).get(name) or excel_sheets(source)[:1]
+            path = stack.enter_context(_local_path(source))
+            for sheet in wanted:
+                label = table_label(name, sheet, len(sources))
+                taken = {t[0] for t in tasks}
+                base, n = label, 2
+                while label in taken:
+                    # dois uploads com o mesmo nome de arquivo
+                    label, n = f"{base} ({n})", n + 1
+                tasks.append((label, path, sheet))
+
+        results: Dict[str, pd.DataFrame] = {}
+        rows = 0
+        if len(tasks) == 1:
+            label, path, sheet = tasks[0]
+            results[label] = _read_sheet(path, sheet, engine)
+            rows = len(results[label])
+        else:
+            workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_PROCESS_CONTEXT) as pool:
+                futures = {pool.submit(_read_sheet, path, sheet, engine): label for label, path, sheet in tasks}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    results[futures[future]] = future.result()
+                    rows += len(results[futures[future]])
+                    if progress is not None:
+                        progress(done / len(tasks), rows)
+        if progress is not None:
+            progress(1.0, rows)
+    return {label: results[label] for label, _, _ in tasks}
+
+@traced
+def union_tables(tables: Dict[str, pd.DataFrame], source_col: str = "_origem") -> pd.DataFrame:
+    # empilha as tabelas alinhando colunas pelo nome; `source_col` guarda a origem de cada linha
+    frames = [df.assign(**{source_col: pd.Categorical([label] * len(df), categories=list(tables))})
+              for label, df in tables.items()]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True, copy=False)
+
+@traced
+def load_file(uploaded_file, progress: Optional[ProgressFn] = None,
+              memory_budget_mb: float = MEMORY_BUDGET_MB) -> pd.DataFrame:
     name = uploaded_file.name.lower()
     if name.endswith(".csv"):
-        # auto-detect separador
-        return pd.read_csv(uploaded_file, encoding="utf-8", sep=None, engine="python")
+        return read_csv_chunked(uploaded_file, progress=progress, memory_budget_mb=memory_budget_mb)
     if name.endswith(".xlsx"):
-        return pd.read_excel(uploaded_file)
+        return next(iter(load_excel([uploaded_file], progress=progress).values()))
     raise ValueError("Formato não suportado. Envie .csv ou .xlsx.")
 
+EXPORT_CHUNK_ROWS = 100_000   # linhas por bloco na escrita de CSV/XLSX
+EXCEL_MAX_ROWS = 1_048_576    # limite de linhas por planilha do Excel (com cabeçalho)
+
+WriteProgressFn = Callable[[float, int], None]
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS,
+             progress: Optional[WriteProgressFn] = None) -> Iterator[bytes]:
+    # cada bloco passa inteiro pelo writer em C do pandas e é codificado de uma
+    # vez; em memória fica só o bloco atual, nunca o arquivo todo
+    yield df.iloc[:0].to_csv(index=False).encode("utf-8")
+    total = len(df)
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        yield df.iloc[start:stop].to_csv(index=False, header=False).encode("utf-8")
+        if progress is not None:
+            progress(stop / total, stop)
+
+def _open_output(out: str | os.PathLike | BinaryIO):
+    if isinstance(out, (str, os.PathLike)):
+        return open(out, "wb")
+    return contextlib.nullcontext(out)
+
+@traced
+def write_csv(df: pd.DataFrame, out: str | os.PathLike | BinaryIO,
+              progress: Optional[WriteProgressFn] = None,
+              chunk_rows: int = EXPORT_CHUNK_ROWS) -> None:
+    with _open_output(out) as f:
+        for data in iter_csv(df, chunk_rows=chunk_rows, progress=progress):
+            f.write(data)
+
+_EXCEL_SCALARS = (str, int, float, bool, np.number, np.bool_,
+                  datetime.date, datetime.time, datetime.timedelta)
+
+def _excel_rows(block: pd.DataFrame) -> Iterator[tuple]:
+    columns = []
+    for i in range(block.shape[1]):
+        s = block.iloc[:, i]
+        values = s.astype(object).where(s.notna(), None)
+        if s.dtype == object:
+            # listas, dicts e afins não têm tipo no Excel: vão como texto
+            values = values.map(lambda v: v if v is None or isinstance(v, _EXCEL_SCALARS) else str(v))
+        columns.append(values.tolist())
+    return zip(*columns)
+
+@traced
+def write_xlsx(df: pd.DataFrame, out: str | os.PathLike | BinaryIO,
+               progress: Optional[WriteProgressFn] = None,
+               chunk_rows: int = EXPORT_CHUNK_ROWS,
+               max_rows: int = EXCEL_MAX_ROWS) -> None:
+    """
+    Grava o DataFrame em XLSX com o modo constant_memory do xlsxwriter:
+    cada linha vai para o disco assim que escrita. Acima do limite de linhas
+    do Excel os dados continuam em novas planilhas (Sheet2, Sheet3…), cada
+    uma com o cabeçalho.
+    """
+    import xlsxwriter
+
+    options = {
+        "constant_memory": True,
+        "nan_inf_to_errors": True,
+        "remove_timezone": True,
+        "strings_to_urls": False,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    }
+    header = [str(c) for c in df.columns]
+    per_sheet = max_rows - 1
+    total = len(df)
+    with xlsxwriter.Workbook(out, options) as workbook:
+        bold = workbook.add_format({"bold": True})
+        for sheet_no, sheet_start in enumerate(range(0, max(total, 1), per_sheet), start=1):
+            sheet = workbook.add_worksheet(f"Sheet{sheet_no}")
+            sheet.write_row(0, 0, header, bold)
+            row = 1
+            sheet_stop = min(sheet_start + per_sheet, total)
+            for start in range(sheet_start, sheet_stop, chunk_rows):
+                stop = min(start + chunk_rows, sheet_stop)
+                for values in _excel_rows(df.iloc[start:stop]):
+                    sheet.write_row(row, 0, values)
+                    row += 1
+                if progress is not None:
+                    progress(stop / total, stop)
+
+@traced
 def save_csv(df: pd.DataFrame) -> bytes:
-    out = io.StringIO()
-    df.to_csv(out, index=False)
-    return out.getvalue().encode("utf-8")
+    out = io.BytesIO()
+    write_csv(df, out)
+    return out.getvalue()
 
+@traced
 def save_xlsx(df: pd.DataFrame) -> bytes:
     out = io.BytesIO()
-    with pd.ExcelWriter(out, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Sheet1")
-    out.seek(0)
-    return out.read()
+    write_xlsx(df, out)
+    return out.getvalue()
+
+# ---------------------- ARROW IPC ----------------------
+
+ARROW_FORMAT_VERSION = 1
+
+def dtype_name(dtype) -> str:
+    # str(dtype) não distingue string[python] de string[pyarrow]
+    if isinstance(dtype, pd.StringDtype):
+        return f"string[{dtype.storage}]"
+    if isinstance(dtype, pd.CategoricalDtype):
+        return f"category[{dtype_name(dtype.categories.dtype)}]"
+    return str(dtype)
+
+@traced
+def to_arrow_table(df: pd.DataFrame, pickled: Sequence[int] = ()) -> pa.Table:
+    """
+    Tabela Arrow com o esquema de tipos pandas e os attrs no metadado `dataflow`.
 
-def autosave(df: pd.DataFrame, key: str = "autosave.parquet") -> Path:
-    path = SESSION_DIR / key
+    `pickled` lista as posições das colunas gravadas como pickle (bytes),
+    que `from_arrow_table` desfaz na leitura.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    header = {
+        "version": ARROW_FORMAT_VERSION,
+        "schema": [[str(c), dtype_name(t)] for c, t in df.dtypes.items()],
+        "attrs": df.attrs,
+    }
+    if pickled:
+        header["pickled"] = list(pickled)
+    meta = dict(table.schema.metadata or {})
+    meta[b"dataflow"] = json.dumps(header, default=str).encode()
+    return table.replace_schema_metadata(meta)
+
+def arrow_header(table_or_schema) -> dict:
+    schema = getattr(table_or_schema, "schema", table_or_schema)
     try:
-        df.to_parquet(path, index=False)
-    except Exception:
-        # fallback em csv se parquet indisponível
-        path = SESSION_DIR / "autosave.csv"
-        df.to_csv(path, index=False)
-    return path
-
-def try_restore() -> pd.DataFrame | None:
-    pq = SESSION_DIR / "autosave.parquet"
-    csv = SESSION_DIR / "autosave.csv"
+        return json.loads((schema.metadata or {})[b"dataflow"])
+    except (KeyError, ValueError):
+        return {}
+
+@traced
+def from_arrow_table(table: pa.Table) -> pd.DataFrame:
+    # texto string[pyarrow] vira ArrowStringArray sobre os buffers da própria
+    # tabela (sem cópia, inclusive de arquivo mapeado em memória); o resto passa
+    # pelo to_pandas, que reaproveita os metadados pandas gravados
+    header = arrow_header(table)
+    dtypes = [t for _, t in header.get("schema", [])]
+    if len(dtypes) != table.num_columns:
+        dtypes = [None] * table.num_columns
+    arrow_text = [i for i, t in enumerate(dtypes) if t == "string[pyarrow]"]
+    rest = table
+    for i in reversed(arrow_text):
+        rest = rest.remove_column(i)
+    df = rest.to_pandas(split_blocks=True)
+    for i in arrow_text:
+        df.insert(i, table.column_names[i], pd.arrays.ArrowStringArray(table.column(i)),
+                  allow_duplicates=True)
+    for i, t in enumerate(dtypes):
+        if t == "category[string[pyarrow]]":
+            s = df.iloc[:, i]
+            df.isetitem(i, s.cat.rename_categories(pd.Index(s.cat.categories, dtype="string[pyarrow]")))
+    for i in header.get("pickled", []):
+        s = df.iloc[:, i]
+        df.isetitem(i, pd.Series([pickle.loads(b) for b in s], index=s.index, dtype=object))
+    df.attrs.update(header.get("attrs", {}))
+    return df
+
+@traced
+def write_arrow(df: pd.DataFrame, path: Path, pickled: Sequence[int] = ()) -> None:
+    # IPC sem compressão: o arquivo pode ser mapeado em memória na leitura
+    table = to_arrow_table(df, pickled)
+    tmp = path.with_suffix(".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+@traced
+def read_arrow(path: Path) -> pd.DataFrame:
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return from_arrow_table(table)
+
+# ---------------------- CACHE DE INGESTÃO ----------------------
+
+INGEST_CACHE_MB = 2048     # espaço em disco do cache de ingestão
+
+@traced
+def upload_hash(uploaded_file, block_bytes: int = 1 << 20) -> str:
+    # hash do conteúdo enviado, lido em blocos
+    h = hashlib.blake2b(digest_size=16)
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+        for block in iter(lambda: uploaded_file.read(block_bytes), b""):
+            h.update(block)
+        uploaded_file.seek(0)
+    else:
+        with open(uploaded_file, "rb") as f:
+            for block in iter(lambda: f.read(block_bytes), b""):
+                h.update(block)
+    return h.hexdigest()
+
+def upload_copy(uploaded_file) -> io.BytesIO:
+    # leitor próprio do mesmo conteúdo: um job pode ler o upload em outra
+    # thread enquanto o script continua usando (e reposicionando) o original
+    copy = io.BytesIO(uploaded_file.getvalue())
+    copy.name = uploaded_file.name
+    return copy
+
+class IngestCache:
+    """
+    DataFrames já lidos e convertidos, em Arrow IPC, por hash do conteúdo.
+
+    A chave combina os hashes dos arquivos enviados com as opções de leitura
+    (abas, união, modo Arrow); um acerto mapeia o arquivo em memória em vez
+    de reler o CSV/XLSX. O diretório é limitado a `max_bytes`, descartando os
+    menos usados (mtime).
+    """
+
+    def __init__(self, folder: Path = SESSION_DIR / "ingest", max_bytes: int = INGEST_CACHE_MB * 1024 * 1024):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(hashes: list[str], **options) -> str:
+        spec = json.dumps([hashes, options], sort_keys=True, default=str)
+        return hashlib.blake2b(spec.encode(), digest_size=16).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.folder / f"{key}.arrow"
+
+    @traced
+    def get(self, key: str) -> pd.DataFrame | None:
+        path = self.path_for(key)
+        try:
+            df = read_arrow(path)
+        except (OSError, pa.ArrowInvalid):
+            return None
+        os.utime(path)
+        return df
+
+    @traced
+    def put(self, key: str, df: pd.DataFrame) -> Path | None:
+        path = self.path_for(key)
+        try:
+            write_arrow(df, path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # colunas com tipos misturados não têm representação Arrow: sem cache
+            path.with_suffix(".tmp").unlink(missing_ok=True)
+            return None
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path) -> None:
+        files = []
+        for p in self.folder.glob("*.arrow"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if p != keep:
+                p.unlink(missing_ok=True)
+                total -= size
+
+AUTOSAVE_PART_ROWS = 500_000   # linhas por partição do autosave
+
+def _schema_of(df: pd.DataFrame) -> list[list[str]]:
+    return [[str(c), dtype_name(t)] for c, t in df.dtypes.items()]
+
+def _hash_part(part: pd.DataFrame) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        h.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+    except TypeError:
+        # valores não hasheáveis (listas, dicts): cai para a representação textual
+        h.update(pd.util.hash_pandas_object(part.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
+def _read_manifest(folder: Path) -> dict | None:
+    try:
+        with open(folder / "manifest.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _atomic_write_json(path: Path, payload: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+def _unique_names(df: pd.DataFrame) -> pd.DataFrame:
+    # o Arrow recusa nomes repetidos: ganham sufixo, como no pd.read_csv ("B", "B.1")
+    if not df.columns.duplicated().any():
+        return df
+    seen: Dict[str, int] = {}
+    names = []
+    for c in map(str, df.columns):
+        name = c
+        while name in seen:
+            seen[c] += 1
+            name = f"{c}.{seen[c]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    out = df.copy(deep=False)
+    out.columns = names
+    return out
+
+def _arrow_safe(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[int]]:
+    # colunas object com tipos misturados (ex.: 1 e "a") não cabem num tipo
+    # Arrow: são gravadas valor a valor em pickle e voltam com os mesmos tipos.
+    # Devolve o DataFrame e as posições dessas colunas (para o metadado)
+    df = out = _unique_names(df)
+    pickled = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True).startswith("mixed"):
+            if out is df:
+                out = df.copy(deep=False)
+            out.isetitem(i, pd.Series([pickle.dumps(v) for v in s], index=s.index, dtype=object))
+            pickled.append(i)
+    return out, pickled
+
+@traced
+def autosave(df: pd.DataFrame, key: str = "autosave") -> Path:
+    """
+    Salva o DataFrame em partições Arrow IPC + manifest.json.
+
+    Cada partição de AUTOSAVE_PART_ROWS linhas é identificada por um hash do
+    conteúdo; só as partições que mudaram desde o último autosave são
+    regravadas, e nada é escrito quando o DataFrame não mudou. O manifest
+    guarda a versão do formato e o esquema de tipos pandas.
+    """
+    folder = SESSION_DIR / key
+    folder.mkdir(parents=True, exist_ok=True)
+    df = _unique_names(df)     # o esquema do manifest precisa bater com o das partições
+    schema = _schema_of(df)
+    previous = _read_manifest(folder) or {}
+    same_format = previous.get("version") == ARROW_FORMAT_VERSION and previous.get("schema") == schema
+    old_parts = previous.get("parts", []) if same_format else []
+
+    parts = []
+    for i, start in enumerate(range(0, max(len(df), 1), AUTOSAVE_PART_ROWS)):
+        part = df.iloc[start:start + AUTOSAVE_PART_ROWS]
+        digest = _hash_part(part)
+        name = f"part-{i:05d}.arrow"
+        old = old_parts[i] if i < len(old_parts) else None
+        if old is None or old["hash"] != digest or not (folder / name).exists():
+            safe, pickled = _arrow_safe(part)
+            write_arrow(safe, folder / name, pickled)
+        parts.append({"file": name, "hash": digest, "rows": len(part)})
+
+    manifest = {"version": ARROW_FORMAT_VERSION, "schema": schema, "rows": len(df), "parts": parts}
+    if manifest != previous:
+        _atomic_write_json(folder / "manifest.json", manifest)
+
+    # remove partições que sobraram de uma versão maior do dataset (ou do formato parquet)
+    keep = {p["file"] for p in parts}
+    for stale in folder.glob("part-*"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+    return folder
+
+@traced
+def try_restore(key: str = "autosave") -> pd.DataFrame | None:
+    """
+    Restaura o último autosave mapeando as partições em memória: colunas
+    numéricas sem nulos e texto string[pyarrow] ficam sobre o arquivo e só
+    são lidas do disco quando usadas. Devolve None se o formato ou o esquema
+    gravado não conferem.
+    """
+    folder = SESSION_DIR / key
+    manifest = _read_manifest(folder)
+    legacy = SESSION_DIR / "autosave.parquet"
     try:
-        if pq.exists():
-            return pd.read_parquet(pq)
-        if csv.exists():
-            return pd.read_csv(csv)
+        if manifest is None:
+            # formato antigo de autosave (arquivo parquet único)
+            return pd.read_parquet(legacy) if legacy.exists() else None
+        if "version" not in manifest:
+            # partições parquet (formato anterior ao Arrow IPC)
+            frames = [pd.read_parquet(folder / p["file"]) for p in manifest["parts"]]
+            return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if manifest["version"] != ARROW_FORMAT_VERSION:
+            return None
+        tables = []
+        for p in manifest["parts"]:
+            with pa.memory_map(str(folder / p["file"]), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            if arrow_header(table).get("schema") != manifest["schema"]:
+                return None
+            tables.append(table)
+        if not tables:
+            return None
+        return from_arrow_table(pa.concat_tables(tables) if len(tables) > 1 else tables[0])
     except Exception:
         return None
-    return None
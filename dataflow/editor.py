@@ -0,0 +1,99 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict
+
+from dataflow.profiling import traced
+
+_MISSING = object()
+
+def rows_signature(row_ids: np.ndarray) -> str:
+    # identifica o conjunto de linhas exibido; muda a key do st.data_editor
+    # sempre que as linhas mudam, para que o delta posicional não seja
+    # reaplicado sobre linhas diferentes
+    return hashlib.blake2b(np.ascontiguousarray(row_ids).tobytes(), digest_size=8).hexdigest()
+
+def _same_value(a: Any, b: Any) -> bool:
+    a_na, b_na = pd.isna(a), pd.isna(b)
+    if isinstance(a_na, bool) and isinstance(b_na, bool) and (a_na or b_na):
+        return a_na and b_na
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+class EditorSync:
+    """
+    Converte o estado do st.data_editor (edited_rows/added_rows/deleted_rows,
+    posições relativas aos dados exibidos) em deltas com ids de linha do
+    DataFrame mestre.
+
+    O estado do widget é cumulativo; o sync lembra o que já foi aplicado
+    para a key atual e devolve só o que mudou desde o último rerun.
+    """
+
+    def __init__(self):
+        self.key = None
+        self._cells: Dict[tuple, Any] = {}
+        self._added = 0
+        self._deleted: set = set()
+
+    @traced
+    def collect(self, key: str, state: Dict[str, Any] | None, df: pd.DataFrame,
+                row_ids: np.ndarray) -> Dict[str, list] | None:
+        if key != self.key:
+            self.key, self._cells, self._added, self._deleted = key, {}, 0, set()
+        if not state:
+            return None
+
+        cells = []
+        for pos, changes in state.get("edited_rows", {}).items():
+            row_id = row_ids[int(pos)].item()
+            for col, val in changes.items():
+                if col not in df.columns or self._cells.get((row_id, col), _MISSING) == val:
+                    continue
+                self._cells[(row_id, col)] = val
+                if not _same_value(df.at[row_id, col], val):
+                    cells.append([row_id, col, val])
+
+        added_rows = state.get("added_rows", [])
+        added = [
+            {c: v for c, v in row.items() if c in df.columns}
+            for row in added_rows[self._added:]
+        ]
+        self._added = len(added_rows)
+
+        deleted = []
+        for pos in state.get("deleted_rows", []):
+            row_id = row_ids[int(pos)].item()
+            if row_id not in self._deleted:
+                self._deleted.add(row_id)
+                deleted.append(row_id)
+
+        if not (cells or added or deleted):
+            return None
+        return {"cells": cells, "added": added, "deleted": deleted}
+
+@traced
+def sort_positions(df: pd.DataFrame, by: str | None, ascending: bool = True) -> np.ndarray:
+    # posições (iloc) das linhas na ordem pedida; nulos sempre no fim
+    if not by or by not in df.columns:
+        return np.arange(len(df))
+    s = df[by].reset_index(drop=True)
+    try:
+        ordered = s.sort_values(ascending=ascending, kind="stable", na_position="last")
+    except TypeError:
+        # coluna com tipos misturados: ordena pela representação textual
+        ordered = s.astype(str).where(s.notna()).sort_values(ascending=ascending, kind="stable", na_position="last")
+    return ordered.index.to_numpy()
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, -(-n_rows // page_size))
+
+@traced
+def page_slice(df: pd.DataFrame, page: int, page_size: int, order: np.ndarray | None = None) -> pd.DataFrame:
+    # materializa só a janela visível; `page` começa em 1
+    start = (max(1, page) - 1) * page_size
+    if order is None:
+        return df.iloc[start:start + page_size]
+    return df.iloc[order[start:start + page_size]]
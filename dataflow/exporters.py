@@ -1,30 +1,144 @@
+import contextvars
+import hashlib
+import json
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
 import pandas as pd
+from PIL import Image as PILImage
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus.flowables import Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 
+from dataflow.data_manager import write_csv, write_xlsx
+from dataflow.jobs import JobCancelled
+from dataflow.profiling import traced
+from dataflow.stats import ColumnStats
 
-def export_pdf(df: pd.DataFrame, charts: list[str], outdir: str) -> str:
+TABLE_CHUNK_ROWS = 500     # linhas por bloco da tabela (só um bloco formatado por vez)
+STORY_LOOKAHEAD = 4        # flowables mantidos à frente do que o ReportLab já desenhou
+CHART_WIDTH_PT = 450
+CHART_MAX_HEIGHT_PT = 300
+CHART_DPI = 150            # resolução das miniaturas embutidas no PDF
+
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0ea5e9")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+])
+
+class _StreamingStory(list):
+    """
+    Lista de flowables alimentada sob demanda por um gerador.
+
+    O laço do ReportLab consulta `len()` a cada flowable desenhado; aqui isso
+    repõe o buffer com até STORY_LOOKAHEAD itens, então a tabela é formatada
+    bloco a bloco em vez de existir inteira na memória.
+    """
+
+    def __init__(self, source: Iterator[Flowable]):
+        super().__init__()
+        self._source = source
+
+    def __len__(self):
+        while super().__len__() < STORY_LOOKAHEAD and self._source is not None:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return super().__len__()
+
+ProgressFn = Callable[[float], None]
+
+@traced
+def df_to_table_data(df: pd.DataFrame, max_rows: int = 40) -> List[List[str]]:
+    # cabeçalho + linhas como texto; única formatação de tabela dos PDFs
+    head = df.head(max_rows)
+    return [[str(c) for c in head.columns]] + head.astype(str).values.tolist()
+
+def _table_chunks(df: pd.DataFrame, max_rows: int, chunk_rows: int = TABLE_CHUNK_ROWS,
+                  progress: Optional[ProgressFn] = None) -> Iterator[Table]:
+    limit = min(len(df), max_rows)
+    for start in range(0, limit, chunk_rows):
+        stop = min(start + chunk_rows, limit)
+        table = Table(df_to_table_data(df.iloc[start:stop], chunk_rows), repeatRows=1)
+        table.setStyle(TABLE_STYLE)
+        yield table
+        if progress is not None:
+            progress(stop / limit)
+
+@traced
+def chart_thumbnail(path: str, cache_dir: str) -> tuple[str, float, float]:
+    """
+    Reduz o PNG para a largura usada no PDF e grava como JPEG comprimido.
+
+    A miniatura fica em cache (chave: caminho, tamanho e mtime do original);
+    devolve o caminho e as dimensões em pontos mantendo a proporção.
+    """
+    st = os.stat(path)
+    key = hashlib.blake2b(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode(), digest_size=12).hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    thumb = os.path.join(cache_dir, f"{key}.jpg")
+    with PILImage.open(path) as img:
+        w, h = img.size
+        if not os.path.exists(thumb):
+            target_w = int(CHART_WIDTH_PT / 72 * CHART_DPI)
+            if w > target_w:
+                img = img.resize((target_w, max(1, round(h * target_w / w))), PILImage.LANCZOS)
+            tmp = f"{thumb}.{os.getpid()}.tmp"
+            img.convert("RGB").save(tmp, format="JPEG", quality=85, optimize=True)
+            os.replace(tmp, thumb)
+    width = CHART_WIDTH_PT
+    height = width * h / w
+    if height > CHART_MAX_HEIGHT_PT:
+        width, height = width * CHART_MAX_HEIGHT_PT / height, CHART_MAX_HEIGHT_PT
+    return thumb, width, height
+
+@traced
+def export_pdf(df: pd.DataFrame, charts: list[str], outdir: str, stats: ColumnStats | None = None,
+               max_rows: int = 30, out: BinaryIO | None = None, progress: Optional[ProgressFn] = None) -> str:
     """
     Gera relatório PDF estilizado com base no DataFrame e gráficos exportados.
 
+    A tabela é montada em blocos de TABLE_CHUNK_ROWS linhas à medida que o
+    ReportLab pagina, então `max_rows` pode ir a um apêndice completo sem
+    montar a tabela inteira em memória. Os gráficos entram como miniaturas
+    JPEG reduzidas uma única vez (cache em `outdir/_pdf_charts`).
+
     Args:
         df (pd.DataFrame): DataFrame já processado (inclui alterações do usuário).
         charts (list[str]): Lista de caminhos de gráficos (imagens .png).
         outdir (str): Diretório de saída para salvar o PDF.
+        stats (ColumnStats | None): Profiler com o cache de estatísticas da sessão;
+            sem ele, as estatísticas são calculadas do zero.
+        max_rows (int): Linhas do DataFrame incluídas na tabela.
+        out (BinaryIO | None): Arquivo já aberto onde escrever o PDF; por padrão
+            grava em `outdir/dataflow_relatorio.pdf`.
+        progress (callable | None): Recebe a fração (0–1) da tabela já paginada.
 
     Returns:
-        str: Caminho final do PDF gerado.
+        str: Caminho final do PDF gerado (ou o nome do arquivo `out`).
     """
     os.makedirs(outdir, exist_ok=True)
     pdf_path = os.path.join(outdir, "dataflow_relatorio.pdf")
 
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
-    elements = []
+    doc = SimpleDocTemplate(out if out is not None else pdf_path, pagesize=A4, pageCompression=1,
+                            rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    stats = stats or ColumnStats()
+    doc.build(_StreamingStory(_report_story(df, charts, outdir, stats, max_rows, progress)))
+    return pdf_path if out is None else getattr(out, "name", "")
 
+def _report_story(df: pd.DataFrame, charts: list[str], outdir: str, stats: ColumnStats,
+                  max_rows: int, progress: Optional[ProgressFn] = None) -> Iterator[Flowable]:
     # ---- Estilos ----
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name="TitleCustom", fontSize=18, leading=22, alignment=1, textColor=colors.HexColor("#0ea5e9")))
@@ -32,68 +146,243 @@ def export_pdf(df: pd.DataFrame, charts: list[str], outdir: str) -> str:
     styles.add(ParagraphStyle(name="NormalSmall", fontSize=9, leading=12))
 
     # ---- Cabeçalho ----
-    elements.append(Paragraph("Relatório DataFlow", styles["TitleCustom"]))
-    elements.append(Paragraph(datetime.now().strftime("%d/%m/%Y %H:%M"), styles["Subtitle"]))
-    elements.append(Spacer(1, 12))
+    yield Paragraph("Relatório DataFlow", styles["TitleCustom"])
+    yield Paragraph(datetime.now().strftime("%d/%m/%Y %H:%M"), styles["Subtitle"])
+    yield Spacer(1, 12)
 
     # ---- Estatísticas rápidas ----
+    profile = stats.profile(df)
     stats_summary = [
         f"Total de Linhas: {df.shape[0]}",
         f"Total de Colunas: {df.shape[1]}",
-        f"Valores Nulos: {int(df.isna().sum().sum())}"
+        f"Valores Nulos: {sum(summary.nulls for summary in profile.values())}"
     ]
     for stat in stats_summary:
-        elements.append(Paragraph(stat, styles["NormalSmall"]))
-    elements.append(Spacer(1, 12))
+        yield Paragraph(stat, styles["NormalSmall"])
+    yield Spacer(1, 12)
 
     # ---- Estatísticas detalhadas por coluna ----
-    for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
+    for col, summary in profile.items():
+        approx = "~" if summary.approximate else ""
+        if summary.numeric:
             desc = (
-                f"<b>{col}</b> → Média: {df[col].mean():.2f}, "
-                f"Mediana: {df[col].median():.2f}, "
-                f"Mín: {df[col].min()}, "
-                f"Máx: {df[col].max()}, "
-                f"Únicos: {df[col].nunique()}"
+                f"<b>{col}</b> → Média: {summary.mean:.2f}, "
+                f"Mediana: {approx}{summary.median:.2f}, "
+                f"Mín: {summary.min}, "
+                f"Máx: {summary.max}, "
+                f"Únicos: {approx}{summary.nunique}"
             )
         else:
-            top = df[col].mode().iloc[0] if not df[col].mode().empty else "-"
+            top = summary.top if summary.top is not None else "-"
             desc = (
-                f"<b>{col}</b> → Únicos: {df[col].nunique()}, "
+                f"<b>{col}</b> → Únicos: {approx}{summary.nunique}, "
                 f"Mais frequente: {top}"
             )
-        elements.append(Paragraph(desc, styles["NormalSmall"]))
-    elements.append(Spacer(1, 14))
-
-    # ---- Tabela com dados ----
-    max_rows = 30  # limitar para não estourar o PDF
-    table_data = [list(df.columns)] + df.head(max_rows).astype(str).values.tolist()
-
-    table = Table(table_data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0ea5e9")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
-        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 20))
+        yield Paragraph(desc, styles["NormalSmall"])
+    if any(summary.approximate for summary in profile.values()):
+        yield Paragraph("~ valores aproximados (modo aproximado ativo).", styles["NormalSmall"])
+    yield Spacer(1, 14)
+
+    # ---- Tabela com dados (em blocos) ----
+    yield from _table_chunks(df, max_rows, progress=progress)
+    yield Spacer(1, 20)
 
     # ---- Gráficos ----
     if charts:
-        elements.append(PageBreak())
-        elements.append(Paragraph("📊 Gráficos", styles["TitleCustom"]))
-        elements.append(Spacer(1, 12))
+        yield PageBreak()
+        yield Paragraph("📊 Gráficos", styles["TitleCustom"])
+        yield Spacer(1, 12)
 
         for chart in charts:
             if os.path.exists(chart):
-                elements.append(Image(chart, width=450, height=250))
-                elements.append(Spacer(1, 12))
+                thumb, width, height = chart_thumbnail(chart, os.path.join(outdir, "_pdf_charts"))
+                yield Image(thumb, width=width, height=height)
+                yield Spacer(1, 12)
+
+@traced
+def build_pdf(output_path: str, title: str, table_data: List[List[str]], image_paths: Optional[List[str]] = None) -> str:
+    # PDF simples (título + tabela pronta + imagens) com o mesmo estilo do relatório
+    styles = getSampleStyleSheet()
+
+    def story() -> Iterator[Flowable]:
+        yield Paragraph(title, styles["Title"])
+        yield Paragraph(datetime.now().strftime("%d/%m/%Y %H:%M"), styles["Normal"])
+        yield Spacer(1, 12)
+        if table_data:
+            table = Table(table_data, repeatRows=1)
+            table.setStyle(TABLE_STYLE)
+            yield table
+            yield Spacer(1, 12)
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), "_pdf_charts")
+        for p in image_paths or []:
+            if os.path.exists(p):
+                thumb, width, height = chart_thumbnail(p, cache_dir)
+                yield Image(thumb, width=width, height=height)
+                yield Spacer(1, 12)
+
+    doc = SimpleDocTemplate(output_path, pagesize=A4, pageCompression=1)
+    doc.build(_StreamingStory(story()))
+    return output_path
+
+# ---------------------- PIPELINE DE EXPORTAÇÃO ----------------------
+
+@dataclass
+class ExportFormat:
+    name: str
+    label: str
+    extension: str
+    mime: str
+    # writer(df, caminho, progresso, contexto, **opções) grava o arquivo no caminho
+    writer: Callable[..., None]
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {}
+
+def register_format(fmt: ExportFormat) -> ExportFormat:
+    EXPORT_FORMATS[fmt.name] = fmt
+    return fmt
+
+def _write_csv(df, path, progress, context, **options):
+    write_csv(df, path, progress=progress)
+
+def _write_xlsx(df, path, progress, context, **options):
+    write_xlsx(df, path, progress=progress)
+
+def _write_parquet(df, path, progress, context, **options):
+    df.to_parquet(path, index=False)
+
+def _write_json(df, path, progress, context, **options):
+    df.to_json(path, orient="records", force_ascii=False, date_format="iso")
+
+def _write_pdf(df, path, progress, context, charts=(), max_rows=30, **options):
+    with open(path, "wb") as f:
+        export_pdf(df, list(charts), context["outdir"], stats=context.get("stats"),
+                   max_rows=max_rows, out=f, progress=progress)
+
+register_format(ExportFormat("csv", "CSV", "csv", "text/csv", _write_csv))
+register_format(ExportFormat("xlsx", "Excel (XLSX)", "xlsx",
+                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _write_xlsx))
+register_format(ExportFormat("parquet", "Parquet", "parquet", "application/vnd.apache.parquet", _write_parquet))
+register_format(ExportFormat("json", "JSON", "json", "application/json", _write_json))
+register_format(ExportFormat("pdf", "Relatório PDF", "pdf", "application/pdf", _write_pdf))
+
+@dataclass
+class ExportJob:
+    key: str
+    fmt: ExportFormat
+    path: str
+    progress: float = 0.0
+    error: str | None = None
+    future: Future | None = field(default=None, repr=False)
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.future is None or self.future.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def ready(self) -> bool:
+        return self.done and self.error is None and not self.cancelled and os.path.exists(self.path)
+
+    def cancel(self) -> None:
+        # interrompe no próximo aviso de progresso do writer (ver jobs.Job.cancel)
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+class ExportPipeline:
+    """
+    Exportações sob demanda, executadas em segundo plano.
+
+    Cada pedido é identificado pela versão dos dados (fingerprint do
+    DataFrame), pelo formato e pelas opções; o arquivo gerado fica em
+    `outdir/exports` e é reaproveitado enquanto os dados não mudarem.
+    Por formato, só os `keep` arquivos mais recentes são mantidos.
+    """
+
+    def __init__(self, outdir: str, max_workers: int = 2, keep: int = 2, **context: Any):
+        self.outdir = os.path.join(outdir, "exports")
+        os.makedirs(self.outdir, exist_ok=True)
+        self.keep = keep
+        self.context = {"outdir": outdir, **context}
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataflow-export")
+
+    @staticmethod
+    def _key(version: str, fmt: str, options: Dict[str, Any]) -> str:
+        spec = json.dumps([version, fmt, options], sort_keys=True, default=str)
+        return hashlib.blake2b(spec.encode(), digest_size=12).hexdigest()
+
+    def job(self, version: str, fmt: str, **options) -> ExportJob | None:
+        key = self._key(version, fmt, options)
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            # arquivo de uma execução anterior com os mesmos dados/opções
+            path = os.path.join(self.outdir, f"{key}.{EXPORT_FORMATS[fmt].extension}")
+            if os.path.exists(path):
+                job = ExportJob(key, EXPORT_FORMATS[fmt], path, progress=1.0)
+                with self._lock:
+                    self._jobs[key] = job
+        return job
+
+    @traced
+    def submit(self, df: pd.DataFrame, version: str, fmt: str, **options) -> ExportJob:
+        existing = self.job(version, fmt, **options)
+        if existing is not None and (not existing.done or existing.ready):
+            return existing
+        spec = EXPORT_FORMATS[fmt]
+        key = self._key(version, fmt, options)
+        job = ExportJob(key, spec, os.path.join(self.outdir, f"{key}.{spec.extension}"))
+
+        def progress(frac: float, *_) -> None:
+            if job.cancelled:
+                raise JobCancelled()
+            job.progress = max(job.progress, min(frac, 1.0))
+
+        def run() -> None:
+            tmp = f"{job.path}.tmp"
+            try:
+                # a pasta da sessão pode ter sido limpa por inatividade (ver sessions.py)
+                os.makedirs(self.outdir, exist_ok=True)
+                spec.writer(df, tmp, progress, self.context, **options)
+                progress(1.0)     # cancelado durante um writer sem avisos: descarta o arquivo
+                os.replace(tmp, job.path)
+                self._evict(spec, keep_path=job.path)
+            except JobCancelled:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            except Exception as e:
+                job.error = str(e)
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        with self._lock:
+            self._jobs[key] = job
+            # contexto copiado: as etapas da geração entram no tracer ativo (ver profiling.py)
+            job.future = self._pool.submit(contextvars.copy_context().run, run)
+        return job
+
+    def running(self) -> bool:
+        with self._lock:
+            return any(not job.done for job in self._jobs.values())
 
-    # ---- Constrói PDF ----
-    doc.build(elements)
-    return pdf_path
+    def _evict(self, spec: ExportFormat, keep_path: str) -> None:
+        files = [
+            os.path.join(self.outdir, name) for name in os.listdir(self.outdir)
+            if name.endswith(f".{spec.extension}")
+        ]
+        files.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0, reverse=True)
+        for old in files[self.keep:]:
+            if old != keep_path:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            for key in [k for k, j in self._jobs.items() if j.done and not os.path.exists(j.path)]:
+                del self._jobs[key]
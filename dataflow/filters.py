@@ -0,0 +1,147 @@
+import json
+import operator
+from functools import reduce
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from dataflow.profiling import traced
+
+# Um filtro é uma árvore de dicts serializáveis:
+#   condição: {"col": "Preço", "op": ">", "val": 10}
+#   grupo:    {"and": [<nós>...]} ou {"or": [<nós>...]}
+FilterNode = Dict[str, Any]
+
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+OPS = tuple(_COMPARE) + ("between", "isin", "notin", "isna", "notna", "contains", "regex")
+
+def _node_key(node: FilterNode) -> str:
+    return json.dumps(node, sort_keys=True, ensure_ascii=False, default=str)
+
+def coerce_value(s: pd.Series, val: Any) -> Any:
+    # valores vindos da interface chegam como texto
+    if not isinstance(val, str):
+        return val
+    if pd.api.types.is_bool_dtype(s):
+        return val.strip().lower() in ("1", "true", "sim", "verdadeiro")
+    if pd.api.types.is_numeric_dtype(s):
+        try:
+            return pd.to_numeric(val.strip())
+        except ValueError:
+            raise ValueError(f"Valor '{val}' não é numérico (coluna {s.name}).")
+    if pd.api.types.is_datetime64_any_dtype(s):
+        try:
+            return pd.to_datetime(val.strip(), dayfirst=True)
+        except (ValueError, TypeError):
+            raise ValueError(f"Valor '{val}' não é uma data válida (coluna {s.name}).")
+    return val
+
+def _as_mask(result) -> np.ndarray:
+    # nulos nunca satisfazem a condição
+    if isinstance(result, pd.Series):
+        return result.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(result, dtype=bool)
+
+def _condition(s: pd.Series, op: str, val: Any, lower_text: Callable[[], pd.Series]) -> np.ndarray:
+    if op in _COMPARE:
+        try:
+            mask = _as_mask(_COMPARE[op](s, coerce_value(s, val)))
+        except TypeError as e:
+            # coluna object com números e textos misturados
+            raise ValueError(f"Não dá para comparar '{val}' com os valores da coluna {s.name} ({e})")
+        return mask & _as_mask(s.notna()) if op == "!=" else mask
+    if op == "between":
+        lo, hi = (coerce_value(s, v) for v in val)
+        try:
+            return _as_mask(s.between(lo, hi))
+        except TypeError as e:
+            raise ValueError(f"Não dá para comparar '{val}' com os valores da coluna {s.name} ({e})")
+    if op in ("isin", "notin"):
+        mask = _as_mask(s.isin([coerce_value(s, v) for v in val]))
+        return mask if op == "isin" else ~mask & _as_mask(s.notna())
+    if op == "isna":
+        return _as_mask(s.isna())
+    if op == "notna":
+        return _as_mask(s.notna())
+    if op == "contains":
+        return _as_mask(lower_text().str.contains(str(val).lower(), regex=False))
+    if op == "regex":
+        try:
+            return _as_mask(lower_text().str.contains(str(val), case=False, regex=True))
+        except Exception as e:
+            raise ValueError(f"Expressão regular inválida: {val} ({e})")
+    raise ValueError(f"Operador de filtro desconhecido: {op}")
+
+class FilterEngine:
+    """
+    Avalia árvores de filtro como máscaras booleanas NumPy sobre um DataFrame.
+
+    As máscaras de cada nó (condições e grupos) ficam em cache enquanto o
+    DataFrame for o mesmo: acrescentar uma condição avalia só a condição
+    nova e combina com as máscaras já calculadas. Colunas de texto são
+    normalizadas (minúsculas) uma única vez por coluna; em colunas
+    categóricas a condição é avaliada só sobre as categorias.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._masks: Dict[str, np.ndarray] = {}
+        self._text: Dict[str, pd.Series] = {}
+
+    def _lower_text(self, col: str) -> pd.Series:
+        if col not in self._text:
+            s = self.df[col]
+            if not isinstance(s.dtype, pd.StringDtype):
+                s = s.astype("string")
+            self._text[col] = s.str.lower()
+        return self._text[col]
+
+    def _leaf_mask(self, node: FilterNode) -> np.ndarray:
+        col, op, val = node.get("col"), node.get("op"), node.get("val")
+        if col not in self.df.columns:
+            raise ValueError(f"Coluna inexistente no filtro: {col}")
+        s = self.df[col]
+
+        if isinstance(s.dtype, pd.CategoricalDtype) and op not in ("isna", "notna"):
+            # avalia a condição uma vez por categoria e espalha pelos códigos;
+            # código -1 (nulo) cai na posição extra, sempre False
+            cats = pd.Series(s.cat.categories, name=col)
+            hit = _condition(cats, op, val, lambda: cats.astype("string").str.lower())
+            return np.append(hit, False)[s.cat.codes.to_numpy()]
+        return _condition(s, op, val, lambda: self._lower_text(col))
+
+    def mask(self, node: FilterNode) -> np.ndarray:
+        key = _node_key(node)
+        cached = self._masks.get(key)
+        if cached is not None:
+            return cached
+
+        if "and" in node or "or" in node:
+            combine = np.logical_and if "and" in node else np.logical_or
+            children = node.get("and", node.get("or")) or []
+            if not children:
+                result = np.ones(len(self.df), dtype=bool)
+            else:
+                result = reduce(combine, (self.mask(child) for child in children))
+        else:
+            result = self._leaf_mask(node)
+
+        self._masks[key] = result
+        return result
+
+    @traced
+    def apply(self, node: FilterNode | None) -> pd.DataFrame:
+        if not node:
+            return self.df
+        mask = self.mask(node)
+        if mask.all():
+            return self.df
+        return self.df[mask]
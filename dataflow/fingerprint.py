@@ -0,0 +1,76 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataflow.profiling import traced
+
+_MEMO_ENTRIES = 256
+_memo: "OrderedDict[Tuple, Tuple[pd.Series, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+def column_token(s: pd.Series) -> Tuple | None:
+    """
+    Identifica o buffer que guarda a coluna (versão da coluna em memória).
+
+    Com copy-on-write ativo e uma referência à Series guardada por quem usa o
+    token, um buffer compartilhado nunca é alterado in-place, então mesmo
+    endereço implica mesmo conteúdo. Devolve None para arrays desconhecidos.
+    """
+    arr = s.array
+    parts = []
+    # arrays Arrow: só o ChunkedArray (o `_data` deles é um alias obsoleto)
+    names = ("_pa_array",) if hasattr(arr, "_pa_array") else ("_ndarray", "_data", "_mask", "_codes")
+    for name in names:
+        v = getattr(arr, name, None)
+        if isinstance(v, np.ndarray):
+            parts.append(v.__array_interface__["data"][0])
+        elif v is not None:
+            parts.append(id(v))
+    if not parts:
+        return None
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # renomear categorias mantém os códigos
+        parts.append(id(s.dtype.categories))
+    return (str(s.dtype), len(s), tuple(parts))
+
+def _hash_column(s: pd.Series) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(s.dtype).encode())
+    try:
+        h.update(pd.util.hash_pandas_object(s, index=False).values.tobytes())
+    except TypeError:
+        h.update(pd.util.hash_pandas_object(s.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
+@traced
+def column_fingerprint(s: pd.Series) -> str:
+    # hash do conteúdo; memorizado pelo token para não refazer o hash de uma
+    # coluna que não mudou entre reruns
+    token = column_token(s)
+    if token is not None:
+        with _lock:
+            hit = _memo.get(token)
+            if hit is not None:
+                _memo.move_to_end(token)
+                return hit[1]
+    digest = _hash_column(s)
+    if token is not None:
+        with _lock:
+            _memo[token] = (s, digest)
+            while len(_memo) > _MEMO_ENTRIES:
+                _memo.popitem(last=False)
+    return digest
+
+@traced
+def frame_fingerprint(df: pd.DataFrame, columns: Iterable[str] | None = None) -> str:
+    cols = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(df)).encode())
+    for col in cols:
+        h.update(str(col).encode())
+        h.update(column_fingerprint(df[col]).encode())
+    return h.hexdigest()
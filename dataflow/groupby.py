@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataflow.fingerprint import column_token
+from dataflow.profiling import traced
+
+AGGREGATIONS = ("sum", "mean", "count", "max", "min")
+GROUPBY_CACHE_MB = 256    # códigos e resultados guardados (os da chave são int64, 8 bytes por linha)
+
+@dataclass
+class GroupIndex:
+    codes: np.ndarray          # grupo de cada linha; -1 = chave nula
+    uniques: pd.Index          # chaves dos grupos, em ordem crescente
+    sizes: np.ndarray          # linhas por grupo
+    _order: np.ndarray | None = field(default=None, repr=False)
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.uniques)
+
+    def order(self) -> np.ndarray:
+        # posições das linhas com chave, agrupadas por grupo (para reduceat)
+        if self._order is None:
+            order = np.argsort(self.codes, kind="stable")
+            self._order = order[int(np.count_nonzero(self.codes < 0)):]
+        return self._order
+
+    def starts(self) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(np.intp)
+
+def top_positions(values: np.ndarray, n: int) -> np.ndarray:
+    # posições dos n maiores valores em ordem decrescente; NaN fica por último
+    v = np.where(np.isnan(values), -np.inf, values) if values.dtype.kind == "f" else values
+    if n < len(v):
+        part = np.argpartition(-v, n - 1)[:n]
+    else:
+        part = np.arange(len(v))
+    return part[np.argsort(-v[part], kind="stable")]
+
+class GroupByEngine:
+    """
+    Agregações por grupo com índice pré-calculado.
+
+    Cada coluna usada como chave é fatorizada uma vez por versão (mesmo
+    buffer, ver fingerprint.column_token) e os códigos ficam em cache. Para
+    um par chave × valores, todas as agregações de AGGREGATIONS são
+    calculadas juntas com np.bincount e ufunc.reduceat, então trocar a
+    agregação no gráfico não refaz nada.
+
+    Valores não numéricos caem no groupby do pandas.
+
+    O cache é limitado em entradas e em bytes (`max_bytes`, somando os
+    códigos de cada índice e as tabelas de resultado); `value_counts`, usado
+    pelas estatísticas de cada coluna, não guarda o índice que calcula.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = GROUPBY_CACHE_MB * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[Tuple, Tuple[pd.Series, GroupIndex]]" = OrderedDict()
+        self._results: "OrderedDict[Tuple, Tuple[pd.Series, pd.Series, pd.DataFrame]]" = OrderedDict()
+        # (cache, token) -> bytes, na ordem de uso das duas caches juntas
+        self._sizes: "OrderedDict[Tuple[int, Tuple], int]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._used
+
+    def _lookup(self, cache: OrderedDict, token: Tuple | None):
+        if token is None:
+            return None
+        with self._lock:
+            hit = cache.get(token)
+            if hit is not None:
+                cache.move_to_end(token)
+                self._sizes.move_to_end((id(cache), token))
+            return hit
+
+    def _store(self, cache: OrderedDict, token: Tuple | None, entry: Tuple, nbytes: int) -> None:
+        if token is None or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            cache[token] = entry
+            self._used += nbytes - self._sizes.pop((id(cache), token), 0)
+            self._sizes[(id(cache), token)] = nbytes
+            while len(cache) > self.max_entries:
+                self._drop(cache, next(iter(cache)))
+            while self._used > self.max_bytes:
+                owner, oldest = next(iter(self._sizes))
+                self._drop(self._indexes if owner == id(self._indexes) else self._results, oldest)
+
+    def _drop(self, cache: OrderedDict, token: Tuple) -> None:
+        cache.pop(token, None)
+        self._used -= self._sizes.pop((id(cache), token), 0)
+
+    @traced
+    def index(self, key: pd.Series, cache: bool = True) -> GroupIndex:
+        token = column_token(key)
+        hit = self._lookup(self._indexes, token)
+        if hit is not None:
+            return hit[1]
+        codes, uniques = pd.factorize(key, sort=True)
+        valid = codes[codes >= 0]
+        index = GroupIndex(codes=codes, uniques=pd.Index(uniques, name=key.name),
+                           sizes=np.bincount(valid, minlength=len(uniques)))
+        if cache:
+            # códigos + a ordenação calculada depois por order()
+            nbytes = 2 * codes.nbytes + index.sizes.nbytes + int(index.uniques.memory_usage(deep=True))
+            self._store(self._indexes, token, (key, index), nbytes)
+        return index
+
+    @traced
+    def value_counts(self, s: pd.Series, k: int) -> Tuple[int, pd.Series]:
+        # nº de distintos e os k mais frequentes, sem ordenar todas as contagens;
+        # reaproveita um índice já guardado, mas não guarda um novo (uso avulso)
+        index = self.index(s, cache=False)
+        top = top_positions(index.sizes, k)
+        counts = pd.Series(index.sizes[top], index=index.uniques[top], name="count", dtype="int64")
+        return index.n_groups, counts
+
+    @traced
+    def table(self, key: pd.Series, values: pd.Series) -> pd.DataFrame:
+        """Todas as AGGREGATIONS de `values` por grupo de `key`, indexadas pelas chaves."""
+        k_token, v_token = column_token(key), column_token(values)
+        token = (k_token, v_token) if k_token is not None and v_token is not None else None
+        hit = self._lookup(self._results, token)
+        if hit is not None:
+            return hit[2]
+
+        index = self.index(key)
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            y = values.to_numpy(dtype="float64", na_value=np.nan)
+            ok = (index.codes >= 0) & ~np.isnan(y)
+            codes = index.codes[ok]
+            n = index.n_groups
+            count = np.bincount(codes, minlength=n)
+            total = np.bincount(codes, weights=y[ok], minlength=n)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+            if n:
+                # fmax/fmin ignoram NaN; grupos só com NaN ficam NaN
+                ordered = y[index.order()]
+                starts = index.starts()
+                high, low = np.fmax.reduceat(ordered, starts), np.fmin.reduceat(ordered, starts)
+            else:
+                high = low = np.empty(0)
+            result = pd.DataFrame(
+                {"sum": total, "mean": mean, "count": count, "max": high, "min": low},
+                index=index.uniques,
+            )
+        else:
+            grouped = values.groupby(key, observed=True, sort=True)
+            result = grouped.agg(["count", "max", "min"]).reindex(index.uniques)
+            result["sum"], result["mean"] = np.nan, np.nan
+            result = result[list(AGGREGATIONS)]
+        self._store(self._results, token, (key, values, result), int(result.memory_usage(deep=True).sum()))
+        return result
+
+    @traced
+    def aggregate(self, key: pd.Series, values: pd.Series | None, agg: str) -> pd.Series:
+        # agg="count" sem valores = linhas por grupo (nulos incluídos)
+        if agg == "count" and values is None:
+            index = self.index(key)
+            return pd.Series(index.sizes, index=index.uniques, name="Contagem")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Agregação não suportada: {agg}")
+        return self.table(key, values)[agg].rename(values.name)
@@ -0,0 +1,139 @@
+import json
+import pandas as pd
+from typing import Any, Callable, Dict, List
+
+from dataflow.operations import apply_edits, delete_columns, delete_rows, fillna, rename_columns
+from dataflow.profiling import traced
+
+# Operações que podem ser registradas e reaplicadas. Cada passo do histórico é
+# um dict serializável: {"op": <nome>, "args": {...}}.
+OPERATIONS: Dict[str, Callable[..., pd.DataFrame]] = {
+    "fillna": fillna,
+    "delete_columns": delete_columns,
+    "delete_rows": delete_rows,
+    "rename_columns": rename_columns,
+    "apply_edits": apply_edits,
+}
+
+@traced
+def apply_step(df: pd.DataFrame, step: Dict[str, Any]) -> pd.DataFrame:
+    op = OPERATIONS.get(step["op"])
+    if op is None:
+        raise ValueError(f"Operação desconhecida no histórico: {step['op']}")
+    return op(df, **step.get("args", {}))
+
+@traced
+def replay(df: pd.DataFrame, steps: List[Dict[str, Any]]) -> pd.DataFrame:
+    for step in steps:
+        df = apply_step(df, step)
+    return df
+
+class OperationLog:
+    """
+    Histórico de operações com desfazer/refazer em vários níveis.
+
+    Guarda o DataFrame original e um snapshot por passo aplicado. Com o
+    copy-on-write do pandas ativo, cada snapshot compartilha os buffers das
+    colunas que a operação não alterou, então o custo de memória de um passo
+    é proporcional ao que ele mudou. Snapshots além de `max_snapshots` são
+    descartados e reconstruídos sob demanda reaplicando os passos a partir
+    do snapshot anterior mais próximo.
+    """
+
+    def __init__(self, base: pd.DataFrame, max_snapshots: int = 20):
+        self.steps: List[Dict[str, Any]] = []
+        self.cursor = 0
+        self.revision = 0      # muda a cada alteração (apply/undo/redo/reset)
+        self.max_snapshots = max_snapshots
+        self._snapshots: Dict[int, pd.DataFrame] = {0: base}
+
+    @property
+    def original(self) -> pd.DataFrame:
+        return self._snapshots[0].copy(deep=False)
+
+    @property
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self.cursor < len(self.steps)
+
+    def _frame_at(self, pos: int) -> pd.DataFrame:
+        if pos in self._snapshots:
+            return self._snapshots[pos]
+        start = max(p for p in self._snapshots if p < pos)
+        df = replay(self._snapshots[start], self.steps[start:pos])
+        self._remember(pos, df)
+        return df
+
+    def _remember(self, pos: int, df: pd.DataFrame) -> None:
+        self._snapshots[pos] = df
+        while len(self._snapshots) > self.max_snapshots:
+            # mantém sempre o original e o snapshot atual
+            victims = [p for p in self._snapshots if p not in (0, self.cursor, pos)]
+            if not victims:
+                break
+            # descarta o mais antigo: desfazer costuma ficar perto do passo atual
+            del self._snapshots[min(victims)]
+
+    def current(self) -> pd.DataFrame:
+        # cópia rasa: alterações in-place feitas pelo app não atingem o snapshot
+        return self._frame_at(self.cursor).copy(deep=False)
+
+    @traced
+    def apply(self, op: str, **args) -> pd.DataFrame:
+        step = {"op": op, "args": args}
+        return self._push(step, apply_step(self._frame_at(self.cursor), step))
+
+    @traced
+    def record(self, op: str, df: pd.DataFrame, revision: int, **args) -> pd.DataFrame:
+        """
+        Registra um passo já calculado fora do histórico (job em segundo
+        plano) sobre `current()` na revisão `revision`.
+        """
+        if revision != self.revision:
+            raise ValueError("Os dados mudaram enquanto a operação rodava.")
+        return self._push({"op": op, "args": args}, df)
+
+    def _push(self, step: Dict[str, Any], df: pd.DataFrame) -> pd.DataFrame:
+        # um novo passo descarta o ramo de refazer
+        del self.steps[self.cursor:]
+        for pos in [p for p in self._snapshots if p > self.cursor]:
+            del self._snapshots[pos]
+        self.steps.append(step)
+        self.cursor += 1
+        self.revision += 1
+        self._remember(self.cursor, df)
+        return df.copy(deep=False)
+
+    @traced
+    def undo(self) -> pd.DataFrame:
+        if self.can_undo:
+            self.cursor -= 1
+            self.revision += 1
+        return self.current()
+
+    @traced
+    def redo(self) -> pd.DataFrame:
+        if self.can_redo:
+            self.cursor += 1
+            self.revision += 1
+        return self.current()
+
+    @traced
+    def reset(self) -> pd.DataFrame:
+        # volta ao original sem perder os passos (ainda dá para refazer)
+        self.cursor = 0
+        self.revision += 1
+        return self.current()
+
+    def to_json(self) -> str:
+        return json.dumps(self.steps[:self.cursor], ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_json(cls, base: pd.DataFrame, payload: str, **kwargs) -> "OperationLog":
+        log = cls(base, **kwargs)
+        for step in json.loads(payload):
+            log.apply(step["op"], **step.get("args", {}))
+        return log
@@ -0,0 +1,269 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataflow.data_manager import ARROW_CATEGORY_MAX_RATIO, dtype_name, to_arrow_text
+from dataflow.profiling import traced
+
+# Inferência de tipos na carga.
+#
+# Colunas de texto (object/string) são classificadas a partir de uma amostra
+# dos valores não nulos: número, decimal no formato brasileiro ("1.234,56",
+# "R$ 10,00"), data, booleano ou texto. Texto repetitivo vira categoria. A
+# conversão da coluna inteira só é aceita se não criar nulos novos; caso
+# contrário a coluna fica como texto. As colunas são processadas em paralelo.
+
+INFER_SAMPLE_ROWS = 10_000   # valores não nulos examinados por coluna
+INFER_PROBE_ROWS = 200       # pré-teste: descarta tipos impossíveis sem varrer a amostra toda
+INFER_WORKERS = 8
+
+# ordem de tentativa: dia/mês/ano antes do ISO com hora solta
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S",
+                "%d-%m-%Y", "%d.%m.%Y", "ISO8601")
+
+TRUE_VALUES = {"true", "verdadeiro", "sim", "s", "yes", "y"}
+FALSE_VALUES = {"false", "falso", "não", "nao", "n", "no"}
+
+_BR_NUMBER = re.compile(r"^[-+]?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$")
+_BR_THOUSANDS = re.compile(r"^[-+]?[1-9]\d{0,2}(\.\d{3})+$")   # "1.234", "2.500.000"
+_SMALL_INT = re.compile(r"^[-+]?\d{1,3}$")                   # "950": abaixo de mil não leva ponto
+_CURRENCY = re.compile(r"^\s*([-+]?)\s*R\$\s*")
+_LEADING_ZERO = re.compile(r"^[-+]?0\d")
+
+KINDS = {
+    "numeric": "número",
+    "decimal_br": "decimal (pt-BR)",
+    "datetime": "data",
+    "boolean": "booleano",
+    "category": "categoria",
+    "text": "texto",
+    "mixed": "misto",
+    "integer": "inteiro",
+}
+
+@dataclass
+class ColumnReport:
+    column: str
+    before: str
+    after: str
+    kind: str
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+@dataclass
+class SchemaReport:
+    columns: List[ColumnReport]
+
+    @property
+    def bytes_before(self) -> int:
+        return sum(c.bytes_before for c in self.columns)
+
+    @property
+    def bytes_after(self) -> int:
+        return sum(c.bytes_after for c in self.columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Coluna": [c.column for c in self.columns],
+            "Detectado": [KINDS.get(c.kind, c.kind) for c in self.columns],
+            "Antes": [c.before for c in self.columns],
+            "Depois": [c.after for c in self.columns],
+            "Memória antes (MB)": [c.bytes_before / 1e6 for c in self.columns],
+            "Memória depois (MB)": [c.bytes_after / 1e6 for c in self.columns],
+            "Economia (MB)": [c.saved / 1e6 for c in self.columns],
+        })
+
+def _sample(s: pd.Series, n: int) -> pd.Series:
+    valid = s.dropna()
+    if len(valid) <= n:
+        return valid
+    # posições espaçadas ao longo da coluna (o começo do arquivo nem sempre é representativo)
+    return valid.iloc[np.linspace(0, len(valid) - 1, n).astype(np.intp)]
+
+def _parse_br(text: pd.Series) -> pd.Series:
+    sign = text.str.extract(_CURRENCY, expand=False).fillna("")
+    body = text.str.replace(_CURRENCY, "", regex=True).str.strip()
+    return pd.to_numeric(sign + body.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+                         errors="coerce")
+
+def _holds(check: Callable[[pd.Series], bool], text: pd.Series) -> bool:
+    return check(text.iloc[:INFER_PROBE_ROWS]) and (len(text) <= INFER_PROBE_ROWS or check(text))
+
+def _is_numeric(text: pd.Series) -> bool:
+    return bool(pd.to_numeric(text, errors="coerce").notna().all())
+
+def _is_br_thousands(text: pd.Series) -> bool:
+    # "1.234" sozinho é ambíguo (decimal em inglês, versão "1.100"): além de
+    # todos os valores terem a forma de milhar, exige um valor com mais de um
+    # ponto ("2.500.000") ou inteiros abaixo de mil escritos sem ponto
+    dotted = text.str.match(_BR_THOUSANDS)
+    small = text.str.match(_SMALL_INT)
+    if not dotted.any() or not bool((dotted | small).all()):
+        return False
+    return bool(small.any() or (text[dotted].str.count(r"\.") > 1).any())
+
+def _is_br_number(text: pd.Series) -> bool:
+    plain = text.str.replace(_CURRENCY, "", regex=True)
+    return bool(plain.str.match(_BR_NUMBER).all())
+
+def infer_kind(s: pd.Series, sample_rows: int = INFER_SAMPLE_ROWS) -> Tuple[str, str | None]:
+    """(tipo, formato de data) de uma coluna de texto, a partir de uma amostra."""
+    sample = _sample(s, sample_rows)
+    if sample.empty:
+        return "text", None
+    inferred = pd.api.types.infer_dtype(sample, skipna=True)
+    if inferred in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return "numeric", None
+    if inferred == "boolean":
+        return "boolean", None
+    if inferred in ("datetime", "datetime64", "date"):
+        return "datetime", None
+    if inferred != "string":
+        return "mixed", None
+
+    text = sample.astype(str).str.strip()
+    # sem dígitos no começo da amostra não há número nem data a testar
+    if text.iloc[:INFER_PROBE_ROWS].str.contains(r"\d", regex=True).all():
+        if not text.str.match(_LEADING_ZERO).any():
+            # códigos com zero à esquerda (CEP, matrícula) continuam texto
+            if _is_br_thousands(text):
+                # "950", "1.234", "2.500.000": ponto de milhar, não decimal
+                return "decimal_br", None
+            if _holds(_is_numeric, text):
+                return "numeric", None
+            if _holds(_is_br_number, text) and (text.str.contains(",", regex=False).any()
+                                                or (text.str.count(r"\.") > 1).any()
+                                                or text.str.contains("R$", regex=False).any()):
+                return "decimal_br", None
+        for fmt in DATE_FORMATS:
+            if _holds(lambda t: bool(pd.to_datetime(t, format=fmt, errors="coerce").notna().all()), text):
+                return "datetime", fmt
+    if _holds(lambda t: set(t.str.lower().unique()) <= TRUE_VALUES | FALSE_VALUES, text):
+        return "boolean", None
+    return "text", None
+
+def _text(s: pd.Series, arrow: bool, category_max_ratio: float) -> Tuple[str, pd.Series]:
+    if arrow:
+        out = to_arrow_text(s, category_max_ratio)
+    else:
+        out = s.astype("category")
+        if len(out.cat.categories) > category_max_ratio * len(s):
+            out = s.astype("string")
+    return ("category" if isinstance(out.dtype, pd.CategoricalDtype) else "text"), out
+
+def convert_column(s: pd.Series, kind: str, fmt: str | None = None) -> pd.Series | None:
+    """Converte a coluna inteira; None se algum valor não converter (nulos novos)."""
+    if kind == "numeric":
+        values = s if s.dtype != object else s.where(s.isna(), s.astype(str).str.strip())
+        out = pd.to_numeric(values, errors="coerce")
+        if pd.api.types.is_integer_dtype(out) and len(out):
+            out = pd.to_numeric(out, downcast="unsigned" if out.min() >= 0 else "integer")
+    elif kind == "decimal_br":
+        out = _parse_br(s.astype(str).str.strip().where(s.notna()))
+    elif kind == "datetime":
+        text = s if fmt is None else s.astype(str).str.strip().where(s.notna())
+        out = pd.to_datetime(text, format=fmt, errors="coerce")
+        if not pd.api.types.is_datetime64_any_dtype(out):
+            # fusos misturados (com e sem "Z") não cabem numa coluna de datas
+            return None
+    elif kind == "boolean":
+        if s.dtype != object or pd.api.types.infer_dtype(s, skipna=True) == "boolean":
+            return s.astype("boolean")
+        lower = s.astype(str).str.strip().str.lower()
+        out = pd.Series(pd.NA, index=s.index, dtype="boolean")
+        out[lower.isin(TRUE_VALUES) & s.notna()] = True
+        out[lower.isin(FALSE_VALUES) & s.notna()] = False
+    else:
+        raise ValueError(f"Tipo desconhecido: {kind}")
+    if int(out.isna().sum()) != int(s.isna().sum()):
+        return None
+    return out.rename(s.name)
+
+def _is_text(s: pd.Series) -> bool:
+    return s.dtype == object or isinstance(s.dtype, pd.StringDtype)
+
+def infer_schema(df: pd.DataFrame, sample_rows: int = INFER_SAMPLE_ROWS) -> Dict[str, Tuple[str, str | None]]:
+    """Tipo detectado (e formato de data) de cada coluna de texto, como em optimize_dtypes."""
+    return {col: infer_kind(df[col], sample_rows) for col in df.columns if _is_text(df[col])}
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, Tuple[str, str | None]],
+                 sample_rows: int = INFER_SAMPLE_ROWS) -> pd.DataFrame | None:
+    """
+    Converte um bloco com o esquema detectado em outro (ver `infer_schema`).
+
+    Devolve None se o bloco não seguir o esquema (tipo detectado diferente
+    ou valor que não converte): aí só a leitura do arquivo inteiro dá o
+    mesmo resultado que optimize_dtypes.
+    """
+    if infer_schema(df, sample_rows) != schema:
+        return None
+    out = df.copy(deep=False)
+    for col, (kind, fmt) in schema.items():
+        if kind in ("text", "mixed"):
+            continue
+        converted = convert_column(df[col], kind, fmt)
+        if converted is None:
+            return None
+        out[col] = converted
+    return out
+
+def _optimize_column(s: pd.Series, arrow: bool, sample_rows: int,
+                     category_max_ratio: float) -> Tuple[str, pd.Series]:
+    if pd.api.types.is_integer_dtype(s) and isinstance(s.dtype, np.dtype) and len(s):
+        downcast = "unsigned" if s.min() >= 0 else "integer"
+        return "integer", pd.to_numeric(s, downcast=downcast)
+    if not _is_text(s):
+        return "", s
+    kind, fmt = infer_kind(s, sample_rows)
+    if kind == "mixed":
+        return kind, s
+    if kind != "text":
+        out = convert_column(s, kind, fmt)
+        if out is not None:
+            return kind, out
+    return _text(s, arrow, category_max_ratio)
+
+@traced
+def optimize_dtypes(df: pd.DataFrame, arrow: bool = False, max_workers: int | None = None,
+                    sample_rows: int = INFER_SAMPLE_ROWS,
+                    category_max_ratio: float = ARROW_CATEGORY_MAX_RATIO) -> Tuple[pd.DataFrame, SchemaReport]:
+    """
+    Detecta e aplica o tipo de cada coluna; devolve o DataFrame e o relatório.
+
+    Com `arrow=True`, texto vai para string[pyarrow] e categorias usam
+    dicionário Arrow (ver `data_manager.to_arrow_text`). Inteiros são compactados
+    para o menor tipo. Colunas com tipos misturados não são tocadas.
+    """
+    workers = max_workers or min(INFER_WORKERS, os.cpu_count() or 1)
+    columns = [df.iloc[:, i] for i in range(df.shape[1])]
+
+    def task(s: pd.Series) -> Tuple[str, pd.Series]:
+        return _optimize_column(s, arrow, sample_rows, category_max_ratio)
+
+    if workers > 1 and len(columns) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dataflow-infer") as pool:
+            results = list(pool.map(task, columns))
+    else:
+        results = [task(s) for s in columns]
+
+    out = df.copy(deep=False)
+    report = []
+    for i, (s, (kind, converted)) in enumerate(zip(columns, results)):
+        if converted is not s:
+            out.isetitem(i, converted)
+        if kind:
+            report.append(ColumnReport(
+                column=str(s.name), before=dtype_name(s.dtype), after=dtype_name(converted.dtype), kind=kind,
+                bytes_before=int(s.memory_usage(index=False, deep=True)),
+                bytes_after=int(converted.memory_usage(index=False, deep=True)),
+            ))
+    return out, SchemaReport(report)
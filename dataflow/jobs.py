@@ -0,0 +1,175 @@
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+from dataflow.profiling import traced
+
+# Tarefas longas da sessão (leitura do upload, gráficos, preenchimento de
+# nulos) rodam numa fila em segundo plano; o script só dispara o job e o
+# painel do app consulta o andamento até o resultado ficar pronto.
+#
+# Um pedido idêntico a um job em andamento e não cancelado (ou já concluído
+# e ainda não descartado) devolve o mesmo job. O cancelamento é cooperativo: a função
+# recebe o próprio Job e, a cada `report`/`check`, é interrompida com
+# JobCancelled; o que não tem ponto de checagem roda até o fim e o
+# resultado é descartado.
+
+JOB_WORKERS = 2
+JOB_KEEP = 16      # jobs terminados guardados (com o resultado) por sessão
+
+STATUS_LABELS = {
+    "queued": "na fila",
+    "running": "executando",
+    "done": "concluído",
+    "failed": "falhou",
+    "cancelled": "cancelado",
+}
+
+class JobCancelled(Exception):
+    """Levantada dentro do job quando o usuário pede o cancelamento."""
+
+@dataclass
+class Job:
+    key: str
+    label: str
+    progress: float = 0.0
+    message: str = ""
+    result: Any = field(default=None, repr=False)
+    error: str | None = None
+    started: float | None = None      # time.time() do início da execução
+    finished: float | None = None
+    future: Future | None = field(default=None, repr=False)
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.finished is not None or (self.future is not None and self.future.done())
+
+    @property
+    def ok(self) -> bool:
+        return self.done and self.error is None and not self.cancelled
+
+    @property
+    def status(self) -> str:
+        if self.cancelled and (self.done or self.started is None):
+            return "cancelled"
+        if self.done:
+            return "failed" if self.error is not None else "done"
+        return "running" if self.started is not None else "queued"
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        if self.future is not None:
+            # ainda na fila: nem chega a rodar
+            self.future.cancel()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, frac: float, message: str | None = None) -> None:
+        """Atualiza o andamento (0..1); interrompe o job se ele foi cancelado."""
+        self.check()
+        self.progress = max(self.progress, min(frac, 1.0))
+        if message is not None:
+            self.message = message
+
+class JobManager:
+    """
+    Fila de jobs de uma sessão, executada num pool de threads.
+
+    Threads (e não processos) porque os jobs usam objetos da sessão (caches
+    de gráficos e de grupos, callbacks de progresso) e o pandas/Arrow liberam
+    o GIL nas partes pesadas. Cada job é identificado por `key`; veja
+    `JobManager.key` para montar chaves a partir da versão dos dados.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, keep: int = JOB_KEEP):
+        self.keep = keep
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataflow-job")
+
+    @staticmethod
+    def key(name: str, *parts: Any, **options: Any) -> str:
+        spec = json.dumps([name, parts, options], sort_keys=True, default=str)
+        return f"{name}:{hashlib.blake2b(spec.encode(), digest_size=12).hexdigest()}"
+
+    def job(self, key: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(key)
+
+    @traced
+    def submit(self, key: str, label: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """Agenda `fn(job, *args, **kwargs)`; devolve o job existente se o pedido for idêntico."""
+        with self._lock:
+            existing = self._jobs.get(key)
+            # cancelado mas ainda rodando até o próximo ponto de checagem: não serve
+            if existing is not None and not existing.cancelled and (not existing.done or existing.ok):
+                return existing
+            job = Job(key, label)
+
+            def run() -> None:
+                job.started = time.time()
+                try:
+                    job.check()
+                    result = fn(job, *args, **kwargs)
+                    if not job.cancelled:
+                        job.result = result
+                        job.progress = 1.0
+                except JobCancelled:
+                    pass
+                except Exception as e:
+                    job.error = str(e)
+                finally:
+                    job.finished = time.time()
+                    self._evict()
+
+            self._jobs[key] = job
+            # contexto copiado: as etapas do job entram no tracer ativo (ver profiling.py)
+            job.future = self._pool.submit(contextvars.copy_context().run, run)
+        return job
+
+    def cancel(self, key: str) -> None:
+        job = self.job(key)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, key: str) -> Job | None:
+        """Tira o job da fila (cancelando se ainda estiver rodando) e libera o resultado."""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None and not job.done:
+            job.cancel()
+        return job
+
+    def running(self, prefix: str = "") -> bool:
+        with self._lock:
+            return any(not job.done for key, job in self._jobs.items() if key.startswith(prefix))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            if not job.done:
+                job.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _evict(self) -> None:
+        # só os `keep` jobs terminados mais recentes seguram o resultado
+        with self._lock:
+            # cancelados ainda na fila nunca rodaram (sem `finished`): saem primeiro
+            finished = sorted((j for j in self._jobs.values() if j.done),
+                              key=lambda j: j.finished or 0.0, reverse=True)
+            for job in finished[self.keep:]:
+                del self._jobs[job.key]
@@ -0,0 +1,304 @@
+import copy
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dataflow.data_manager import CHUNK_ROWS, iter_csv_chunks
+from dataflow.filters import FilterEngine, FilterNode, coerce_value
+from dataflow.history import OPERATIONS
+from dataflow.operations import filter_df
+from dataflow.profiling import traced
+
+# Plano lógico preguiçoso sobre um arquivo parquet/CSV.
+#
+# Os passos têm o formato do histórico ({"op": ..., "args": {...}}) e só são
+# executados em `collect()`. Antes disso o otimizador:
+#   - funde passos vizinhos (filtros viram um grupo "and", remoções e
+#     renomeações consecutivas viram uma só);
+#   - empurra para a leitura os filtros que vêm antes de qualquer passo que
+#     altere valores (fillna, edições), traduzindo nomes renomeados;
+#   - lê só as colunas usadas depois (saída + colunas dos filtros).
+# No parquet, condições simples viram filtro do pyarrow (pula row groups
+# pelas estatísticas); no CSV, o filtro é aplicado bloco a bloco na leitura.
+#
+# Filtros não descem quando o plano tem passos que usam o rótulo da linha
+# (delete_rows, apply_edits): o filtro do pyarrow não preserva a posição
+# original. Com `prepare` (conversão de tipos logo após a leitura, como no
+# modo eager do pipeline) descem só as condições sobre colunas que já chegam
+# tipadas da leitura (números, booleanos e datas do parquet; colunas que o
+# read_csv já lê como número), cujos valores a conversão não muda; condições
+# sobre texto esperam a conversão.
+
+Step = Dict[str, Any]
+
+_BY_LABEL = {"delete_rows", "apply_edits"}   # passos que endereçam linhas pelo índice
+TYPE_PROBE_ROWS = 10_000   # linhas do CSV lidas para saber quais colunas já vêm numéricas
+
+_ARROW_COMPARE = {
+    "==": lambda f, v: f == v,
+    "!=": lambda f, v: f != v,
+    ">": lambda f, v: f > v,
+    "<": lambda f, v: f < v,
+    ">=": lambda f, v: f >= v,
+    "<=": lambda f, v: f <= v,
+}
+
+def _filter_columns(node: FilterNode) -> set:
+    if "and" in node or "or" in node:
+        return set().union(*(_filter_columns(c) for c in node.get("and", node.get("or")) or []))
+    return {node.get("col")}
+
+def _rename_filter(node: FilterNode, mapping: Dict[str, str]) -> FilterNode:
+    if "and" in node or "or" in node:
+        kind = "and" if "and" in node else "or"
+        return {kind: [_rename_filter(c, mapping) for c in node[kind]]}
+    return {**node, "col": mapping.get(node.get("col"), node.get("col"))}
+
+def _conjuncts(node: FilterNode) -> List[FilterNode]:
+    if "and" in node:
+        return [leaf for child in node["and"] for leaf in _conjuncts(child)]
+    return [node]
+
+def _and(nodes: List[FilterNode]) -> FilterNode | None:
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else {"and": nodes}
+
+def arrow_expression(node: FilterNode, schema: pa.Schema) -> ds.Expression:
+    """Converte uma árvore de filtros em expressão do pyarrow; ValueError se não der."""
+    if "and" in node or "or" in node:
+        children = [arrow_expression(c, schema) for c in node.get("and", node.get("or")) or []]
+        if not children:
+            raise ValueError("grupo vazio")
+        expr = children[0]
+        for child in children[1:]:
+            expr = (expr & child) if "and" in node else (expr | child)
+        return expr
+    col, op, val = node.get("col"), node.get("op"), node.get("val")
+    if col not in schema.names:
+        raise ValueError(f"Coluna inexistente no filtro: {col}")
+    field = ds.field(col)
+    probe = pd.Series([], dtype=pd.ArrowDtype(schema.field(col).type), name=col)
+    try:
+        if op in _ARROW_COMPARE:
+            return _ARROW_COMPARE[op](field, coerce_value(probe, val))
+        if op == "between":
+            lo, hi = (coerce_value(probe, v) for v in val)
+            return (field >= lo) & (field <= hi)
+        if op in ("isin", "notin"):
+            values = pa.array([coerce_value(probe, v) for v in val])
+            return field.isin(values) if op == "isin" else ~field.isin(values) & field.is_valid()
+        if op == "isna":
+            return field.is_null(nan_is_null=True)
+        if op == "notna":
+            return ~field.is_null(nan_is_null=True)
+    except (pa.ArrowException, TypeError) as e:
+        raise ValueError(str(e))
+    # contains/regex ficam para depois da leitura
+    raise ValueError(f"Operador sem equivalente no pyarrow: {op}")
+
+class LazyFrame:
+    """
+    DataFrame preguiçoso: guarda a origem e os passos, executa em `collect()`.
+
+    >>> lf = LazyFrame.scan("vendas.parquet").delete_columns(["obs"]).filter({"col": "valor", "op": ">", "val": 0})
+    >>> print(lf.explain())
+    >>> df = lf.collect()
+    """
+
+    def __init__(self, path: str, steps: List[Step] | None = None, chunk_rows: int = CHUNK_ROWS,
+                 prepare: Callable[[pd.DataFrame], pd.DataFrame] | None = None):
+        self.path = path
+        self.steps: List[Step] = list(steps or [])
+        self.chunk_rows = chunk_rows
+        self.prepare = prepare         # aplicado ao resultado da leitura, antes dos passos
+        self._schema: List[str] | None = None
+        self._typed: set | None = None
+
+    @classmethod
+    def scan(cls, path: str, **kwargs) -> "LazyFrame":
+        lower = path.lower()
+        if not lower.endswith((".parquet", ".csv")):
+            raise ValueError(f"Leitura preguiçosa só para .parquet ou .csv: {path}")
+        return cls(path, **kwargs)
+
+    def _then(self, op: str, **args) -> "LazyFrame":
+        out = LazyFrame(self.path, self.steps + [{"op": op, "args": args}], self.chunk_rows, self.prepare)
+        out._schema, out._typed = self._schema, self._typed
+        return out
+
+    def delete_columns(self, cols: List[str]) -> "LazyFrame":
+        return self._then("delete_columns", cols=list(cols))
+
+    def rename_columns(self, mapping: Dict[str, str]) -> "LazyFrame":
+        return self._then("rename_columns", mapping=dict(mapping))
+
+    def filter(self, query: "FilterNode | str") -> "LazyFrame":
+        return self._then("filter", query=query)
+
+    def fillna(self, strategy: str = "value", value: Any = None) -> "LazyFrame":
+        return self._then("fillna", strategy=strategy, value=value)
+
+    def apply(self, op: str, **args) -> "LazyFrame":
+        # qualquer outra operação do histórico (barreira para o otimizador)
+        if op not in OPERATIONS and op != "filter":
+            raise ValueError(f"Operação desconhecida: {op}")
+        return self._then(op, **args)
+
+    # ---------------------- otimização ----------------------
+
+    def source_columns(self) -> List[str]:
+        if self._schema is None:
+            if self.path.lower().endswith(".parquet"):
+                self._schema = list(pq.read_schema(self.path).names)
+            else:
+                with open(self.path, "rb") as f:
+                    self._schema = [str(c) for c in next(iter_csv_chunks(f, 1), pd.DataFrame()).columns]
+        return self._schema
+
+    def typed_columns(self) -> set:
+        """Colunas que a leitura já entrega com tipo (números, booleanos, datas)."""
+        if self._typed is None:
+            if self.path.lower().endswith(".parquet"):
+                self._typed = {f.name for f in pq.read_schema(self.path)
+                               if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)
+                               or pa.types.is_boolean(f.type) or pa.types.is_temporal(f.type)}
+            else:
+                with open(self.path, "rb") as f:
+                    probe = next(iter_csv_chunks(f, min(self.chunk_rows, TYPE_PROBE_ROWS)), pd.DataFrame())
+                self._typed = {str(c) for c in probe.columns if pd.api.types.is_numeric_dtype(probe[c])}
+        return self._typed
+
+    @staticmethod
+    def _fuse(steps: List[Step]) -> List[Step]:
+        fused: List[Step] = []
+        for step in steps:
+            prev = fused[-1] if fused else None
+            op, args = step["op"], step.get("args", {})
+            if prev and prev["op"] == op == "filter" and isinstance(args.get("query"), dict) \
+                    and isinstance(prev["args"].get("query"), dict):
+                prev["args"]["query"] = {"and": _conjuncts(prev["args"]["query"]) + _conjuncts(args["query"])}
+            elif prev and prev["op"] == op == "delete_columns":
+                prev["args"]["cols"] = list(dict.fromkeys(prev["args"]["cols"] + list(args.get("cols", []))))
+            elif prev and prev["op"] == op == "rename_columns":
+                first, second = prev["args"]["mapping"], args.get("mapping", {})
+                composed = {src: second.get(dst, dst) for src, dst in first.items()}
+                composed.update({k: v for k, v in second.items() if k not in first.values() and k not in first})
+                prev["args"]["mapping"] = composed
+            elif op == "filter" and not args.get("query"):
+                continue
+            else:
+                fused.append(copy.deepcopy(step))
+        return fused
+
+    @traced
+    def optimize(self) -> Tuple[List[str] | None, FilterNode | None, List[Step]]:
+        """(colunas a ler, filtro na leitura, passos restantes)."""
+        steps = self._fuse(self.steps)
+
+        # filtros antes de qualquer passo que altere valores vão para a leitura
+        pushed: List[FilterNode] = []
+        remaining: List[Step] = []
+        to_source: Dict[str, str] = {}     # nome atual -> nome no arquivo
+        dropped: set = set()
+        barrier = any(step["op"] in _BY_LABEL for step in steps)
+        typed = self.typed_columns() if self.prepare is not None else None
+        for step in steps:
+            op, args = step["op"], step.get("args", {})
+            if not barrier and op == "filter" and isinstance(args.get("query"), dict) \
+                    and not _filter_columns(args["query"]) & dropped:
+                kept = []
+                for node in _conjuncts(args["query"]):
+                    source = _rename_filter(node, to_source)
+                    if typed is None or _filter_columns(source) <= typed:
+                        pushed.append(source)
+                    else:
+                        kept.append(node)
+                if kept:
+                    # filtros comutam entre si: os seguintes ainda podem descer
+                    remaining.append({"op": "filter", "args": {"query": _and(kept)}})
+                continue
+            if not barrier and op == "rename_columns":
+                for src, dst in args["mapping"].items():
+                    to_source[dst] = to_source.pop(src, src)
+                    dropped.discard(dst)
+            elif not barrier and op == "delete_columns":
+                dropped |= set(args["cols"])
+            elif op not in ("delete_columns", "rename_columns"):
+                barrier = True
+            remaining.append(step)
+
+        # colunas: parte da saída e volta pelos passos somando o que cada um usa
+        columns = list(self.source_columns())
+        for step in remaining:
+            op, args = step["op"], step.get("args", {})
+            if op == "delete_columns":
+                columns = [c for c in columns if c not in set(args["cols"])]
+            elif op == "rename_columns":
+                columns = [args["mapping"].get(c, c) for c in columns]
+        needed = set(columns)
+        for step in reversed(remaining):
+            op, args = step["op"], step.get("args", {})
+            if op == "filter":
+                if not isinstance(args.get("query"), dict):
+                    return None, _and(pushed), remaining    # df.query: colunas desconhecidas
+                needed |= _filter_columns(args["query"])
+            elif op == "rename_columns":
+                back = {dst: src for src, dst in args["mapping"].items()}
+                needed = {back.get(c, c) for c in needed}
+            elif op not in ("delete_columns", "fillna"):
+                return None, _and(pushed), remaining        # passo opaco: lê tudo
+        for node in pushed:
+            needed |= _filter_columns(node)
+        scan = [c for c in self.source_columns() if c in needed]
+        return scan, _and(pushed), remaining
+
+    def explain(self) -> str:
+        columns, predicate, remaining = self.optimize()
+        lines = [f"LEITURA {self.path}",
+                 f"  colunas: {'todas' if columns is None else ', '.join(columns)}",
+                 f"  filtro:  {predicate if predicate else '-'}"]
+        lines += [f"{step['op'].upper()} {step.get('args', {})}" for step in remaining]
+        return "\n".join(lines)
+
+    # ---------------------- execução ----------------------
+
+    def _read(self, columns: List[str] | None, predicate: FilterNode | None) -> pd.DataFrame:
+        if self.path.lower().endswith(".parquet"):
+            schema = pq.read_schema(self.path)
+            pushable, residual = [], []
+            for node in _conjuncts(predicate) if predicate else []:
+                try:
+                    pushable.append(arrow_expression(node, schema))
+                except ValueError:
+                    residual.append(node)
+            expr = None
+            for e in pushable:
+                expr = e if expr is None else expr & e
+            df = pq.read_table(self.path, columns=columns, filters=expr).to_pandas()
+            rest = _and(residual)
+            return FilterEngine(df).apply(rest) if rest else df
+
+        frames = []
+        usecols = columns if columns is not None else None
+        with open(self.path, "rb") as f:
+            for chunk in iter_csv_chunks(f, self.chunk_rows, usecols=usecols):
+                frames.append(FilterEngine(chunk).apply(predicate) if predicate else chunk)
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        # os blocos do read_csv continuam a numeração: o índice é a linha no arquivo, como no eager
+        return pd.concat(frames, copy=False)
+
+    @traced
+    def collect(self) -> pd.DataFrame:
+        columns, predicate, remaining = self.optimize()
+        df = self._read(columns, predicate)
+        if self.prepare is not None:
+            df = self.prepare(df)
+        for step in remaining:
+            op, args = step["op"], step.get("args", {})
+            df = filter_df(df, args.get("query")) if op == "filter" else OPERATIONS[op](df, **args)
+        return df
@@ -1,35 +1,159 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Tuple
 
+from dataflow.filters import FilterEngine, FilterNode
+from dataflow.profiling import traced
+
+@traced
 def delete_columns(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
     return df.drop(columns=cols, errors="ignore")
 
+@traced
 def delete_rows(df: pd.DataFrame, index_list: List[int]) -> pd.DataFrame:
     return df.drop(index=index_list, errors="ignore").reset_index(drop=True)
 
-def fillna(df: pd.DataFrame, strategy: str = "value", value: Any = None) -> pd.DataFrame:
+@traced
+def fillna(df: pd.DataFrame, strategy: str = "value", value: Any = None,
+           progress: Callable[[float, str], None] | None = None) -> pd.DataFrame:
     if strategy == "median":
-        return df.fillna(df.median(numeric_only=True))
-    if strategy == "mean":
-        return df.fillna(df.mean(numeric_only=True))
-    if strategy == "mode":
-        return df.fillna(df.mode().iloc[0])
-    return df.fillna(value)
-
-def filter_df(df: pd.DataFrame, query_str: str) -> pd.DataFrame:
-    if not query_str:
+        fills = df.median(numeric_only=True)
+    elif strategy == "mean":
+        fills = df.mean(numeric_only=True)
+    elif strategy == "mode":
+        modes = df.mode()
+        fills = modes.iloc[0] if not modes.empty else pd.Series(dtype=object)
+    else:
+        if value is None:
+            return df
+        fills = pd.Series([value] * len(df.columns), index=df.columns, dtype=object)
+
+    # só as colunas com nulos são reescritas; as demais compartilham os buffers
+    # com o DataFrame de entrada (importante para os snapshots do histórico)
+    out = df.copy(deep=False)
+    has_na = df.isna().any()
+    targets = df.columns[has_na.values]
+    for i, col in enumerate(targets):
+        if progress is not None:
+            # ponto de checagem dos jobs: o cancelamento interrompe entre colunas
+            progress(i / len(targets), col)
+        if col in fills.index and not pd.isna(fills[col]):
+            s = _with_categories(df[col], [fills[col]])
+            out[col] = s.fillna(fills[col])
+    return out
+
+@traced
+def filter_df(df: pd.DataFrame, query: "str | FilterNode | None") -> pd.DataFrame:
+    # aceita uma árvore de filtros (dataflow.filters) ou uma expressão do df.query;
+    # filtros inválidos levantam ValueError em vez de devolver o dataset inteiro
+    if not query:
         return df
+    if isinstance(query, dict):
+        return FilterEngine(df).apply(query)
     try:
-        return df.query(query_str, engine="python")
-    except Exception:
-        # mantém dataset se query inválida
-        return df
+        return df.query(query)
+    except Exception as e:
+        raise ValueError(f"Filtro inválido: {query} ({e})") from e
 
+@traced
 def rename_columns(df: pd.DataFrame, mapping: Dict[str, str]) -> pd.DataFrame:
-    return df.rename(columns=mapping)
+    out = df.rename(columns=mapping)
+    repeated = out.columns[out.columns.duplicated()].difference(df.columns[df.columns.duplicated()])
+    if len(repeated):
+        # "A->B" com B já existente: duas colunas com o mesmo nome não cabem no Arrow nem nos filtros
+        raise ValueError(f"Renomeação criaria colunas repetidas: {', '.join(map(str, repeated))}")
+    return out
 
-def convert_dtypes_safely(df: pd.DataFrame) -> pd.DataFrame:
+def _with_categories(s: pd.Series, values) -> pd.Series:
+    # colunas categóricas (modo Arrow) só aceitam valores do dicionário:
+    # valores novos entram como categorias em vez de converter a coluna
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    new = pd.Index(pd.Series(list(values), dtype=object).dropna().unique())
+    new = new.difference(s.cat.categories.astype(object))
+    if not len(new):
+        return s
+    return s.cat.add_categories(new.astype(s.cat.categories.dtype))
+
+def _cast_like(values: pd.Series, dtype) -> pd.Series:
     try:
-        return df.convert_dtypes()
-    except Exception:
-        return df
+        cast = values.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        # valor incompatível com o tipo da coluna: o pandas promove a coluna
+        return values
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        # inteiros numpy compactados "dão a volta" (300 vira 44 em uint8) e
+        # truncam 1.5: conversão com perda também promove a coluna
+        wanted = pd.to_numeric(values, errors="coerce")
+        same = (wanted == pd.to_numeric(cast, errors="coerce")).fillna(False) | (wanted.isna() & cast.isna())
+        if not bool(same.all()):
+            return values
+    return cast
+
+def _widen(s: pd.Series, values: pd.Series):
+    """Tipo numérico que comporta a coluna e `values`; None se os valores não forem números."""
+    if isinstance(s.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(s) \
+            or pd.api.types.is_bool_dtype(s):
+        return None
+    wanted = pd.to_numeric(values, errors="coerce")
+    if bool((wanted.isna() & values.notna()).any()):
+        return None
+    base = getattr(s.dtype, "numpy_dtype", s.dtype)
+    numbers = wanted.dropna().to_numpy()
+    if not len(numbers):
+        need = base
+    elif bool((numbers % 1 == 0).all()):
+        # inteiro fora da faixa (300 em uint8, -1 em uint16): o menor inteiro que cabe os dois
+        need = np.result_type(base, np.min_scalar_type(int(numbers.min())), np.min_scalar_type(int(numbers.max())))
+    else:
+        need = np.result_type(base, np.float64)
+    if need.kind in "iu" and (bool(wanted.isna().any()) or not isinstance(s.dtype, np.dtype)):
+        # nulo em coluna inteira: inteiro anulável (UInt8, Int16...) em vez de object
+        return pd.api.types.pandas_dtype(need.name.replace("uint", "UInt").replace("int", "Int", 1))
+    return need
+
+def _fit(s: pd.Series, values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    # (coluna, valores) com um tipo comum: o da coluna, um numérico mais largo ou object
+    cast = _cast_like(values, s.dtype)
+    if cast is not values or values.dtype == s.dtype:
+        return s, cast
+    wider = _widen(s, values)
+    if wider is None:
+        return s.astype(object), values
+    return s.astype(wider), _cast_like(values, wider)
+
+@traced
+def apply_edits(df: pd.DataFrame, cells: List[List[Any]] = (), added: List[Dict[str, Any]] = (),
+                deleted: List[int] = ()) -> pd.DataFrame:
+    """
+    Aplica um delta de edição ao DataFrame, preservando os tipos das colunas.
+
+    Args:
+        cells: triplas [id_da_linha, coluna, valor] com as células alteradas.
+        added: linhas novas como dicts coluna -> valor; recebem ids após o maior existente.
+        deleted: ids das linhas removidas.
+    """
+    out = df.copy(deep=False)
+
+    by_col: Dict[str, Dict[Any, Any]] = {}
+    for row_id, col, val in cells:
+        if col in out.columns and row_id in out.index:
+            by_col.setdefault(col, {})[row_id] = val
+    for col, changes in by_col.items():
+        # coluna a coluna: só as colunas tocadas são copiadas
+        values = pd.Series(list(changes.values()), index=list(changes))
+        s, cast = _fit(_with_categories(out[col], values).copy(), values)
+        s.loc[values.index] = cast
+        out[col] = s
+
+    if added:
+        start = int(out.index.max()) + 1 if len(out.index) else 0
+        new_rows = pd.DataFrame(list(added), columns=out.columns,
+                                index=pd.RangeIndex(start, start + len(added)))
+        for col in out.columns:
+            out[col], new_rows[col] = _fit(_with_categories(out[col], new_rows[col]), new_rows[col])
+        out = pd.concat([out, new_rows])
+
+    if deleted:
+        out = out.drop(index=list(deleted), errors="ignore")
+    return out
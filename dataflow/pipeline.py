@@ -0,0 +1,241 @@
+import contextlib
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from dataflow.charts import ChartCache, plot_and_save
+from dataflow.data_manager import CHUNK_ROWS, iter_csv_chunks, load_excel, read_csv_chunked
+from dataflow.exporters import EXPORT_FORMATS
+from dataflow.groupby import GroupByEngine
+from dataflow.history import OPERATIONS
+from dataflow.inference import apply_schema, infer_schema, optimize_dtypes
+from dataflow.lazy import LazyFrame
+from dataflow.operations import filter_df
+from dataflow.profiling import traced
+from dataflow.stats import ColumnStats
+
+# Execução sem interface de um pipeline declarativo (ver `python -m dataflow`).
+#
+# Especificação (JSON, ou YAML se o PyYAML estiver instalado):
+#   inputs:   ["dados/*.csv", "extra.xlsx"]
+#   output:   "saida"                          # uma pasta por arquivo de entrada
+#   workers:  4                                # processos (padrão: nº de CPUs)
+#   arrow:    false                            # armazenamento Arrow (ver inference.optimize_dtypes)
+#   lazy:     false                            # plano preguiçoso para .csv/.parquet (ver lazy.py)
+#   steps:    [{"op": "fillna", "args": {"strategy": "value", "value": 0}}, ...]
+#   charts:   [{"x": "Cidade", "y": "Valor", "kind": "bar", "agg": "sum", "top_n": 20}]
+#   exports:  ["csv", "parquet", {"format": "pdf", "max_rows": 100}]
+#
+# Os passos usam o mesmo formato do histórico (OperationLog.to_json), mais
+# "filter" com `query` (árvore de filtros ou expressão do df.query).
+
+STEPS: Dict[str, Callable[..., pd.DataFrame]] = {**OPERATIONS, "filter": filter_df}
+
+# passos que valem linha a linha: podem ser aplicados bloco a bloco
+_ROW_LOCAL = {"delete_columns", "rename_columns", "filter"}
+
+def load_spec(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("Pipeline em YAML requer o pacote PyYAML (ou use JSON).")
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    if not isinstance(spec, dict):
+        raise ValueError("Pipeline inválido: esperado um objeto com inputs/steps/exports.")
+    for step in spec.get("steps", []):
+        if step.get("op") not in STEPS:
+            raise ValueError(f"Operação desconhecida no pipeline: {step.get('op')}")
+    return spec
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        files.extend(m for m in matches if m not in files)
+    return files
+
+def _export_specs(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"format": e} if isinstance(e, str) else dict(e) for e in spec.get("exports", [])]
+
+def _apply_steps(df: pd.DataFrame, steps: List[Dict[str, Any]]) -> pd.DataFrame:
+    for step in steps:
+        df = STEPS[step["op"]](df, **step.get("args", {}))
+    return df
+
+def streamable(spec: Dict[str, Any], path: str) -> bool:
+    # CSV -> CSV sem gráficos e só com passos linha a linha (fillna por valor
+    # fixo incluído) dispensa carregar o arquivo inteiro
+    if not path.lower().endswith(".csv") or spec.get("charts") or spec.get("arrow"):
+        return False
+    if any(e["format"] != "csv" for e in _export_specs(spec)):
+        return False
+    for step in spec.get("steps", []):
+        args = step.get("args", {})
+        if step["op"] == "fillna" and args.get("strategy", "value") == "value":
+            continue
+        if step["op"] not in _ROW_LOCAL:
+            return False
+    return True
+
+def _load(path: str, arrow: bool) -> pd.DataFrame:
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        with open(path, "rb") as f:
+            df = read_csv_chunked(f)
+    elif lower.endswith(".xlsx"):
+        df = next(iter(load_excel([path]).values()))
+    elif lower.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Formato não suportado: {path}")
+    return optimize_dtypes(df, arrow=arrow)[0]
+
+class StageTimer:
+    """Acumula o tempo gasto em cada etapa (load, steps, charts, export:<formato>)."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+def _run_streaming(spec: Dict[str, Any], path: str, outdir: Path, timer: StageTimer) -> int | None:
+    # cada bloco passa pela mesma detecção de tipos do caminho completo (_load),
+    # com o esquema do primeiro bloco; None se um bloco não seguir esse esquema
+    steps = spec.get("steps", [])
+    target = outdir / f"{Path(path).stem}.csv"
+    tmp = target.with_suffix(".tmp")
+    rows, header, schema = 0, True, None
+    try:
+        with open(path, "rb") as src, open(tmp, "wb") as out, \
+                contextlib.closing(iter_csv_chunks(src, int(spec.get("chunk_rows", CHUNK_ROWS)))) as chunks:
+            while True:
+                with timer.stage("load"):
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    if schema is None:
+                        schema = infer_schema(chunk)
+                    chunk = apply_schema(chunk, schema)
+                if chunk is None:
+                    return None
+                with timer.stage("steps"):
+                    chunk = _apply_steps(chunk, steps)
+                with timer.stage("export:csv"):
+                    out.write(chunk.to_csv(index=False, header=header).encode("utf-8"))
+                header = False
+                rows += len(chunk)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return rows
+
+def _run_full(spec: Dict[str, Any], path: str, outdir: Path, timer: StageTimer) -> int:
+    if spec.get("lazy") and path.lower().endswith((".csv", ".parquet")):
+        # leitura e passos num só estágio: as colunas não usadas nem são lidas e
+        # filtros sobre colunas já tipadas descem para a leitura. Os tipos são
+        # convertidos antes dos demais passos, como no modo eager (_load)
+        with timer.stage("load+steps"):
+            arrow = bool(spec.get("arrow"))
+            plan = LazyFrame(path, spec.get("steps", []), int(spec.get("chunk_rows", CHUNK_ROWS)),
+                             prepare=lambda df: optimize_dtypes(df, arrow=arrow)[0])
+            df = plan.collect()
+    else:
+        with timer.stage("load"):
+            df = _load(path, bool(spec.get("arrow")))
+        with timer.stage("steps"):
+            df = _apply_steps(df, spec.get("steps", []))
+
+    charts = []
+    if spec.get("charts"):
+        with timer.stage("charts"):
+            groups = GroupByEngine()
+            cache = ChartCache(str(outdir))
+            for chart in spec["charts"]:
+                charts.append(plot_and_save(
+                    df, chart.get("x"), chart.get("y"), kind=chart.get("kind", "bar"), outdir=str(outdir),
+                    agg=chart.get("agg", "none"), top_n=chart.get("top_n"), cache=cache, groups=groups,
+                ))
+
+    context = {"outdir": str(outdir), "stats": ColumnStats()}
+    for export in _export_specs(spec):
+        options = dict(export)
+        fmt = EXPORT_FORMATS.get(options.pop("format"))
+        if fmt is None:
+            raise ValueError(f"Formato de exportação desconhecido: {export['format']}")
+        if fmt.name == "pdf":
+            options.setdefault("charts", charts)
+        target = outdir / f"{Path(path).stem}.{fmt.extension}"
+        tmp = target.with_name(target.name + ".tmp")
+        with timer.stage(f"export:{fmt.name}"):
+            fmt.writer(df, str(tmp), lambda *_: None, context, **options)
+            os.replace(tmp, target)
+    return len(df)
+
+@traced
+def run_file(spec: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """Processa um arquivo de entrada; devolve linhas, modo e tempos por etapa."""
+    pd.set_option("mode.copy_on_write", True)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    outdir = Path(spec.get("output", "dataflow_output")) / Path(path).stem
+    outdir.mkdir(parents=True, exist_ok=True)
+    timer = StageTimer()
+    start = time.perf_counter()
+    stream = streamable(spec, path)
+    rows = _run_streaming(spec, path, outdir, timer) if stream else None
+    if rows is None:
+        # blocos com tipos divergentes: lê o arquivo inteiro, como no caminho completo
+        stream = False
+        rows = _run_full(spec, path, outdir, timer)
+    return {"file": path, "rows": rows, "streamed": stream, "stages": timer.stages,
+            "total": time.perf_counter() - start}
+
+@traced
+def run_pipeline(spec: Dict[str, Any], workers: int | None = None,
+                 on_result: Callable[[Dict[str, Any]], None] | None = None) -> List[Dict[str, Any]]:
+    files = expand_inputs(spec.get("inputs", []))
+    if not files:
+        raise ValueError("Nenhum arquivo de entrada encontrado.")
+    workers = min(len(files), workers or spec.get("workers") or os.cpu_count() or 1)
+    results = []
+
+    def collect(result):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    if workers == 1:
+        for path in files:
+            collect(_safe_run(spec, path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_safe_run, spec, path) for path in files]
+            for future in as_completed(futures):
+                collect(future.result())
+    order = {path: i for i, path in enumerate(files)}
+    return sorted(results, key=lambda r: order[r["file"]])
+
+def _safe_run(spec: Dict[str, Any], path: str) -> Dict[str, Any]:
+    # um arquivo com problema não derruba o lote
+    try:
+        return run_file(spec, path)
+    except Exception as e:
+        return {"file": path, "rows": 0, "streamed": False, "stages": {}, "total": 0.0, "error": str(e)}
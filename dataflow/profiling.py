@@ -0,0 +1,223 @@
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+# Medição de tempo (e, opcionalmente, pico de memória) por etapa.
+#
+# As funções de `dataflow` são marcadas com @traced; fora de um Tracer
+# ativo o custo é uma consulta a um ContextVar. O app abre um "rerun" por
+# execução do script e marca as seções ("app:upload", "app:editor", ...) com
+# `section()`; as chamadas de `dataflow` feitas dentro viram spans filhos.
+# Threads de trabalho só registram spans se rodarem com o contexto copiado
+# (ver ExportPipeline.submit).
+
+_active: contextvars.ContextVar["Tracer | None"] = contextvars.ContextVar("dataflow_tracer", default=None)
+
+@dataclass
+class Span:
+    name: str
+    start: float                  # segundos desde a criação do Tracer
+    duration: float
+    depth: int
+    thread: int
+    peak_bytes: int | None = None  # alocado acima do início do span (tracemalloc)
+
+@dataclass
+class Run:
+    index: int
+    started: float                # time.time() do início
+    spans: List[Span] = field(default_factory=list)
+    finished: bool = False
+
+    @property
+    def total(self) -> float:
+        return sum(s.duration for s in self.spans if s.name == "rerun")
+
+@dataclass
+class _Open:
+    name: str
+    start: float
+    run: Run | None                # rerun em que o span começou
+    memory_at_start: int = 0
+    peak_carry: int = 0            # maior pico visto pelos filhos (reset_peak apaga o do pai)
+
+class Tracer:
+    """
+    Spans agrupados por rerun; guarda os `keep_runs` mais recentes.
+
+    Com `memory=True` o tracemalloc fica ligado enquanto o tracer estiver
+    ativo (as alocações ficam bem mais lentas) e cada span da thread do
+    script registra o pico alocado acima do início. Só as alocações do
+    Python/NumPy são vistas; buffers do pool do Arrow não entram.
+    """
+
+    def __init__(self, memory: bool = False, keep_runs: int = 20):
+        self.memory = memory
+        self.runs: "deque[Run]" = deque(maxlen=keep_runs)
+        self._origin = time.perf_counter()
+        self._stacks: Dict[int, List[_Open]] = {}     # spans abertos por thread
+        self._lock = threading.Lock()
+        self._owner: int | None = None
+        self._started_tracemalloc = False
+        self._count = 0
+
+    # ---------------------- ciclo do rerun ----------------------
+
+    @property
+    def current(self) -> Run | None:
+        run = self.runs[-1] if self.runs else None
+        return run if run is not None and not run.finished else None
+
+    @property
+    def last_finished(self) -> Run | None:
+        return next((r for r in reversed(self.runs) if r.finished), None)
+
+    def begin_run(self) -> Run:
+        # um rerun interrompido (st.stop/st.rerun) é fechado aqui
+        self.end_run()
+        self._owner = threading.get_ident()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif not self.memory:
+            self._stop_tracemalloc()
+        self._count += 1
+        run = Run(self._count, time.time())
+        with self._lock:
+            self.runs.append(run)
+        _active.set(self)
+        self._push("rerun")
+        return run
+
+    def end_run(self) -> None:
+        if self.current is None:
+            return
+        # o Streamlit pode rodar cada rerun numa thread nova: fecha a pilha
+        # da thread que abriu este rerun
+        stack = self._stacks.get(self._owner, [])
+        while stack:
+            self._pop(stack)
+        self.current.finished = True
+
+    def disable(self) -> None:
+        self.end_run()
+        self._stop_tracemalloc()
+        if _active.get() is self:
+            _active.set(None)
+
+    def _stop_tracemalloc(self) -> None:
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracemalloc = False
+
+    def section(self, name: str) -> None:
+        """Fecha a seção anterior do app (se houver) e abre `name` logo abaixo do rerun."""
+        stack = self._stack()
+        while len(stack) > 1:
+            self._pop(stack)
+        if stack:
+            self._push(name)
+
+    # ---------------------- spans ----------------------
+
+    def _stack(self) -> List[_Open]:
+        with self._lock:
+            return self._stacks.setdefault(threading.get_ident(), [])
+
+    def _tracks_memory(self) -> bool:
+        return self.memory and tracemalloc.is_tracing() and threading.get_ident() == self._owner
+
+    def _push(self, name: str) -> None:
+        entry = _Open(name, time.perf_counter(), self.current)
+        stack = self._stack()
+        if self._tracks_memory():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_carry = max(stack[-1].peak_carry, peak)
+            tracemalloc.reset_peak()
+            entry.memory_at_start = current
+        stack.append(entry)
+
+    def _pop(self, stack: List[_Open]) -> None:
+        entry = stack.pop()
+        end = time.perf_counter()
+        peak_bytes = None
+        if self._tracks_memory():
+            peak = max(tracemalloc.get_traced_memory()[1], entry.peak_carry)
+            peak_bytes = max(peak - entry.memory_at_start, 0)
+            if stack:
+                stack[-1].peak_carry = max(stack[-1].peak_carry, peak)
+        span = Span(entry.name, entry.start - self._origin, end - entry.start, len(stack),
+                    threading.get_ident(), peak_bytes)
+        if entry.run is not None:
+            # spans de threads de trabalho podem terminar depois do rerun
+            with self._lock:
+                entry.run.spans.append(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        if self.current is None:
+            yield
+            return
+        self._push(name)
+        try:
+            yield
+        finally:
+            self._pop(self._stack())
+
+    # ---------------------- relatórios ----------------------
+
+    @staticmethod
+    def summary(run: Run) -> pd.DataFrame:
+        """Tempo por nome de span no rerun: chamadas, total, maior chamada e pico."""
+        rows: Dict[str, Dict[str, Any]] = {}
+        for s in run.spans:
+            if s.name == "rerun":
+                continue
+            row = rows.setdefault(s.name, {"Etapa": s.name, "Chamadas": 0, "Total (ms)": 0.0,
+                                           "Maior (ms)": 0.0, "Pico (MB)": None})
+            row["Chamadas"] += 1
+            row["Total (ms)"] += s.duration * 1000
+            row["Maior (ms)"] = max(row["Maior (ms)"], s.duration * 1000)
+            if s.peak_bytes is not None:
+                row["Pico (MB)"] = max(row["Pico (MB)"] or 0.0, s.peak_bytes / 2**20)
+        out = pd.DataFrame(list(rows.values()), columns=["Etapa", "Chamadas", "Total (ms)", "Maior (ms)", "Pico (MB)"])
+        return out.sort_values("Total (ms)", ascending=False, ignore_index=True)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Os reruns guardados no formato Trace Event (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            runs = [r for r in self.runs if r.finished]
+        for run in runs:
+            for s in run.spans:
+                args: Dict[str, Any] = {"rerun": run.index}
+                if s.peak_bytes is not None:
+                    args["peak_mb"] = round(s.peak_bytes / 2**20, 3)
+                category = "app" if s.name == "rerun" or s.name.startswith("app:") else "dataflow"
+                events.append({"name": s.name, "cat": category, "ph": "X", "ts": s.start * 1e6,
+                               "dur": s.duration * 1e6, "pid": pid, "tid": s.thread, "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def traced(fn: Callable) -> Callable:
+    """Registra cada chamada de `fn` como um span "<módulo>.<nome>" no tracer ativo."""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracer = _active.get()
+        if tracer is None:
+            return fn(*args, **kwargs)
+        with tracer.span(name):
+            return fn(*args, **kwargs)
+    return wrapper
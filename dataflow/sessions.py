@@ -0,0 +1,170 @@
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from dataflow.data_manager import SESSION_DIR, IngestCache
+from dataflow.profiling import traced
+
+# Vários usuários no mesmo servidor.
+#
+# Cada sessão do app grava autosave, gráficos e exportações na própria pasta
+# (SessionSpace); pastas sem atividade há mais de SESSION_TTL_HOURS são
+# apagadas quando outra sessão começa.
+#
+# Os DataFrames lidos ficam num DatasetStore compartilhado pelo processo: N
+# sessões com o mesmo upload usam a mesma cópia, mapeada em memória a partir
+# do arquivo Arrow do cache de ingestão. Cada sessão recebe uma cópia rasa;
+# com o copy-on-write do pandas, só as colunas que ela edita são copiadas.
+
+SESSIONS_DIR = SESSION_DIR / "sessions"
+SESSION_TTL_HOURS = 12
+_HEARTBEAT = ".alive"
+
+class SessionSpace:
+    """Pasta de uma sessão: autosave, gráficos e exportações sem colidir com as de outros usuários."""
+
+    def __init__(self, session_id: str | None = None, root: Path = SESSIONS_DIR):
+        self.id = session_id or uuid.uuid4().hex
+        self.folder = Path(root) / self.id
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.touch()
+
+    @property
+    def cache_dir(self) -> str:
+        # gráficos e, em cache_dir/exports, os arquivos exportados
+        return str(self.folder)
+
+    @property
+    def autosave_key(self) -> str:
+        # chave relativa a SESSION_DIR, como espera data_manager.autosave
+        return (self.folder / "autosave").relative_to(SESSION_DIR).as_posix()
+
+    def touch(self) -> None:
+        # recria a pasta (e a de exportações) se a sessão ficou parada além do TTL e foi limpa
+        (self.folder / "exports").mkdir(parents=True, exist_ok=True)
+        (self.folder / _HEARTBEAT).touch()
+
+def _last_seen(folder: Path) -> float:
+    try:
+        return (folder / _HEARTBEAT).stat().st_mtime
+    except FileNotFoundError:
+        return folder.stat().st_mtime
+
+@traced
+def cleanup_sessions(ttl_hours: float = SESSION_TTL_HOURS, root: Path = SESSIONS_DIR,
+                     keep: tuple = ()) -> List[str]:
+    """Apaga as pastas de sessões inativas há mais de `ttl_hours`; devolve os ids removidos."""
+    root = Path(root)
+    if not root.exists():
+        return []
+    limit = time.time() - ttl_hours * 3600
+    removed = []
+    for folder in root.iterdir():
+        if not folder.is_dir() or folder.name in keep:
+            continue
+        try:
+            if _last_seen(folder) < limit:
+                shutil.rmtree(folder, ignore_errors=True)
+                removed.append(folder.name)
+        except FileNotFoundError:
+            # outra sessão limpou ao mesmo tempo
+            continue
+    return removed
+
+@dataclass
+class _Shared:
+    df: pd.DataFrame
+    holders: Dict[str, float] = field(default_factory=dict)   # sessão -> último uso
+
+class DatasetStore:
+    """
+    DataFrames somente leitura compartilhados entre sessões, por chave de ingestão.
+
+    O conteúdo vem do IngestCache (Arrow IPC mapeado em memória), então os
+    buffers são páginas do arquivo, divididas com o sistema operacional.
+    Cada sessão que usa uma chave conta uma referência; sem referências a
+    entrada sai da memória (o arquivo continua no cache de ingestão).
+    Sessões sem sinal há mais de `ttl_hours` perdem as referências em `sweep`.
+    """
+
+    def __init__(self, cache: IngestCache | None = None, ttl_hours: float = SESSION_TTL_HOURS):
+        self.cache = cache or IngestCache()
+        self.ttl_hours = ttl_hours
+        self._entries: Dict[str, _Shared] = {}
+        self._lock = threading.Lock()
+        self._writing: Dict[str, threading.Lock] = {}
+
+    def _hold(self, key: str, df: pd.DataFrame, session: str) -> pd.DataFrame:
+        with self._lock:
+            entry = self._entries.setdefault(key, _Shared(df))
+            entry.holders[session] = time.time()
+            shared = entry.df
+        # cópia rasa: a sessão edita a própria versão, as colunas intactas continuam compartilhadas
+        return shared.copy(deep=False)
+
+    @traced
+    def acquire(self, key: str, session: str) -> pd.DataFrame | None:
+        """O dataset da chave (da memória ou do cache em disco); None se nunca foi lido."""
+        with self._lock:
+            entry = self._entries.get(key)
+        df = entry.df if entry is not None else self.cache.get(key)
+        if df is None:
+            return None
+        return self._hold(key, df, session)
+
+    @traced
+    def put(self, key: str, df: pd.DataFrame, session: str) -> pd.DataFrame:
+        """Publica um dataset recém-lido e devolve a versão compartilhada (mapeada do disco, se possível)."""
+        with self._lock:
+            writing = self._writing.setdefault(key, threading.Lock())
+        # duas sessões com o mesmo upload ao mesmo tempo: só uma grava o arquivo
+        with writing:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                shared = self.cache.get(key) if self.cache.put(key, df) is not None else None
+                # sem representação Arrow (tipos misturados): compartilha o próprio DataFrame
+                df = shared if shared is not None else df
+            else:
+                df = entry.df
+            out = self._hold(key, df, session)
+        with self._lock:
+            self._writing.pop(key, None)
+        return out
+
+    def release(self, key: str | None, session: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.holders.pop(session, None)
+            if not entry.holders:
+                del self._entries[key]
+
+    def touch(self, session: str) -> None:
+        now = time.time()
+        with self._lock:
+            for entry in self._entries.values():
+                if session in entry.holders:
+                    entry.holders[session] = now
+
+    def sweep(self) -> None:
+        limit = time.time() - self.ttl_hours * 3600
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                for session, seen in list(entry.holders.items()):
+                    if seen < limit:
+                        del entry.holders[session]
+                if not entry.holders:
+                    del self._entries[key]
+
+    def refs(self) -> Dict[str, int]:
+        """Sessões que usam cada dataset em memória."""
+        with self._lock:
+            return {key: len(entry.holders) for key, entry in self._entries.items()}
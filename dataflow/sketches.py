@@ -0,0 +1,197 @@
+import math
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from dataflow.profiling import traced
+
+# Sketches mergeáveis para estatísticas aproximadas em colunas grandes.
+# Todos aceitam `update` por blocos e `merge` de outro sketch do mesmo tipo,
+# então podem ser construídos por chunks (inclusive durante a leitura) e
+# combinados depois.
+
+SKETCH_CHUNK_ROWS = 1_000_000
+
+def hash_values(s: pd.Series) -> np.ndarray:
+    # numéricos viram float64 antes do hash para que 1 (int8) e 1 (int64)
+    # de chunks diferentes caiam no mesmo valor
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        s = s.astype("float64")
+    return pd.util.hash_pandas_object(s, index=False).to_numpy(dtype=np.uint64)
+
+def _clz64(x: np.ndarray) -> np.ndarray:
+    # contagem de zeros à esquerda, vetorizada (busca binária nos bits)
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x < (np.uint64(1) << np.uint64(64 - shift))
+        n[small] += shift
+        x[small] <<= np.uint64(shift)
+    return n
+
+class HyperLogLog:
+    """Contagem aproximada de distintos; erro padrão ~1.04/sqrt(2**p)."""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.p)
+        idx = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        rank = np.minimum(_clz64(rest) + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def update(self, s: pd.Series) -> None:
+        self.update_hashes(hash_values(s.dropna()))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # correção para cardinalidades pequenas (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+class KLLSketch:
+    """Quantis aproximados (KLL); erro de posto ~1.7/k."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # com tamanho ímpar, um item fica no nível atual
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update_values(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def update(self, s: pd.Series) -> None:
+        self.update_values(s.dropna().to_numpy(dtype=np.float64))
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return math.nan
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cum = np.cumsum(weights[order])
+        pos = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(values[order][min(pos, len(values) - 1)])
+
+class MisraGries:
+    """
+    Itens frequentes (Misra-Gries) com no máximo `capacity` contadores.
+
+    Cada bloco é contado de forma exata e somado ao resumo; quando sobram
+    mais de `capacity` contadores, a (capacity+1)-ésima maior contagem é
+    subtraída de todos e os que zeram saem. Cada contagem subestima a real
+    em no máximo `error`, e `error` <= n / (capacity + 1): todo valor com
+    mais de n / (capacity + 1) ocorrências continua no resumo.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.error = 0
+        self.n = 0
+
+    def _reduce(self, counts: pd.Series) -> None:
+        if len(counts) > self.capacity:
+            cut = int(counts.nlargest(self.capacity + 1).iloc[-1])
+            counts = counts[counts > cut] - cut
+            self.error += cut
+        self.counts = counts.astype("int64")
+
+    def _combine(self, counts: pd.Series) -> None:
+        if self.counts.empty:
+            self._reduce(counts)
+        else:
+            self._reduce(pd.concat([self.counts, counts]).groupby(level=0, sort=False).sum())
+
+    def update(self, s: pd.Series) -> None:
+        counts = s.value_counts(dropna=True, sort=False)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # value_counts lista também as categorias sem ocorrência
+            counts = counts[counts > 0]
+        if isinstance(counts.index, pd.CategoricalIndex):
+            counts.index = counts.index.astype(counts.index.categories.dtype)
+        self.n += int(counts.sum())
+        self._combine(counts)
+
+    def merge(self, other: "MisraGries") -> None:
+        # o erro de cada lado soma; a redução final só acrescenta o novo corte
+        self.n += other.n
+        self.error += other.error
+        self._combine(other.counts)
+
+    def top(self, k: int = 10) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind="stable").head(k).rename("count")
+
+class ColumnSketch:
+    """Agrupa os três sketches de uma coluna."""
+
+    def __init__(self, numeric: bool):
+        self.numeric = numeric
+        self.distinct = HyperLogLog()
+        self.quantiles = KLLSketch() if numeric else None
+        self.frequent = MisraGries()
+
+    def update(self, s: pd.Series) -> None:
+        self.distinct.update(s)
+        self.frequent.update(s)
+        if self.quantiles is not None:
+            self.quantiles.update(s)
+
+    def merge(self, other: "ColumnSketch") -> None:
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+
+    @classmethod
+    @traced
+    def from_series(cls, s: pd.Series, chunk_rows: int = SKETCH_CHUNK_ROWS) -> "ColumnSketch":
+        sketch = cls(pd.api.types.is_numeric_dtype(s))
+        for start in range(0, len(s), chunk_rows):
+            sketch.update(s.iloc[start:start + chunk_rows])
+        return sketch
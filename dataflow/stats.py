@@ -0,0 +1,242 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataflow.fingerprint import column_token
+from dataflow.groupby import GroupByEngine
+from dataflow.profiling import traced
+from dataflow.sketches import ColumnSketch
+
+TOP_K = 10                 # categorias guardadas para o gráfico de frequência
+APPROX_MIN_ROWS = 200_000  # abaixo disso o modo aproximado usa o cálculo exato
+
+@dataclass
+class ColumnSummary:
+    numeric: bool
+    count: int                 # valores não nulos
+    nulls: int
+    mean: float = math.nan
+    m2: float = 0.0            # soma dos quadrados dos desvios (Welford)
+    min: Any = None
+    max: Any = None
+    # campos que não admitem atualização incremental; None = recalcular
+    median: float | None = None
+    nunique: int | None = None
+    top_counts: pd.Series | None = field(default=None, repr=False)
+    # True quando mediana, únicos e top-10 vieram de sketches
+    approximate: bool = False
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    @property
+    def top(self) -> Any:
+        if self.top_counts is None or self.top_counts.empty:
+            return None
+        return self.top_counts.index[0]
+
+    @property
+    def complete(self) -> bool:
+        if self.nunique is None:
+            return False
+        if not self.numeric:
+            return True
+        return self.median is not None and (self.count == 0 or (self.min is not None and self.max is not None))
+
+def _numeric_values(s: pd.Series) -> np.ndarray:
+    return s.dropna().to_numpy(dtype="float64")
+
+def _moments(values: np.ndarray) -> Tuple[int, float, float]:
+    n = len(values)
+    if n == 0:
+        return 0, math.nan, 0.0
+    mean = float(values.mean())
+    return n, mean, float(((values - mean) ** 2).sum())
+
+def _merge(a: Tuple[int, float, float], b: Tuple[int, float, float], sign: int) -> Tuple[int, float, float]:
+    # combina (sign=1) ou remove (sign=-1) um lote dos momentos (n, média, M2)
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    if n_b == 0:
+        return a
+    if sign > 0:
+        if n_a == 0:
+            return b
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+    n = n_a - n_b
+    if n <= 0:
+        return 0, math.nan, 0.0
+    mean = (n_a * mean_a - n_b * mean_b) / n
+    delta = mean_b - mean
+    return n, mean, max(0.0, m2_a - m2_b - delta * delta * n * n_b / n_a)
+
+def _complete(summary: ColumnSummary, s: pd.Series, approximate: bool = False,
+              groups: GroupByEngine | None = None) -> ColumnSummary:
+    # calcula só os campos ainda em aberto
+    valid = s.dropna()
+    if approximate and (summary.nunique is None or summary.median is None):
+        sketch = ColumnSketch.from_series(valid)
+        summary = replace(
+            summary, nunique=sketch.distinct.count(), top_counts=sketch.frequent.top(TOP_K),
+            median=sketch.quantiles.quantile(0.5) if summary.numeric else summary.median,
+            approximate=True,
+        )
+    updates: Dict[str, Any] = {}
+    if (summary.nunique is None or summary.top_counts is None) and groups is not None:
+        # mesmo índice de grupos usado pelos gráficos (fatorizado uma vez por versão)
+        nunique, top_counts = groups.value_counts(s, TOP_K)
+        updates.update(nunique=nunique, top_counts=top_counts)
+    elif summary.nunique is None or summary.top_counts is None:
+        counts = valid.value_counts()
+        if isinstance(valid.dtype, pd.CategoricalDtype):
+            counts = counts[counts > 0]
+        updates.update(nunique=len(counts), top_counts=counts.head(TOP_K))
+    if summary.numeric:
+        if summary.median is None:
+            updates["median"] = float(np.median(valid.to_numpy(dtype="float64"))) if len(valid) else math.nan
+        if summary.min is None and len(valid):
+            updates["min"] = valid.min()
+        if summary.max is None and len(valid):
+            updates["max"] = valid.max()
+    return replace(summary, **updates) if updates else summary
+
+@traced
+def summarize(s: pd.Series, full: bool = True, approximate: bool = False,
+              groups: GroupByEngine | None = None) -> ColumnSummary:
+    numeric = pd.api.types.is_numeric_dtype(s)
+    valid = s.dropna()
+    summary = ColumnSummary(numeric=numeric, count=len(valid), nulls=len(s) - len(valid))
+    if numeric and len(valid):
+        summary.count, summary.mean, summary.m2 = _moments(valid.to_numpy(dtype="float64"))
+        summary.min, summary.max = valid.min(), valid.max()
+    return _complete(summary, s, approximate, groups) if full else summary
+
+class ColumnStats:
+    """
+    Profiler com cache de estatísticas por coluna.
+
+    Cada coluna é resumida uma vez por versão (count, nulos, média, desvio,
+    mín/máx, mediana, únicos e top-10) e o resultado é reutilizado pela aba
+    de Estatísticas e pelo relatório PDF. A versão de uma coluna é o buffer
+    que a guarda; colunas não alteradas entre passos do histórico
+    compartilham o buffer e portanto o resumo. Depende do copy-on-write do
+    pandas ativo (ver app.py).
+
+    Após uma edição (`apply_edits`), count, nulos, soma/média/desvio e
+    mín/máx são atualizados a partir do resumo anterior; mediana, únicos e
+    top-10 são recalculados só quando pedidos.
+
+    Com `approximate=True`, colunas com mais de APPROX_MIN_ROWS linhas usam
+    sketches (HyperLogLog, KLL e Misra-Gries) para únicos, mediana e top-10.
+    Com um `groups` (GroupByEngine), únicos e top-10 exatos vêm do índice de
+    grupos compartilhado com os gráficos.
+    """
+
+    def __init__(self, max_entries: int = 512, approximate: bool = False,
+                 groups: GroupByEngine | None = None):
+        self.max_entries = max_entries
+        self.approximate = approximate
+        self.groups = groups
+        self._cache: "OrderedDict[Tuple, Tuple[pd.Series, ColumnSummary]]" = OrderedDict()
+        # o mesmo profiler atende o script e as threads de exportação
+        self._lock = threading.Lock()
+
+    def _store(self, token: Tuple, s: pd.Series, summary: ColumnSummary) -> None:
+        with self._lock:
+            self._cache[token] = (s, summary)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _approximate_for(self, s: pd.Series) -> bool:
+        return self.approximate and len(s) > APPROX_MIN_ROWS
+
+    def _cached(self, s: pd.Series) -> Tuple[Tuple | None, ColumnSummary | None]:
+        token = column_token(s)
+        if token is not None:
+            token = token + (self._approximate_for(s),)
+        if token is None:
+            return token, None
+        with self._lock:
+            hit = self._cache.get(token)
+            if hit is None:
+                return token, None
+            self._cache.move_to_end(token)
+            return token, hit[1]
+
+    def column(self, s: pd.Series, full: bool = True) -> ColumnSummary:
+        # full=False aceita um resumo parcial (sem mediana/únicos/top-10)
+        token, summary = self._cached(s)
+        if summary is None:
+            summary = summarize(s, full=full, approximate=self._approximate_for(s), groups=self.groups)
+        elif full and not summary.complete:
+            summary = _complete(summary, s, self._approximate_for(s), self.groups)
+        else:
+            return summary
+        if token is not None:
+            self._store(token, s, summary)
+        return summary
+
+    @traced
+    def profile(self, df: pd.DataFrame) -> Dict[str, ColumnSummary]:
+        return {col: self.column(df[col]) for col in df.columns}
+
+    @traced
+    def total_nulls(self, df: pd.DataFrame) -> int:
+        return sum(self.column(df[col], full=False).nulls for col in df.columns)
+
+    @traced
+    def apply_edits(self, before: pd.DataFrame, after: pd.DataFrame, cells: List[List[Any]] = (),
+                    added: List[Dict[str, Any]] = (), deleted: List[int] = ()) -> None:
+        # derivar os resumos de `after` a partir dos de `before` e do delta
+        # aplicado por operations.apply_edits
+        edited: Dict[str, List[Any]] = {}
+        for row_id, col, _ in cells:
+            edited.setdefault(col, []).append(row_id)
+        deleted = [r for r in deleted if r in before.index]
+        new_ids = after.index.difference(before.index)
+
+        for col in after.columns:
+            if col not in before.columns:
+                continue
+            old_s, new_s = before[col], after[col]
+            _, old = self._cached(old_s)
+            token = column_token(new_s)
+            if old is None or token is None:
+                continue
+            token = token + (self._approximate_for(new_s),)
+            with self._lock:
+                if token in self._cache:
+                    continue
+            if pd.api.types.is_numeric_dtype(new_s) != old.numeric:
+                continue
+            touched = [r for r in edited.get(col, []) if r in before.index and r in after.index]
+            removed = old_s.loc[touched + deleted]
+            inserted = pd.concat([new_s.loc[touched], new_s.loc[new_ids]]) if len(new_ids) else new_s.loc[touched]
+
+            summary = replace(old, median=None, nunique=None, top_counts=None, approximate=False)
+            summary.count = old.count - int(removed.notna().sum()) + int(inserted.notna().sum())
+            summary.nulls = len(new_s) - summary.count
+            if old.numeric:
+                rem, ins = _numeric_values(removed), _numeric_values(inserted)
+                moments = _merge((old.count, old.mean, old.m2), _moments(rem), -1)
+                moments = _merge(moments, _moments(ins), 1)
+                summary.count, summary.mean, summary.m2 = moments
+                # mín/máx só continuam válidos se o extremo antigo não saiu
+                if old.min is None or (len(rem) and rem.min() <= old.min):
+                    summary.min = None
+                elif len(ins):
+                    summary.min = min(old.min, inserted.dropna().min())
+                if old.max is None or (len(rem) and rem.max() >= old.max):
+                    summary.max = None
+                elif len(ins):
+                    summary.max = max(old.max, inserted.dropna().max())
+            self._store(token, new_s, summary)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow import data_manager
+from dataflow.data_manager import autosave, try_restore
+
+@pytest.fixture(autouse=True)
+def session_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_manager, "SESSION_DIR", tmp_path)
+    return tmp_path
+
+def test_mixed_object_column_keeps_value_types():
+    mixed = pd.Series([1, "a", None, 2.5, pd.Timestamp("2024-01-05"), np.nan], dtype=object)
+    df = pd.DataFrame({"misto": mixed, "n": np.arange(6)})
+    autosave(df, "s")
+    restored = try_restore("s")
+    pd.testing.assert_frame_equal(restored, df)
+    assert [type(v) for v in restored["misto"]] == [type(v) for v in mixed]
+
+def test_duplicate_names_get_suffixes():
+    df = pd.DataFrame([[1, 2, 3]], columns=["B", "B", "C"])
+    autosave(df, "s")
+    assert try_restore("s").columns.tolist() == ["B", "B.1", "C"]
+
+def test_only_changed_parts_are_rewritten(monkeypatch, session_dir):
+    monkeypatch.setattr(data_manager, "AUTOSAVE_PART_ROWS", 10)
+    df = pd.DataFrame({"v": np.arange(35.0), "t": pd.Series(["x", 1] * 17 + ["y"], dtype=object)})
+    folder = autosave(df, "s")
+    stamps = {p.name: p.stat().st_mtime_ns for p in folder.glob("part-*")}
+    edited = df.copy()
+    edited.loc[25, "v"] = -1.0
+    autosave(edited, "s")
+    changed = {p.name for p in folder.glob("part-*") if p.stat().st_mtime_ns != stamps[p.name]}
+    assert changed == {"part-00002.arrow"}
+    pd.testing.assert_frame_equal(try_restore("s"), edited)
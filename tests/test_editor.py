@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.editor import EditorSync, page_count, page_slice, rows_signature, sort_positions
+from dataflow.operations import apply_edits
+
+@pytest.fixture
+def master():
+    # ids não contíguos, como depois de remoções anteriores
+    df = pd.DataFrame({
+        "nome": ["ana", "bia", "caio", "davi", "eva", "fabio", "gil", "hugo"],
+        "valor": [5.0, 3.0, np.nan, 8.0, 1.0, 7.0, 3.0, 6.0],
+        "qtd": np.arange(8, dtype="int64"),
+    }, index=[0, 2, 3, 5, 6, 9, 10, 11])
+    return df
+
+def _page(df, by, ascending, page, size):
+    return page_slice(df, page, size, sort_positions(df, by, ascending))
+
+def test_sorted_page_matches_pandas(master):
+    page = _page(master, "valor", False, 2, 3)
+    expected = master.sort_values("valor", ascending=False, kind="stable", na_position="last").iloc[3:6]
+    pd.testing.assert_frame_equal(page, expected)
+    assert page_count(len(master), 3) == 3
+
+def test_mixed_types_sort_as_text():
+    df = pd.DataFrame({"c": pd.Series([10, "b", None, "a"], dtype=object)})
+    order = sort_positions(df, "c")
+    assert df["c"].iloc[order].tolist()[:3] == [10, "a", "b"]
+    assert pd.isna(df["c"].iloc[order[-1]])
+
+def test_edits_on_sorted_page_map_to_master_rows(master):
+    page = _page(master, "valor", False, 2, 3)
+    row_ids = page.index.to_numpy()
+    state = {
+        "edited_rows": {0: {"valor": 99.0}, 2: {"nome": "zeca", "qtd": 40}},
+        "added_rows": [{"nome": "novo", "valor": 2.5, "qtd": 1}],
+        "deleted_rows": [1],
+    }
+    delta = EditorSync().collect(f"editor_{rows_signature(row_ids)}", state, master, row_ids)
+    out = apply_edits(master, **delta)
+
+    expected = master.copy()
+    expected.loc[row_ids[0], "valor"] = 99.0
+    expected.loc[row_ids[2], ["nome", "qtd"]] = ["zeca", 40]
+    expected = expected.drop(index=row_ids[1])
+    expected.loc[master.index.max() + 1] = ["novo", 2.5, 1]
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+    # linhas fora da página não mudam
+    untouched = master.index.difference(row_ids)
+    pd.testing.assert_frame_equal(out.loc[untouched], master.loc[untouched])
+
+def test_widget_state_is_cumulative(master):
+    row_ids = _page(master, "nome", True, 1, 4).index.to_numpy()
+    sync, key = EditorSync(), "editor_a"
+    state = {"edited_rows": {1: {"valor": 0.5}}, "added_rows": [], "deleted_rows": []}
+    assert sync.collect(key, state, master, row_ids)["cells"] == [[row_ids[1].item(), "valor", 0.5]]
+    # rerun com o mesmo estado: nada novo
+    assert sync.collect(key, state, master, row_ids) is None
+    state = {"edited_rows": {1: {"valor": 0.5}, 3: {"qtd": 70}}, "added_rows": [{"nome": "x"}],
+             "deleted_rows": [0]}
+    delta = sync.collect(key, state, master, row_ids)
+    assert delta == {"cells": [[row_ids[3].item(), "qtd", 70]], "added": [{"nome": "x"}],
+                     "deleted": [row_ids[0].item()]}
+
+def test_new_rows_shown_reset_the_delta(master):
+    sync = EditorSync()
+    first = _page(master, "valor", True, 1, 3).index.to_numpy()
+    state = {"edited_rows": {0: {"qtd": 50}}}
+    sync.collect(rows_signature(first), state, master, first)
+    second = _page(master, "valor", True, 2, 3).index.to_numpy()
+    assert rows_signature(first) != rows_signature(second)
+    # mesma posição, outra página: a edição vale para a linha da página nova
+    delta = sync.collect(rows_signature(second), state, master, second)
+    assert delta["cells"] == [[second[0].item(), "qtd", 50]]
+
+def test_unchanged_value_is_not_an_edit(master):
+    row_ids = master.index.to_numpy()
+    state = {"edited_rows": {2: {"valor": None}, 0: {"valor": 5.0}}}
+    assert EditorSync().collect("k", state, master, row_ids) is None
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.filters import FilterEngine, coerce_value
+from dataflow.operations import apply_edits
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "valor": [10.0, np.nan, 3.0, 25.5, 3.0, np.nan],
+        "cidade": ["Recife", None, "Natal", "recife", "Belém", "Natal"],
+        "ativo": pd.array([True, False, None, True, True, False], dtype="boolean"),
+        "data": pd.to_datetime(["2024-01-05", "2024-02-01", None, "2023-12-31", "2024-03-10", "2024-01-20"]),
+    })
+
+def _mask(df, node):
+    return FilterEngine(df).mask(node)
+
+def _same(got, expected):
+    np.testing.assert_array_equal(got, expected.to_numpy(dtype=bool, na_value=False))
+
+@pytest.mark.parametrize("op, val, expected", [
+    ("==", "3", lambda s: s == 3),
+    ("!=", "3", lambda s: (s != 3) & s.notna()),      # nulo nunca satisfaz
+    (">", 5, lambda s: s > 5),
+    ("<=", "10", lambda s: s <= 10),
+    ("between", ["3", "10"], lambda s: s.between(3, 10)),
+    ("isin", ["3", "25.5"], lambda s: s.isin([3, 25.5])),
+    ("notin", ["3"], lambda s: ~s.isin([3]) & s.notna()),
+    ("isna", None, lambda s: s.isna()),
+    ("notna", None, lambda s: s.notna()),
+])
+def test_numeric_conditions(frame, op, val, expected):
+    _same(_mask(frame, {"col": "valor", "op": op, "val": val}), expected(frame["valor"]))
+
+@pytest.mark.parametrize("node, expected", [
+    ({"op": "==", "val": "Natal"}, lambda s: s == "Natal"),
+    ({"op": "!=", "val": "Natal"}, lambda s: (s != "Natal") & s.notna()),
+    ({"op": "notin", "val": ["Natal", "Belém"]}, lambda s: ~s.isin(["Natal", "Belém"]) & s.notna()),
+    ({"op": "contains", "val": "REC"}, lambda s: s.str.lower().str.contains("rec")),
+    ({"op": "regex", "val": "^(?:rec|nat)"}, lambda s: s.str.contains("^(?:rec|nat)", case=False)),
+    ({"op": "isna"}, lambda s: s.isna()),
+])
+@pytest.mark.parametrize("categorical", [False, True])
+def test_text_conditions_per_category(frame, node, expected, categorical):
+    s = frame["cidade"].astype("category") if categorical else frame["cidade"]
+    got = _mask(frame.assign(cidade=s), {"col": "cidade", **node})
+    _same(got, expected(frame["cidade"]))
+
+def test_boolean_and_dates(frame):
+    _same(_mask(frame, {"col": "ativo", "op": "==", "val": "sim"}), frame["ativo"] == True)  # noqa: E712
+    _same(_mask(frame, {"col": "data", "op": ">=", "val": "01/02/2024"}), frame["data"] >= "2024-02-01")
+
+def test_groups(frame):
+    node = {"or": [{"and": [{"col": "valor", "op": ">", "val": 5}, {"col": "cidade", "op": "contains", "val": "rec"}]},
+                   {"col": "valor", "op": "isna"}]}
+    s, c = frame["valor"], frame["cidade"]
+    _same(_mask(frame, node), ((s > 5) & c.str.lower().str.contains("rec")) | s.isna())
+    assert _mask(frame, {"and": []}).all()
+
+def test_coerce_value(frame):
+    assert coerce_value(frame["valor"], " 3.5 ") == 3.5
+    assert coerce_value(frame["ativo"], "Verdadeiro") is True
+    assert coerce_value(frame["data"], "05/01/2024") == pd.Timestamp("2024-01-05")
+    assert coerce_value(frame["cidade"], "7") == "7"
+    assert coerce_value(frame["valor"], 7) == 7
+    with pytest.raises(ValueError):
+        coerce_value(frame["valor"], "dez")
+    with pytest.raises(ValueError):
+        coerce_value(frame["data"], "ontem")
+
+def test_invalid_filters_raise_value_error(frame):
+    mixed = frame.assign(misto=pd.Series([1, "a", 2, None, "b", 3], dtype=object))
+    for node in ({"col": "misto", "op": ">", "val": 1}, {"col": "nada", "op": "==", "val": 1},
+                 {"col": "cidade", "op": "regex", "val": "("}, {"col": "cidade", "op": "??", "val": 1}):
+        with pytest.raises(ValueError):
+            _mask(mixed, node)
+
+def test_masks_are_cached_per_dataframe(frame):
+    engine = FilterEngine(frame)
+    leaf = {"col": "valor", "op": ">", "val": 5}
+    first = engine.mask(leaf)
+    engine.mask({"and": [leaf, {"col": "cidade", "op": "notna"}]})
+    assert engine.mask(leaf) is first
+    # depois de uma edição o DataFrame é outro: um engine novo enxerga o valor novo
+    edited = apply_edits(frame, cells=[[2, "valor", 50.0]])
+    _same(FilterEngine(edited).mask(leaf), edited["valor"] > 5)
+    assert not first[2] and FilterEngine(edited).mask(leaf)[2]
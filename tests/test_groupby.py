@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.fingerprint import column_token
+from dataflow.groupby import AGGREGATIONS, GroupByEngine
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        "cidade": rng.choice(["Recife", "Natal", "Belém", "Manaus"], n),
+        "loja": rng.integers(0, 40, n),
+        "valor": rng.normal(100, 30, n).round(2),
+        "nome": rng.choice(["ana", "bia", "caio"], n),
+    })
+    df.loc[rng.choice(n, 300, replace=False), "valor"] = np.nan
+    df.loc[rng.choice(n, 200, replace=False), "cidade"] = None
+    # grupo só com nulos: soma 0, média/máx/mín NaN
+    df.loc[df["loja"] == 7, "valor"] = np.nan
+    return df
+
+@pytest.mark.parametrize("agg", AGGREGATIONS)
+@pytest.mark.parametrize("key", ["cidade", "loja"])
+def test_aggregate_matches_pandas(frame, key, agg):
+    got = GroupByEngine().aggregate(frame[key], frame["valor"], agg)
+    expected = frame.groupby(key, sort=True)["valor"].agg(agg)
+    pd.testing.assert_series_equal(got, expected, check_dtype=False, check_names=False, check_index_type=False)
+
+def test_count_without_values_counts_rows(frame):
+    got = GroupByEngine().aggregate(frame["cidade"], None, "count")
+    expected = frame.groupby("cidade", sort=True).size()
+    pd.testing.assert_series_equal(got, expected, check_dtype=False, check_names=False)
+
+def test_table_on_text_values(frame):
+    got = GroupByEngine().table(frame["cidade"], frame["nome"])
+    expected = frame.groupby("cidade", sort=True)["nome"].agg(["count", "max", "min"])
+    pd.testing.assert_frame_equal(got[["count", "max", "min"]], expected, check_dtype=False, check_names=False)
+    assert got["sum"].isna().all() and got["mean"].isna().all()
+
+def test_categorical_key(frame):
+    key = frame["cidade"].astype("category")
+    got = GroupByEngine().aggregate(key, frame["valor"], "mean")
+    expected = frame["valor"].groupby(key, observed=True, sort=True).mean()
+    pd.testing.assert_series_equal(got, expected, check_dtype=False, check_names=False, check_index_type=False,
+                                   check_categorical=False)
+
+def test_value_counts(frame):
+    n, top = GroupByEngine().value_counts(frame["loja"], 5)
+    expected = frame["loja"].value_counts()
+    assert n == frame["loja"].nunique()
+    assert top.tolist() == expected.head(5).tolist()
+    assert (expected.loc[top.index] == top).all()
+
+def test_cache_follows_data_version(frame):
+    engine = GroupByEngine()
+    before = engine.aggregate(frame["cidade"], frame["valor"], "sum")
+    edited = frame.copy()
+    edited.loc[0, ["cidade", "valor"]] = ["Recife", 1e6]
+    after = engine.aggregate(edited["cidade"], edited["valor"], "sum")
+    expected = edited.groupby("cidade", sort=True)["valor"].sum()
+    pd.testing.assert_series_equal(after, expected, check_dtype=False, check_names=False)
+    assert after["Recife"] != before["Recife"]
+
+def test_value_counts_does_not_cache_index(frame):
+    engine = GroupByEngine()
+    for col in frame.columns:
+        engine.value_counts(frame[col], 5)
+    assert engine.cached_bytes == 0
+
+def test_cache_bounded_by_bytes(frame):
+    # cada índice guarda ~2 × 8 bytes por linha; cabem dois, não quatro
+    engine = GroupByEngine(max_bytes=2 * 16 * len(frame) + 4096)
+    for col in frame.columns:
+        engine.aggregate(frame[col], frame["valor"], "sum")
+    assert 0 < engine.cached_bytes <= engine.max_bytes
+    assert len(engine._indexes) < len(frame.columns)
+    # o mais recente continua em cache
+    assert engine._lookup(engine._indexes, column_token(frame["nome"])) is not None
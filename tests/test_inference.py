@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.inference import DATE_FORMATS, convert_column, infer_kind, optimize_dtypes
+
+def _text(values):
+    return pd.Series(values, dtype=object, name="col")
+
+@pytest.mark.parametrize("values, expected", [
+    (["1.234,56", "10,00", "-3,5"], [1234.56, 10.0, -3.5]),
+    (["2.500.000", "1.234", "950"], [2_500_000, 1234, 950]),
+    (["R$ 1.234,56", "R$10,00", "- R$ 5,00"], [1234.56, 10.0, -5.0]),
+])
+def test_br_numbers(values, expected):
+    s = _text(values)
+    assert infer_kind(s) == ("decimal_br", None)
+    out = convert_column(s, "decimal_br")
+    pd.testing.assert_series_equal(out, pd.Series(expected, name="col"), check_dtype=False)
+
+@pytest.mark.parametrize("values", [["1.100", "2.500"], ["1.234", "2.345", "3.456"]])
+def test_ambiguous_dots_are_not_thousands(values):
+    # só "d.ddd" em todos os valores não basta para ler ponto como milhar
+    kind, _ = infer_kind(_text(values))
+    assert kind != "decimal_br"
+    out, _ = optimize_dtypes(pd.DataFrame({"col": values}))
+    assert out["col"].tolist() != [float(v.replace(".", "")) for v in values]
+
+@pytest.mark.parametrize("values", [["00123", "04567", "10000"], ["0800", "0300"]])
+def test_leading_zero_codes_stay_text(values):
+    assert infer_kind(_text(values))[0] == "text"
+    out, _ = optimize_dtypes(pd.DataFrame({"col": values}))
+    assert out["col"].astype(str).tolist() == values
+
+def test_plain_numbers():
+    s = _text(["1", "2", " 3 ", None])
+    assert infer_kind(s) == ("numeric", None)
+    out = convert_column(s, "numeric")
+    assert out.dtype == "float64" and out.tolist()[:3] == [1, 2, 3] and np.isnan(out.iloc[3])
+
+@pytest.mark.parametrize("values, expected", [
+    (["S", "N", "s", None], [True, False, True, pd.NA]),
+    (["sim", "Não", "SIM"], [True, False, True]),
+    (["true", "false"], [True, False]),
+])
+def test_booleans(values, expected):
+    s = _text(values)
+    assert infer_kind(s) == ("boolean", None)
+    assert convert_column(s, "boolean").tolist() == expected
+
+@pytest.mark.parametrize("fmt, values", [
+    ("%d/%m/%Y", ["01/02/2024", "31/12/2023"]),
+    ("%d/%m/%Y %H:%M", ["01/02/2024 10:30", "31/12/2023 23:59"]),
+    ("%d/%m/%Y %H:%M:%S", ["01/02/2024 10:30:05", "31/12/2023 23:59:59"]),
+    ("%Y-%m-%d", ["2024-02-01", "2023-12-31"]),
+    ("%Y-%m-%d %H:%M:%S", ["2024-02-01 10:30:05", "2023-12-31 23:59:59"]),
+    ("%d-%m-%Y", ["01-02-2024", "31-12-2023"]),
+    ("%d.%m.%Y", ["01.02.2024", "31.12.2023"]),
+    ("ISO8601", ["2024-02-01T10:30:05", "2023-12-31T23:59:59.5"]),
+])
+def test_date_formats(fmt, values):
+    s = _text(values)
+    assert infer_kind(s) == ("datetime", fmt)
+    out = convert_column(s, "datetime", fmt)
+    assert pd.api.types.is_datetime64_any_dtype(out)
+    assert out.notna().all()
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_mixed_time_zones_stay_text():
+    s = _text(["2024-02-01T10:30:05", "2023-12-31T23:59:59Z"])
+    assert convert_column(s, "datetime", "ISO8601") is None
+    out, _ = optimize_dtypes(pd.DataFrame({"col": s}))
+    assert out["col"].astype(str).tolist() == s.tolist()
+
+def test_day_first_dates():
+    out = convert_column(_text(["01/02/2024"]), "datetime", "%d/%m/%Y")
+    assert (out.dt.month.iloc[0], out.dt.day.iloc[0]) == (2, 1)
+
+def test_conversion_that_creates_nulls_is_rejected():
+    assert convert_column(_text(["1,5", "abc"]), "decimal_br") is None
+    assert convert_column(_text(["01/02/2024", "ontem"]), "datetime", "%d/%m/%Y") is None
+
+def test_sample_deciding_wrongly_keeps_text():
+    # a amostra só vê números; o valor de texto no fim impede a conversão
+    values = [str(i) for i in range(50_000)] + ["n/d"]
+    out, report = optimize_dtypes(pd.DataFrame({"col": values}), sample_rows=100)
+    assert not pd.api.types.is_numeric_dtype(out["col"])
+    assert out["col"].astype(str).iloc[-1] == "n/d"
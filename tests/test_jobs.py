@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+from dataflow.jobs import STATUS_LABELS, JobManager
+
+@pytest.fixture
+def manager():
+    jobs = JobManager(max_workers=1)
+    yield jobs
+    jobs.shutdown()
+
+def test_status_follows_job(manager):
+    gate = threading.Event()
+    running = manager.submit("a", "A", lambda job: gate.wait(5))
+    queued = manager.submit("b", "B", lambda job: "ok")
+    assert queued.status == "queued"
+    queued.cancel()
+    assert queued.status == "cancelled"
+    gate.set()
+    running.future.result(5)
+    assert running.status == "done"
+    assert set(STATUS_LABELS) >= {running.status, queued.status}
+
+def test_status_failed(manager):
+    def boom(job):
+        raise ValueError("quebrou")
+
+    job = manager.submit("c", "C", boom)
+    job.future.result(5)
+    assert job.status == "failed" and job.error == "quebrou"
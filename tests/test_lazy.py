@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.inference import optimize_dtypes
+from dataflow.lazy import LazyFrame
+from dataflow.pipeline import _apply_steps, _load
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    n = 60
+    return pd.DataFrame({
+        "k": np.arange(n),
+        "cidade": rng.choice(["Recife", "Natal", "Belém"], n),
+        "valor": rng.normal(50, 20, n).round(2),
+        "obs": rng.choice(["a", "b", None], n),
+    })
+
+@pytest.fixture(params=["csv", "parquet"])
+def source(request, frame, tmp_path):
+    path = tmp_path / f"dados.{request.param}"
+    if request.param == "csv":
+        frame.to_csv(path, index=False)
+    else:
+        # row groups pequenos: o filtro do pyarrow pula grupos inteiros
+        frame.to_parquet(path, index=False, row_group_size=8)
+    return str(path)
+
+def _eager(path: str, steps):
+    df = pd.read_csv(path) if path.endswith(".csv") else pd.read_parquet(path)
+    return _apply_steps(df, steps)
+
+def _check(path: str, steps, labels: bool = True):
+    lazy = LazyFrame(path, steps, chunk_rows=7).collect()
+    eager = _eager(path, steps)
+    if not labels:
+        # filtro empurrado para o pyarrow renumera as linhas (ver lazy.py)
+        lazy, eager = lazy.reset_index(drop=True), eager.reset_index(drop=True)
+    pd.testing.assert_frame_equal(lazy, eager, check_dtype=False)
+    return lazy
+
+GT3 = {"col": "k", "op": ">", "val": 3}
+
+def test_filter_then_delete_rows_by_label(source):
+    steps = [{"op": "filter", "args": {"query": GT3}},
+             {"op": "delete_rows", "args": {"index_list": [0]}}]
+    lazy = _check(source, steps)
+    # o rótulo 0 não existe mais depois do filtro: nada sai
+    assert lazy["k"].tolist()[:2] == [4, 5]
+
+def test_delete_rows_then_filter(source):
+    _check(source, [{"op": "delete_rows", "args": {"index_list": [0, 5, 10]}},
+                    {"op": "filter", "args": {"query": GT3}}])
+
+def test_pushdown_and_projection(source):
+    steps = [{"op": "rename_columns", "args": {"mapping": {"valor": "preço"}}},
+             {"op": "filter", "args": {"query": {"col": "preço", "op": ">=", "val": 50}}},
+             {"op": "delete_columns", "args": {"cols": ["obs"]}},
+             {"op": "filter", "args": {"query": {"col": "cidade", "op": "contains", "val": "re"}}}]
+    columns, predicate, remaining = LazyFrame(source, steps).optimize()
+    assert "obs" not in columns
+    assert {"col": "valor", "op": ">=", "val": 50} in predicate["and"]
+    assert all(step["op"] != "filter" for step in remaining)
+    _check(source, steps, labels=False)
+
+def test_filter_after_fillna_is_not_pushed(source):
+    steps = [{"op": "fillna", "args": {"strategy": "value", "value": "z"}},
+             {"op": "filter", "args": {"query": {"col": "obs", "op": "==", "val": "z"}}}]
+    _, predicate, _ = LazyFrame(source, steps).optimize()
+    assert predicate is None
+    _check(source, steps)
+
+def test_prepare_matches_eager_pipeline(source):
+    # modo lazy do pipeline: tipos convertidos logo após a leitura, como em _load
+    steps = [{"op": "filter", "args": {"query": {"col": "cidade", "op": "==", "val": "Natal"}}},
+             {"op": "delete_rows", "args": {"index_list": [1, 2]}},
+             {"op": "delete_columns", "args": {"cols": ["obs"]}}]
+    plan = LazyFrame(source, steps, chunk_rows=7, prepare=lambda df: optimize_dtypes(df)[0])
+    pd.testing.assert_frame_equal(plan.collect(), _apply_steps(_load(source, False), steps))
+
+def test_prepare_pushes_filters_on_typed_columns(source):
+    # configuração do pipeline (pipeline._run_full com lazy=True)
+    steps = [{"op": "filter", "args": {"query": {"col": "k", "op": ">=", "val": 10}}},
+             {"op": "filter", "args": {"query": {"col": "cidade", "op": "==", "val": "Recife"}}},
+             {"op": "delete_columns", "args": {"cols": ["obs"]}}]
+    plan = LazyFrame(source, steps, chunk_rows=7, prepare=lambda df: optimize_dtypes(df)[0])
+    columns, predicate, remaining = plan.optimize()
+    # número desce para a leitura; texto espera a conversão de tipos
+    assert predicate == {"col": "k", "op": ">=", "val": 10}
+    assert remaining[0] == {"op": "filter", "args": {"query": {"col": "cidade", "op": "==", "val": "Recife"}}}
+    assert "obs" not in columns
+    lazy = plan.collect()
+    eager = _apply_steps(_load(source, False), steps)
+    pd.testing.assert_frame_equal(lazy.reset_index(drop=True), eager.reset_index(drop=True))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.inference import optimize_dtypes
+from dataflow.operations import apply_edits
+from dataflow.stats import summarize
+
+@pytest.fixture
+def loaded():
+    # como na carga: inteiros compactados para o menor tipo
+    df = pd.DataFrame({"qtd": [1, 2, 3, 4], "saldo": [-5, 10, 20, 30], "preço": [1.5, 2.0, 2.5, 3.0]})
+    df, _ = optimize_dtypes(df)
+    assert df["qtd"].dtype == np.uint8 and df["saldo"].dtype == np.int8
+    return df
+
+@pytest.mark.parametrize("col, value, expected", [
+    ("qtd", 300, 300),
+    ("qtd", -1, -1),
+    ("saldo", 70_000, 70_000),
+    ("qtd", 1.5, 1.5),
+])
+def test_out_of_range_value_widens_numeric_column(loaded, col, value, expected):
+    out = apply_edits(loaded, cells=[[0, col, value]])
+    assert pd.api.types.is_numeric_dtype(out[col])
+    assert out[col].tolist() == [expected] + loaded[col].tolist()[1:]
+    summary = summarize(out[col])
+    assert summary.numeric
+    assert summary.mean == pytest.approx(out[col].astype("float64").mean())
+
+@pytest.mark.parametrize("col", ["qtd", "saldo"])
+def test_cleared_int_cell_keeps_column_numeric(loaded, col):
+    out = apply_edits(loaded, cells=[[1, col, None]])
+    assert pd.api.types.is_integer_dtype(out[col])
+    assert out[col].isna().tolist() == [False, True, False, False]
+    assert out[col].dropna().tolist() == loaded[col].drop(index=1).tolist()
+    assert summarize(out[col]).numeric
+
+def test_added_row_with_missing_int_keeps_column_numeric(loaded):
+    out = apply_edits(loaded, added=[{"preço": 9.0}])
+    assert len(out) == 5
+    for col in ("qtd", "saldo"):
+        assert pd.api.types.is_integer_dtype(out[col])
+        assert out[col].isna().sum() == 1
+
+def test_value_that_fits_keeps_compact_dtype(loaded):
+    out = apply_edits(loaded, cells=[[0, "qtd", 7], [1, "qtd", "8"]])
+    assert out["qtd"].dtype == np.uint8
+    assert out["qtd"].tolist()[:2] == [7, 8]
+
+def test_text_in_numeric_column_becomes_object(loaded):
+    out = apply_edits(loaded, cells=[[0, "qtd", "abc"]])
+    assert out["qtd"].tolist()[0] == "abc"
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from dataflow.pipeline import run_file
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "vendas.csv"
+    path.write_text("data;valor;nome\n01/02/2024;1.234,56;a\n03/02/2024;10,00;b\n05/02/2024;250,00;c\n",
+                    encoding="utf-8")
+    return str(path)
+
+def _run(tmp_path, source, name, **spec):
+    result = run_file({"output": str(tmp_path / name), **spec}, source)
+    return result, pd.read_csv(tmp_path / name / "vendas" / "vendas.csv")
+
+GT100 = [{"op": "filter", "args": {"query": {"col": "valor", "op": ">", "val": 100}}}]
+
+def test_streaming_matches_full_path(tmp_path, source):
+    streamed, out = _run(tmp_path, source, "csv", steps=GT100, exports=["csv"], chunk_rows=1)
+    full, expected = _run(tmp_path, source, "json", steps=GT100, exports=["csv", "json"])
+    assert streamed["streamed"] and not full["streamed"]
+    pd.testing.assert_frame_equal(out, expected)
+    assert out["valor"].tolist() == [1234.56, 250.0]
+    assert out["data"].tolist() == ["2024-02-01", "2024-02-05"]
+
+def test_chunks_with_other_types_fall_back_to_full_path(tmp_path, source):
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("ontem;caro;d\n")
+    streamed, out = _run(tmp_path, source, "csv", exports=["csv"], chunk_rows=2)
+    _, expected = _run(tmp_path, source, "json", exports=["csv", "json"])
+    assert not streamed["streamed"]
+    pd.testing.assert_frame_equal(out, expected)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.sketches import ColumnSketch, HyperLogLog, KLLSketch, MisraGries
+
+def _chunks(s: pd.Series, n: int):
+    size = -(-len(s) // n)
+    return [s.iloc[i:i + size] for i in range(0, len(s), size)]
+
+@pytest.fixture
+def numbers():
+    rng = np.random.default_rng(1)
+    s = pd.Series(rng.lognormal(3, 1, 200_000))
+    s[rng.choice(len(s), 1_000, replace=False)] = np.nan
+    return s
+
+@pytest.fixture
+def words():
+    # distribuição de Zipf: poucos valores muito frequentes e uma cauda longa
+    rng = np.random.default_rng(2)
+    return pd.Series([f"v{i}" for i in rng.zipf(1.3, 100_000) % 20_000])
+
+@pytest.mark.parametrize("n_distinct", [50, 5_000, 150_000])
+def test_hyperloglog_close_to_nunique(n_distinct):
+    rng = np.random.default_rng(n_distinct)
+    s = pd.Series(rng.integers(0, n_distinct, 300_000))
+    hll = HyperLogLog()
+    hll.update(s)
+    exact = s.nunique()
+    assert abs(hll.count() - exact) <= 0.03 * exact
+
+def test_hyperloglog_ignores_numeric_width():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.update(pd.Series([1, 2, 3], dtype="int8"))
+    b.update(pd.Series([1, 2, 3], dtype="int64"))
+    assert (a.registers == b.registers).all()
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.75, 0.99])
+def test_kll_rank_error(numbers, q):
+    kll = KLLSketch()
+    kll.update(numbers)
+    values = numbers.dropna().to_numpy()
+    rank = np.mean(values <= kll.quantile(q))
+    assert abs(rank - q) <= 0.02
+
+def test_kll_merge_matches_single_pass(numbers):
+    parts = [KLLSketch(seed=i) for i in range(4)]
+    for part, chunk in zip(parts, _chunks(numbers, 4)):
+        part.update(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.n == numbers.count()
+    values = numbers.dropna().to_numpy()
+    assert abs(np.mean(values <= merged.quantile(0.5)) - 0.5) <= 0.02
+
+def test_misra_gries_top_matches_value_counts(words):
+    mg = MisraGries(capacity=200)
+    for chunk in _chunks(words, 10):
+        mg.update(chunk)
+    exact = words.value_counts()
+    top = mg.top(10)
+    assert len(mg.counts) <= 200
+    assert list(top.index) == list(exact.index[:10])
+    # contagens subestimam no máximo `error`, limitado por n / (capacity + 1)
+    diff = exact.loc[top.index] - top
+    assert (diff >= 0).all() and (diff <= mg.error).all()
+    assert mg.error <= len(words) / 201
+    # todo valor acima do limite continua no resumo
+    assert set(exact[exact > len(words) / 201].index) <= set(mg.counts.index)
+
+def test_misra_gries_merge(words):
+    parts = [MisraGries(capacity=200) for _ in range(4)]
+    for part, chunk in zip(parts, _chunks(words, 4)):
+        part.update(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    exact = words.value_counts()
+    assert merged.n == len(words) and len(merged.counts) <= 200
+    diff = exact.loc[merged.counts.index] - merged.counts
+    assert (diff >= 0).all() and (diff <= merged.error).all()
+    assert merged.error <= len(words) / 201
+
+def test_column_sketch_by_chunks(numbers):
+    sketch = ColumnSketch.from_series(numbers, chunk_rows=30_000)
+    assert abs(sketch.distinct.count() - numbers.nunique()) <= 0.03 * numbers.nunique()
+    values = numbers.dropna().to_numpy()
+    assert abs(np.mean(values <= sketch.quantiles.quantile(0.5)) - 0.5) <= 0.02
+    assert sketch.quantiles.n == numbers.count()
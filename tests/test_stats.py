@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataflow.operations import apply_edits
+from dataflow.stats import ColumnStats, summarize
+
+@pytest.fixture(autouse=True)
+def copy_on_write():
+    # colunas não editadas compartilham o buffer (como no app)
+    with pd.option_context("mode.copy_on_write", True):
+        yield
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(4)
+    n = 2_000
+    df = pd.DataFrame({
+        "valor": rng.normal(100, 15, n),
+        "qtd": rng.integers(0, 50, n),
+        "cidade": rng.choice(["Recife", "Natal", "Belém"], n),
+    })
+    df.loc[rng.choice(n, 100, replace=False), "valor"] = np.nan
+    return df
+
+def _assert_same(got, expected):
+    assert (got.count, got.nulls, got.numeric) == (expected.count, expected.nulls, expected.numeric)
+    if expected.numeric:
+        assert got.mean == pytest.approx(expected.mean, rel=1e-9)
+        assert got.std == pytest.approx(expected.std, rel=1e-9)
+        assert got.min == expected.min and got.max == expected.max
+        assert got.median == pytest.approx(expected.median)
+    assert got.nunique == expected.nunique
+    pd.testing.assert_series_equal(got.top_counts.sort_index(), expected.top_counts.sort_index(),
+                                   check_names=False, check_index_type=False)
+
+@pytest.mark.parametrize("delta", [
+    # células: novo máximo, valor que vira nulo, nulo que ganha valor
+    {"cells": [[0, "valor", 1e4], [1, "valor", None], [2, "qtd", 49], [3, "cidade", "Natal"]]},
+    {"added": [{"valor": 50.0, "qtd": 3, "cidade": "Recife"}, {"valor": None, "qtd": 7, "cidade": "Manaus"}]},
+    {"deleted": [0, 5, 7, 11]},
+    {"cells": [[10, "valor", -3.5], [12, "qtd", 0]], "added": [{"valor": 1.0, "qtd": 1, "cidade": "Natal"}],
+     "deleted": [10, 13]},
+])
+def test_incremental_summary_matches_fresh(frame, delta):
+    stats = ColumnStats()
+    stats.profile(frame)
+    after = apply_edits(frame, **delta)
+    stats.apply_edits(frame, after, **delta)
+    for col in after.columns:
+        _, partial = stats._cached(after[col])
+        assert partial is not None      # veio do resumo anterior, não de um recálculo
+        _assert_same(stats.column(after[col]), summarize(after[col]))
+
+def test_removing_the_extreme_recomputes_it(frame):
+    stats = ColumnStats()
+    stats.profile(frame)
+    top = frame["valor"].idxmax()
+    delta = {"deleted": [top]}
+    after = apply_edits(frame, **delta)
+    stats.apply_edits(frame, after, **delta)
+    assert stats.column(after["valor"]).max == after["valor"].max()
+
+def test_many_rounds_stay_close(frame):
+    stats = ColumnStats()
+    stats.profile(frame)
+    rng = np.random.default_rng(5)
+    df = frame
+    for _ in range(20):
+        rows = rng.choice(df.index, 5, replace=False)
+        delta = {"cells": [[int(r), "valor", float(rng.normal(100, 15))] for r in rows[:3]],
+                 "deleted": [int(rows[4])], "added": [{"valor": 42.0, "qtd": 1, "cidade": "Natal"}]}
+        after = apply_edits(df, **delta)
+        stats.apply_edits(df, after, **delta)
+        df = after
+    _assert_same(stats.column(df["valor"]), summarize(df["valor"]))